@@ -0,0 +1,56 @@
+# --- START OF FILE bench_startup.py ---
+#
+# Measures process startup for the trikal entry point. Each scenario is run in a fresh interpreter
+# several times and the median wall-clock time is reported. "backtest imports" loads what
+# `trikal.py --date ...` imports before it connects to Breeze. breeze_connect stays eager for backtests,
+# since the provider needs a session for warm-up data. "eager imports (before)" loads the same modules
+# plus the set trikal.py used to import unconditionally, so the two rows compare like for like.
+#
+#   python bench_startup.py            # 5 runs per scenario
+#   python bench_startup.py --runs 10
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+# The modules trikal.main() imports on the backtest path, in the order it imports them.
+BACKTEST_IMPORTS = ("import trikal, breeze_connect, trikal_engine, trikal_provider, trikal_helpers, trikal_results, trikal_backtest; "
+                    "trikal.get_strategy_class('TrendPullback')")
+
+SCENARIOS = {
+    "trikal --help": [sys.executable, "trikal.py", "--help"],
+    "backtest imports": [sys.executable, "-c", BACKTEST_IMPORTS],
+    "eager imports (before)": [sys.executable, "-c",
+                               "import breeze_connect, telegram, telegram.ext, pandas_ta, scipy.stats, pandas; " + BACKTEST_IMPORTS],
+}
+
+
+def time_scenario(command, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        samples.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit code {result.returncode}"
+    return samples, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup-time benchmark for trikal.py")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per scenario.")
+    args = parser.parse_args()
+
+    print(f"{'Scenario':<26} {'median':>9} {'min':>9} {'max':>9}")
+    for name, command in SCENARIOS.items():
+        samples, error = time_scenario(command, args.runs)
+        if samples is None:
+            print(f"{name:<26} failed: {error}")
+            continue
+        print(f"{name:<26} {statistics.median(samples):>8.3f}s {min(samples):>8.3f}s {max(samples):>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,9 +15,17 @@ import re
 import io
 import smtplib
 from email.mime.text import MIMEText
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, NamedTuple
 import random
 import subprocess
+import threading
+import hashlib
+import multiprocessing
+import sqlite3
+import signal
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from requests.adapters import HTTPAdapter
 import pid  # <--- THIS IS THE PID LOCK LIBRARY
 
 # --- USER CONFIGURATION FOR EMAIL ALERTS ---
@@ -45,12 +53,102 @@ RSYNC_PEM_KEY = '/Users/a9768030444/Dropbox/usefuldocs/pemfiles/zimbraonaws.pem'
 RSYNC_SOURCE_FILE = '/Users/a9768030444/orapps/prj/newtrade/nse_orders_database.js'
 RSYNC_DESTINATION = 'bitnami@3.109.75.2:/usr/src/prj/ozone/app/website/nse_orders_database.js'
 
+# --- ORDER DATABASE CONFIGURATION ---
+# SQLite is the source of truth; the JS file the HTML report loads is exported from it once per scan.
+ORDERS_DB_FILE = os.path.join(os.path.dirname(RSYNC_SOURCE_FILE), 'nse_orders.db')
+# --- INCREMENTAL FETCH CONFIGURATION ---
+# Each symbol's request window starts at the day it was last scanned successfully (new symbols: the oldest such day
+# among known symbols; first run: INITIAL_LOOKBACK_DAYS),
+# and only announcements newer than its last-seen timestamp are processed. With BULK_FETCH the whole window is
+# pulled in one request and filtered against symbols.txt locally; per-symbol requests are the fallback.
+INITIAL_LOOKBACK_DAYS = 1
+MAX_LOOKBACK_DAYS = 30
+BULK_FETCH = True
+
+# Also export one nse_orders_database_<year>.js per year (each defining ordersData) next to the full file.
+EXPORT_PARTITION_BY_YEAR = False
+
 # --- PROCESS LOCKING CONFIGURATION ---
 PID_FILE = 'nse_scanner.pid'
 
+# --- SCAN CONCURRENCY AND RATE CONFIGURATION ---
+# Symbols are scanned by a thread pool sharing one session; every request (API, page or PDF) first
+# takes a token from a shared bucket, so the request rate to NSE stays bounded however many workers run.
+SCAN_WORKERS = 8
+REQUESTS_PER_SECOND = 3.0
+REQUEST_BURST = 6
+MIN_REQUESTS_PER_SECOND = 0.5
+MAX_REQUEST_ATTEMPTS = 5
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 60.0
+
+# --- PDF EXTRACTION CONFIGURATION ---
+# Attachments are downloaded on threads and parsed in worker processes (at most PDF_PARSE_WORKERS at once),
+# so a large filing never blocks the scan. A parse that runs past PDF_PARSE_TIMEOUT_SECONDS is killed.
+# Parsed results are cached by the SHA-256 of the PDF bytes, so no attachment is parsed twice. Orders whose
+# PDF could not be read are stored with the placeholder value and retried on later runs, up to PDF_MAX_ATTEMPTS.
+PDF_PARSE_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+PDF_MAX_PAGES = 10
+PDF_PARSE_TIMEOUT_SECONDS = 60
+PDF_MAX_ATTEMPTS = 3
+PDF_CACHE_FILE = 'nse_pdf_snippet_cache.json'
+NO_ORDER_VALUE_SNIPPET = "Order value not automatically found in PDF."
+
+# --- ANNOUNCEMENT CLASSIFICATION CONFIGURATION ---
+# Each category lists (phrase, weight) pairs matched case-insensitively anywhere in the description. An
+# announcement's score for a category is the summed weight of the distinct phrases found. Categories in
+# ALERT_CATEGORIES go through PDF extraction, the order database and alerts; the rest are only logged.
+ANNOUNCEMENT_CATEGORIES = {
+    "order": [("award of order", 1.0), ("awarding of order", 1.0), ("awarding or bagging", 1.0), ("bagging of order", 1.0),
+              ("bagging/receiving of order", 1.0), ("receives order", 1.0), ("receipt of order", 1.0), ("new order", 1.0),
+              ("bags order", 1.0), ("bagging", 0.5)],
+    "results": [("financial results", 1.0), ("financial result", 1.0), ("quarterly results", 1.0), ("audited results", 1.0),
+                ("unaudited", 0.5), ("outcome of board meeting", 0.5)],
+    "dividend": [("dividend", 1.0), ("record date", 0.5)],
+    "acquisition": [("acquisition", 1.0), ("acquire", 0.5), ("amalgamation", 1.0), ("merger", 1.0), ("scheme of arrangement", 1.0)],
+}
+ALERT_CATEGORIES = {"order"}
+MIN_CATEGORY_SCORE = 0.5
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. acquire() blocks until a token is available. The refill rate adapts:
+    it halves on every throttling response (down to `min_rate`) and creeps back towards `rate`
+    after each successful request.
+    """
+    def __init__(self, rate: float, capacity: int, min_rate: float):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def slow_down(self):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def recover(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+
 
 class NSEAnnouncementAnalyzer:
-    # ... (No changes inside this class) ...
     def __init__(self):
         self.base_url = "https://www.nseindia.com/api/corporate-announcements"
         self.session = requests.Session()
@@ -62,13 +160,20 @@ class NSEAnnouncementAnalyzer:
             'Origin': 'https://www.nseindia.com', 'DNT': '1', 'Sec-Fetch-Dest': 'empty',
             'Sec-Fetch-Mode': 'cors', 'Sec-Fetch-Site': 'same-origin',
         })
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=SCAN_WORKERS * 2)
+        self.session.mount('https://', adapter)
         self.cookies_initialized = False
+        self.rate_limiter = TokenBucket(REQUESTS_PER_SECOND, REQUEST_BURST, MIN_REQUESTS_PER_SECOND)
+        self.session_lock = threading.Lock()
+        self.session_generation = 0
 
     def initialize_session(self) -> bool:
         if self.cookies_initialized: return True
         try:
+            self.rate_limiter.acquire()
             home_response = self.session.get('https://www.nseindia.com/', timeout=20)
             home_response.raise_for_status()
+            self.rate_limiter.acquire()
             announcements_page = self.session.get('https://www.nseindia.com/companies-listing/corporate-filings-announcements', timeout=20)
             announcements_page.raise_for_status()
             time.sleep(random.uniform(1, 2))
@@ -78,75 +183,350 @@ class NSEAnnouncementAnalyzer:
             print(f"Error: Session initialization failed: {e}")
             return False
 
-    def get_date_range(self) -> tuple:
+    def ensure_session(self) -> bool:
+        """Primes cookies if needed. Waits on the session lock, so a re-init in progress is joined rather than repeated."""
+        if self.cookies_initialized: return True
+        with self.session_lock:
+            return self.initialize_session()
+
+    def reinitialize_session(self, seen_generation: int) -> bool:
+        """Re-primes cookies once per expiry: workers that saw the same stale session wait for a single re-init."""
+        with self.session_lock:
+            if self.session_generation != seen_generation:
+                return self.cookies_initialized
+            print("  -> Session expired. Re-initializing...")
+            self.cookies_initialized = False
+            self.session.cookies.clear()
+            ok = self.initialize_session()
+            self.session_generation += 1
+            return ok
+
+    def rate_limited_get(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET through the shared token bucket. 401/403 re-initialize the session and retry; 429 and 5xx
+        halve the bucket's rate and retry after an exponential, jittered backoff (or the server's Retry-After).
+        """
+        response = None
+        for attempt in range(MAX_REQUEST_ATTEMPTS):
+            generation = self.session_generation
+            self.rate_limiter.acquire()
+            response = self.session.get(url, **kwargs)
+            if response.status_code in (401, 403):
+                if not self.reinitialize_session(generation):
+                    return response
+                continue
+            if response.status_code == 429 or response.status_code >= 500:
+                self.rate_limiter.slow_down()
+                retry_after = response.headers.get('Retry-After', '')
+                delay = float(retry_after) if retry_after.isdigit() else min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.5)
+                print(f"  -> Throttled ({response.status_code}). Backing off {delay:.1f}s at {self.rate_limiter.rate:.2f} req/s.")
+                time.sleep(delay)
+                continue
+            self.rate_limiter.recover()
+            return response
+        return response
+
+    def get_date_range(self, since: Optional[datetime] = None) -> tuple:
+        """The API takes whole days: from the day of `since` (clamped to MAX_LOOKBACK_DAYS) up to today."""
         to_date = datetime.now()
-        from_date = to_date - timedelta(days=1)
+        earliest = to_date - timedelta(days=MAX_LOOKBACK_DAYS)
+        from_date = to_date - timedelta(days=INITIAL_LOOKBACK_DAYS) if since is None else max(since, earliest)
         return from_date.strftime("%d-%m-%Y"), to_date.strftime("%d-%m-%Y")
 
-    def fetch_announcements(self, symbol: str) -> Optional[List[Dict]]:
+    def fetch_announcements(self, symbol: Optional[str] = None, since: Optional[datetime] = None, timeout: int = 20) -> Optional[List[Dict]]:
+        """Announcements for one symbol, or for every equity when `symbol` is None, from the day of `since` to today."""
+        label = symbol or "all symbols"
         try:
-            if not self.cookies_initialized:
-                if not self.initialize_session(): return None
-            from_date, to_date = self.get_date_range()
-            params = {'index': 'equities', 'from_date': from_date, 'to_date': to_date, 'symbol': symbol.upper()}
-            response = self.session.get(self.base_url, params=params, timeout=20)
+            if not self.ensure_session(): return None
+            from_date, to_date = self.get_date_range(since)
+            params = {'index': 'equities', 'from_date': from_date, 'to_date': to_date}
+            if symbol:
+                params['symbol'] = symbol.upper()
+            response = self.rate_limited_get(self.base_url, params=params, timeout=timeout)
             if response.status_code == 200:
                 return response.json() if response.text.strip() else []
-            elif response.status_code == 401:
-                self.cookies_initialized = False
-                if self.initialize_session():
-                    response = self.session.get(self.base_url, params=params, timeout=20)
-                    return response.json() if response.status_code == 200 and response.text.strip() else None
+            print(f"  -> {label}: giving up after status {response.status_code}.")
             return None
         except (requests.exceptions.RequestException, json.JSONDecodeError) as e:
-            print(f"  -> Error fetching data for {symbol}: {e}")
+            print(f"  -> Error fetching data for {label}: {e}")
             return None
 
-    def analyze_announcements(self, announcements: List[Dict]) -> List[Dict]:
-        found_orders = []
-        for ann in announcements:
-            pdf_url = ann.get('attchmntFile')
-            order_snippet = None
-            if pdf_url and pdf_url.lower().endswith('.pdf'):
-                order_snippet = self._extract_order_snippet_from_pdf(pdf_url)
-            if not order_snippet:
-                order_snippet = "Order value not automatically found in PDF."
-            found_orders.append({'announcement': ann, 'order_snippet': order_snippet})
-        return found_orders
-
-    def _extract_order_snippet_from_pdf(self, pdf_url: str) -> Optional[str]:
+
+# One pass finds both kinds of amount. The Rs/INR branch only consumes the currency prefix, so the digits
+# after it can still match as a crore/lakh amount (which takes priority); its full extent is re-read with
+# INR_VALUE_PATTERN only when it is needed as the fallback.
+AMOUNT_PATTERN = re.compile(
+    r'(?P<amount>[0-9,.]+\s*\b(?:crore|crores|cr|lakh|lakhs|lac)\b)|(?P<inr>(?:Rs\.?|INR)\s*(?=[0-9]))', re.IGNORECASE)
+INR_VALUE_PATTERN = re.compile(r'((?:Rs\.?|INR)\s*[0-9,]+(?:,\d+)*\/?-?)', re.IGNORECASE)
+# Characters of the previous text searched again with each new page, for amounts split across a page break.
+PAGE_OVERLAP_CHARS = 64
+
+def _clean_pdf_text(text: str) -> str:
+    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+def _snippet_before(text: str, start: int, value: str) -> str:
+    words_before = text[:start].strip().split()
+    return (" ".join(words_before[-15:]) + " " + value).strip()
+
+def extract_order_snippet(pdf_bytes: bytes, max_pages: int = PDF_MAX_PAGES) -> Optional[str]:
+    """
+    The order value with its 15 preceding words, from at most `max_pages` pages. Each page is scanned once,
+    and reading stops at the first crore/lakh amount; the first Rs/INR amount is the fallback.
+    Runs in a worker process.
+    """
+    cleaned_text = ""
+    first_inr = None
+    with io.BytesIO(pdf_bytes) as pdf_file:
+        pdf_reader = PyPDF2.PdfReader(pdf_file)
+        for page in pdf_reader.pages[:max_pages]:
+            page_text = _clean_pdf_text(page.extract_text() or '')
+            if not page_text: continue
+            resume_at = max(0, len(cleaned_text) - PAGE_OVERLAP_CHARS)
+            cleaned_text = f"{cleaned_text} {page_text}" if cleaned_text else page_text
+            for match in AMOUNT_PATTERN.finditer(cleaned_text, resume_at):
+                if match.lastgroup == 'amount':
+                    return _snippet_before(cleaned_text, match.start(), match.group('amount'))
+                if first_inr is None:
+                    first_inr = match.start()
+    if first_inr is None: return None
+    return _snippet_before(cleaned_text, first_inr, INR_VALUE_PATTERN.match(cleaned_text, first_inr).group(1))
+
+
+def _parse_in_child(conn, pdf_bytes: bytes, max_pages: int):
+    try:
+        conn.send((True, extract_order_snippet(pdf_bytes, max_pages)))
+    except Exception as e:
+        conn.send((False, repr(e)))
+    finally:
+        conn.close()
+
+
+class PdfSnippetExtractor:
+    """
+    Downloads attachments through the analyzer's rate-limited session on a thread pool and parses each one in
+    its own worker process, at most PDF_PARSE_WORKERS at a time. The parse timeout starts when the process does,
+    and an overrunning parse is terminated, so one pathological filing holds a single slot for a bounded time.
+    Results are cached by content hash in PDF_CACHE_FILE; futures fail (and nothing is cached) when a PDF
+    cannot be downloaded or parsed.
+    """
+    def __init__(self, analyzer: NSEAnnouncementAnalyzer, cache_file: str = PDF_CACHE_FILE):
+        self.analyzer = analyzer
+        self.cache_file = cache_file
+        self.cache = {}
+        if os.path.exists(cache_file):
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f: self.cache = json.load(f)
+            except json.JSONDecodeError:
+                print(f"Warning: Could not parse '{cache_file}'. Starting with an empty PDF cache.")
+        self.cache_hits = 0
+        self.in_flight = {}
+        self.processes = set()
+        self.lock = threading.Lock()
+        self.parse_slots = threading.Semaphore(PDF_PARSE_WORKERS)
+        self.mp_context = multiprocessing.get_context("spawn")
+        self.downloads = ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="nse-pdf")
+
+    def submit(self, pdf_url: str) -> "Future[Optional[str]]":
+        return self.downloads.submit(self._extract, pdf_url)
+
+    def _extract(self, pdf_url: str) -> Optional[str]:
         try:
-            pdf_response = self.session.get(pdf_url, timeout=30)
+            pdf_response = self.analyzer.rate_limited_get(pdf_url, timeout=30)
             pdf_response.raise_for_status()
-            full_text = ""
-            with io.BytesIO(pdf_response.content) as pdf_file:
-                pdf_reader = PyPDF2.PdfReader(pdf_file)
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text: full_text += page_text.replace('\n', ' ') + ' '
-            if not full_text.strip(): return None
-            cleaned_text = re.sub(r'[^\x00-\x7F]+', ' ', full_text)
-            cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
-            keywords = ['crore', 'crores', 'cr', 'lakh', 'lakhs', 'lac']
-            pattern_with_keyword = r'([0-9,.]+\s*\b(?:' + '|'.join(keywords) + r')\b)'
-            match = re.search(pattern_with_keyword, cleaned_text, re.IGNORECASE)
-            if match:
-                full_value_expression = match.group(1)
-                preceding_text = cleaned_text[:match.start()]
-                words_before = preceding_text.strip().split()
-                snippet = " ".join(words_before[-15:]) + " " + full_value_expression
-                return snippet.strip()
-            pattern_inr_value = r'((?:Rs\.?|INR)\s*[0-9,]+(?:,\d+)*\/?-?)'
-            match = re.search(pattern_inr_value, cleaned_text, re.IGNORECASE)
-            if match:
-                full_value_expression = match.group(1)
-                preceding_text = cleaned_text[:match.start()]
-                words_before = preceding_text.strip().split()
-                snippet = " ".join(words_before[-15:]) + " " + full_value_expression
-                return snippet.strip()
+            digest = hashlib.sha256(pdf_response.content).hexdigest()
+            with self.lock:
+                if digest in self.cache:
+                    self.cache_hits += 1
+                    return self.cache[digest]
+                # The same attachment can be linked from several announcements; share one in-flight parse.
+                shared = self.in_flight.get(digest)
+                owner = shared is None
+                if owner:
+                    shared = self.in_flight[digest] = Future()
+                else:
+                    self.cache_hits += 1
+            if not owner:
+                return shared.result()
+            try:
+                snippet = self._parse(pdf_response.content)
+                with self.lock:
+                    self.cache[digest] = snippet
+                shared.set_result(snippet)
+                return snippet
+            except Exception as e:
+                shared.set_exception(e)
+                raise
+            finally:
+                with self.lock:
+                    self.in_flight.pop(digest, None)
         except Exception as e:
-            print(f"  -> Warning: Could not process PDF {pdf_url}. Reason: {e}")
-            return None
+            print(f"  -> Warning: Could not process PDF {pdf_url}. Reason: {e!r}")
+            raise
+
+    def _parse(self, pdf_bytes: bytes) -> Optional[str]:
+        with self.parse_slots:
+            receiver, sender = self.mp_context.Pipe(duplex=False)
+            process = self.mp_context.Process(target=_parse_in_child, args=(sender, pdf_bytes, PDF_MAX_PAGES), daemon=True)
+            process.start()
+            sender.close()
+            with self.lock:
+                self.processes.add(process)
+            try:
+                if not receiver.poll(PDF_PARSE_TIMEOUT_SECONDS):
+                    raise TimeoutError(f"parse exceeded {PDF_PARSE_TIMEOUT_SECONDS}s")
+                ok, value = receiver.recv()
+            except EOFError:
+                raise RuntimeError(f"parser process exited with code {process.exitcode}") from None
+            finally:
+                if process.is_alive():
+                    process.terminate()
+                process.join(timeout=5)
+                receiver.close()
+                with self.lock:
+                    self.processes.discard(process)
+        if not ok:
+            raise RuntimeError(value)
+        return value
+
+    def close(self):
+        """Stops without waiting: queued downloads are cancelled and running parses are terminated."""
+        self.downloads.shutdown(wait=False, cancel_futures=True)
+        with self.lock:
+            for process in self.processes:
+                process.terminate()
+            with open(self.cache_file, 'w', encoding='utf-8') as f: json.dump(self.cache, f)
+        print(f"PDF cache: {len(self.cache)} attachment(s), {self.cache_hits} hit(s) this run.")
+
+class OrdersStore:
+    """Order announcements keyed by (symbol, link), indexed for the dedupe lookups and date-ordered export."""
+    def __init__(self, path: str = ORDERS_DB_FILE):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS orders (
+                id          INTEGER PRIMARY KEY AUTOINCREMENT,
+                date        TEXT NOT NULL,
+                symbol      TEXT NOT NULL,
+                description TEXT,
+                order_value TEXT,
+                link        TEXT NOT NULL,
+                snippet_pending  INTEGER NOT NULL DEFAULT 0,
+                snippet_attempts INTEGER NOT NULL DEFAULT 0,
+                UNIQUE (symbol, link)
+            );
+            CREATE INDEX IF NOT EXISTS orders_by_date ON orders(date);
+            CREATE INDEX IF NOT EXISTS orders_by_link ON orders(link);
+            CREATE TABLE IF NOT EXISTS scan_marks (
+                symbol          TEXT PRIMARY KEY,
+                last_seen       TEXT,
+                scanned_through TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS export_state (
+                key   TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+        """)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(orders)")}
+        for column in ('snippet_pending', 'snippet_attempts'):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE orders ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0")
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def max_order_id(self) -> int:
+        return self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM orders").fetchone()[0]
+
+    def published_order_id(self) -> int:
+        """Highest order id included in the last export that was also synced to the website."""
+        row = self.conn.execute("SELECT value FROM export_state WHERE key = 'published_order_id'").fetchone()
+        return int(row[0]) if row else 0
+
+    def mark_published(self, order_id: int):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO export_state (key, value) VALUES ('published_order_id', ?)", (str(order_id),))
+
+    def has(self, symbol: str, link: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM orders WHERE symbol = ? AND link = ?", (symbol, link)).fetchone() is not None
+
+    def add(self, order_data: Dict, snippet_pending: bool = False) -> bool:
+        with self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO orders (date, symbol, description, order_value, link, snippet_pending, snippet_attempts) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (order_data['date'], order_data['symbol'], order_data['description'], order_data['order_value'], order_data['link'],
+                 int(snippet_pending), int(snippet_pending)))
+        return cursor.rowcount == 1
+
+    def pending_snippets(self) -> List[tuple]:
+        """(id, link) of orders whose PDF could not be read yet and still have attempts left."""
+        return self.conn.execute("SELECT id, link FROM orders WHERE snippet_pending = 1 AND snippet_attempts < ?", (PDF_MAX_ATTEMPTS,)).fetchall()
+
+    def set_snippet(self, order_id: int, order_value: str):
+        with self.conn:
+            self.conn.execute("UPDATE orders SET order_value = ?, snippet_pending = 0 WHERE id = ?", (order_value, order_id))
+            # The exported file has the old value for this order: move the published mark below it.
+            self.conn.execute("UPDATE export_state SET value = MIN(CAST(value AS INTEGER), ?) WHERE key = 'published_order_id'", (order_id - 1,))
+
+    def snippet_failed(self, order_id: int):
+        with self.conn:
+            self.conn.execute("UPDATE orders SET snippet_attempts = snippet_attempts + 1 WHERE id = ?", (order_id,))
+
+    def import_js(self, js_file: str) -> int:
+        """One-time migration from the JS file the scanner used to maintain by hand."""
+        with open(js_file, 'r', encoding='utf-8') as f:
+            json_str = f.read().strip().replace('const ordersData = ', '').rstrip(';')
+        orders = json.loads(json_str) if json_str else []
+        # Oldest date first, keeping the file's order within a date, so the export reproduces the file's order.
+        return sum(self.add(order) for order in sorted(orders, key=lambda order: order['date']))
+
+    def orders(self, year: Optional[str] = None) -> List[Dict]:
+        query = "SELECT date, symbol, description, order_value, link FROM orders"
+        params = ()
+        if year:
+            query, params = query + " WHERE date LIKE ?", (f"{year}-%",)
+        rows = self.conn.execute(query + " ORDER BY date DESC, id ASC", params).fetchall()
+        return [dict(zip(('date', 'symbol', 'description', 'order_value', 'link'), row)) for row in rows]
+
+    def export_js(self, js_file: str, partition_by_year: bool = False) -> List[str]:
+        """Writes the compact `const ordersData = [...]` file(s) atomically and returns their paths."""
+        exports = {js_file: None}
+        if partition_by_year:
+            base, ext = os.path.splitext(js_file)
+            for (year,) in self.conn.execute("SELECT DISTINCT substr(date, 1, 4) FROM orders"):
+                exports[f"{base}_{year}{ext}"] = year
+        for path, year in exports.items():
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write("const ordersData = ")
+                json.dump(self.orders(year), f, separators=(',', ':'), ensure_ascii=False)
+                f.write(";")
+            os.replace(tmp_path, path)
+        return list(exports)
+
+    def scan_marks(self) -> Dict[str, "ScanMark"]:
+        rows = self.conn.execute("SELECT symbol, last_seen, scanned_through FROM scan_marks")
+        return {symbol: ScanMark(datetime.fromisoformat(last_seen) if last_seen else None, datetime.fromisoformat(scanned_through))
+                for symbol, last_seen, scanned_through in rows}
+
+    def save_scan_marks(self, marks: Dict[str, "ScanMark"]):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO scan_marks (symbol, last_seen, scanned_through) VALUES (?, ?, ?)",
+                [(symbol, mark.last_seen.isoformat() if mark.last_seen else None, mark.scanned_through.isoformat())
+                 for symbol, mark in marks.items()])
+
+    def close(self):
+        self.conn.close()
+
+class ScanMark(NamedTuple):
+    """Per-symbol high-water mark: newest announcement processed and when the symbol was last fetched successfully."""
+    last_seen: Optional[datetime]
+    scanned_through: datetime
+
+def announcement_time(ann: Dict) -> Optional[datetime]:
+    try:
+        return datetime.strptime(ann.get('an_dt', ''), '%d-%b-%Y %H:%M:%S')
+    except (ValueError, TypeError):
         return None
 
 def send_telegram_alert(message: str):
@@ -190,95 +570,219 @@ def send_email_alert(order_data: Dict):
     except Exception as e:
         print(f"  -> ERROR: Failed to send email alert: {e}")
 
-def sync_database_file():
-    if not ENABLE_RSYNC_UPLOAD: return
+def sync_database_file(files: Optional[List[str]] = None) -> bool:
+    """Returns True once the files are on the server (or uploads are disabled)."""
+    if not ENABLE_RSYNC_UPLOAD: return True
     print("  -> [DEBUG] Attempting to sync database to remote server...")
     try:
-        command = ['rsync', '-avz', '-e', f'ssh -i {RSYNC_PEM_KEY}', RSYNC_SOURCE_FILE, RSYNC_DESTINATION]
+        files = files or [RSYNC_SOURCE_FILE]
+        # Several files (year partitions) go to the destination's directory; the main file alone keeps its exact target.
+        destination = RSYNC_DESTINATION if files == [RSYNC_SOURCE_FILE] else RSYNC_DESTINATION.rsplit('/', 1)[0] + '/'
+        command = ['rsync', '-avz', '-e', f'ssh -i {RSYNC_PEM_KEY}', *files, destination]
         print(f"  -> [DEBUG] Executing command: {' '.join(command)}")
         # --- ADDED A 120-SECOND TIMEOUT ---
         result = subprocess.run(command, capture_output=True, text=True, check=False, timeout=120)
         if result.stdout: print(f"  -> [DEBUG] rsync stdout:\n{result.stdout.strip()}")
         if result.stderr: print(f"  -> [DEBUG] rsync stderr:\n{result.stderr.strip()}")
-        if result.returncode == 0: print("  -> Sync successful.")
-        else: print(f"  -> ERROR: rsync command failed with exit code {result.returncode}.")
+        if result.returncode == 0:
+            print("  -> Sync successful.")
+            return True
+        print(f"  -> ERROR: rsync command failed with exit code {result.returncode}.")
     except subprocess.TimeoutExpired:
         print(f"  -> ERROR: rsync command timed out after 120 seconds.")
     except FileNotFoundError:
         print(f"  -> ERROR: 'rsync' command not found.")
     except Exception as e:
         print(f"  -> An unexpected error occurred during rsync: {e}")
+    return False
+
+def publish_orders(store: "OrdersStore", js_file: str):
+    """
+    Exports and syncs the JS file whenever the store holds orders the website has not received yet. The
+    published high-water mark lives in the store, so orders added by a run that was killed before its own
+    export (or whose rsync failed) go out with the next run.
+    """
+    latest = store.max_order_id()
+    if latest <= store.published_order_id() and os.path.exists(js_file):
+        return
+    exported = store.export_js(js_file, partition_by_year=EXPORT_PARTITION_BY_YEAR)
+    print(f"Exported {len(store)} orders to {', '.join(exported)}.")
+    if sync_database_file(exported):
+        store.mark_published(latest)
+
+class AnnouncementClassifier:
+    """
+    Scores text against every category with one precompiled alternation of all phrases (longest first), so
+    classification is a single pass over the text however many categories and phrases are configured. The
+    alternation sits in a lookahead, so it is tried at every position and overlapping phrases all count; a
+    match at a position also implies every shorter phrase that is a prefix of it.
+    """
+    def __init__(self, categories: Dict[str, List[tuple]] = ANNOUNCEMENT_CATEGORIES, min_score: float = MIN_CATEGORY_SCORE):
+        self.min_score = min_score
+        self.phrases = {}
+        for category, phrases in categories.items():
+            for phrase, weight in phrases:
+                self.phrases.setdefault(phrase.lower(), []).append((category, weight))
+        self.prefixes = {phrase: [other for other in self.phrases if other != phrase and phrase.startswith(other)] for phrase in self.phrases}
+        alternation = '|'.join(re.escape(phrase) for phrase in sorted(self.phrases, key=len, reverse=True))
+        self.pattern = re.compile(f"(?=({alternation}))", re.IGNORECASE)
+
+    def scores(self, text: str) -> Dict[str, float]:
+        found = set()
+        for match in self.pattern.finditer(text or ''):
+            phrase = match.group(1).lower()
+            found.add(phrase)
+            found.update(self.prefixes[phrase])
+        scores = {}
+        for phrase in found:
+            for category, weight in self.phrases[phrase]:
+                scores[category] = scores.get(category, 0.0) + weight
+        return {category: score for category, score in scores.items() if score >= self.min_score}
+
+    def classify(self, ann: Dict) -> Dict[str, float]:
+        return self.scores(ann.get('desc', ''))
 
 def main():
     print("NSE Corporate Announcements Daily Scanner")
     print("="*55)
     SYMBOLS_FILE = 'symbols.txt'
     DB_FILE = RSYNC_SOURCE_FILE
-    all_orders = []
-    if os.path.exists(DB_FILE):
-        with open(DB_FILE, 'r', encoding='utf-8') as f:
-            content = f.read()
-            json_str = content.strip().replace('const ordersData = ', '').rstrip(';')
-            if json_str:
-                try: all_orders = json.loads(json_str)
-                except json.JSONDecodeError: print(f"Warning: Could not parse '{DB_FILE}'.")
-    seen_order_ids = {f"{order['symbol']}_{order['link']}" for order in all_orders}
+    store = OrdersStore()
+    if len(store) == 0 and os.path.exists(DB_FILE):
+        try: print(f"Imported {store.import_js(DB_FILE)} orders from '{DB_FILE}' into '{ORDERS_DB_FILE}'.")
+        except json.JSONDecodeError: print(f"Warning: Could not parse '{DB_FILE}'.")
+    # Catch up on orders a previous run stored but never published.
+    publish_orders(store, DB_FILE)
     with open(SYMBOLS_FILE, 'r', encoding='utf-8') as f:
         symbols = [line.strip().upper() for line in f if line.strip()]
     analyzer = NSEAnnouncementAnalyzer()
     print(f"Scanning {len(symbols)} symbols...")
-    print(f"Database will be updated in '{DB_FILE}'\n")
+    print(f"Orders are stored in '{ORDERS_DB_FILE}' and exported to '{DB_FILE}' at the end of the scan.\n")
     new_orders_found_this_run = 0
     if not analyzer.initialize_session():
         print("Exiting due to session initialization failure.")
         return
-    for i, symbol in enumerate(symbols):
-        try:
-            print(f"[{i+1}/{len(symbols)}] Processing {symbol}...")
-            announcements = analyzer.fetch_announcements(symbol)
-            if announcements:
-                for all_ann in announcements: print(f"  -> Announcement: {all_ann}")
-                order_keywords = [ "award of order", "awarding of order", "awarding or bagging", "bagging of order", "bagging/receiving of order", "receives order", "receipt of order", "new order", "bags order", "bagging" ]
-                order_related = [ann for ann in announcements if 'desc' in ann and any(phrase in ann['desc'].lower() for phrase in order_keywords)]
-                if order_related:
-                    found_orders = analyzer.analyze_announcements(order_related)
-                    is_db_updated = False
-                    for order in found_orders:
-                        ann = order['announcement']
-                        pdf_link = ann.get('attchmntFile', '')
-                        unique_id = f"{ann.get('symbol', '')}_{pdf_link}"
-                        if unique_id not in seen_order_ids:
-                            print(f"  -> NEW ORDER FOUND: {ann.get('symbol')}")
-                            new_orders_found_this_run += 1
-                            is_db_updated = True
-                            try:
-                                date_str = datetime.strptime(ann.get('an_dt', ''), '%d-%b-%Y %H:%M:%S').strftime('%Y-%m-%d')
-                            except (ValueError, TypeError):
-                                date_str = datetime.now().strftime('%Y-%m-%d')
-                            order_data = {'date': date_str, 'symbol': ann.get('symbol', 'N/A'), 'description': ann.get('desc', 'N/A'), 'order_value': order['order_snippet'], 'link': pdf_link}
-                            all_orders.append(order_data)
-                            seen_order_ids.add(unique_id)
-                            send_email_alert(order_data)
-                    if is_db_updated:
-                        all_orders.sort(key=lambda x: x['date'], reverse=True)
-                        with open(DB_FILE, 'w', encoding='utf-8') as f:
-                            f.write("const ordersData = ")
-                            json.dump(all_orders, f, indent=2)
-                            f.write(";")
-                        print(f"  -> Database '{DB_FILE}' updated locally.")
-                        sync_database_file()
-        except Exception as e:
-            print(f"  -> CRITICAL ERROR for {symbol}: {e}.")
-        finally:
-            time.sleep(random.uniform(2.0, 4.0))
+
+    def record_order(ann: Dict, order_snippet: Optional[str], snippet_pending: bool = False):
+        nonlocal new_orders_found_this_run
+        print(f"  -> NEW ORDER FOUND: {ann.get('symbol')}")
+        new_orders_found_this_run += 1
+        date_str = (announcement_time(ann) or datetime.now()).strftime('%Y-%m-%d')
+        order_data = {'date': date_str, 'symbol': ann.get('symbol', 'N/A'), 'description': ann.get('desc', 'N/A'), 'order_value': order_snippet or NO_ORDER_VALUE_SNIPPET, 'link': ann.get('attchmntFile', '')}
+        store.add(order_data, snippet_pending=snippet_pending)
+        send_email_alert(order_data)
+
+    started = time.monotonic()
+    scan_started = datetime.now()
+    marks = store.scan_marks()
+    updated_marks = {}
+    pdf_extractor = PdfSnippetExtractor(analyzer)
+    classifier = AnnouncementClassifier()
+    category_counts = {}
+    queued_orders = set()
+    pending = {}
+    scanned = 0
+    # Orders from earlier runs whose PDF could not be read are retried alongside the scan.
+    for order_id, pdf_link in store.pending_snippets():
+        pending[pdf_extractor.submit(pdf_link)] = ('retry', order_id)
+
+    def handle_announcements(symbol: str, announcements: List[Dict]):
+        """Processes one symbol's fetched announcements beyond its high-water mark and advances the mark."""
+        nonlocal scanned
+        scanned += 1
+        mark = marks.get(symbol)
+        last_seen = mark.last_seen if mark else None
+        fresh = [ann for ann in announcements if last_seen is None or (announcement_time(ann) or scan_started) > last_seen]
+        print(f"[{scanned}/{len(symbols)}] Processed {symbol}: {len(fresh)} new announcement(s).")
+        for all_ann in fresh: print(f"  -> [{symbol}] Announcement: {all_ann}")
+        alert_anns = []
+        for ann in fresh:
+            ann_scores = classifier.classify(ann)
+            if not ann_scores: continue
+            print(f"  -> [{symbol}] Classified: " + ", ".join(f"{category}={score:g}" for category, score in sorted(ann_scores.items(), key=lambda item: -item[1])))
+            for category in ann_scores: category_counts[category] = category_counts.get(category, 0) + 1
+            if ALERT_CATEGORIES & ann_scores.keys(): alert_anns.append(ann)
+        newest = max(filter(None, map(announcement_time, fresh)), default=last_seen)
+        updated_marks[symbol] = ScanMark(max(newest, last_seen) if last_seen else newest, scan_started)
+        for ann in alert_anns:
+            pdf_link = ann.get('attchmntFile', '')
+            order_key = (ann.get('symbol', ''), pdf_link)
+            if order_key in queued_orders or store.has(*order_key): continue
+            queued_orders.add(order_key)
+            if pdf_link and pdf_link.lower().endswith('.pdf'):
+                pending[pdf_extractor.submit(pdf_link)] = ('pdf', ann)
+            else:
+                record_order(ann, None)
+
+    scan_pool = ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="nse-scan")
+    try:
+        # The least recently scanned known symbol (clamped to MAX_LOOKBACK_DAYS by get_date_range). The bulk window
+        # starts there, and symbols without a mark get the same window; only a first run uses the initial lookback.
+        since = min((marks[symbol].scanned_through for symbol in symbols if symbol in marks), default=None)
+        bulk = None
+        if BULK_FETCH:
+            print(f"Fetching all announcements since {analyzer.get_date_range(since)[0]} in one request...")
+            bulk = analyzer.fetch_announcements(since=since, timeout=60)
+            if bulk is None:
+                print("  -> Bulk fetch failed. Falling back to per-symbol requests.")
+        if bulk is not None:
+            by_symbol = {}
+            for ann in bulk:
+                by_symbol.setdefault(str(ann.get('symbol', '')).upper(), []).append(ann)
+            for symbol in symbols:
+                handle_announcements(symbol, by_symbol.get(symbol, []))
+        else:
+            for symbol in symbols:
+                mark = marks.get(symbol)
+                pending[scan_pool.submit(analyzer.fetch_announcements, symbol, mark.scanned_through if mark else since)] = ('scan', symbol)
+
+        # Symbol scans and PDF extractions complete in any order; both are handled on this thread only,
+        # so the database and alerts need no locking. Only announcements not already in the database reach the PDF pool.
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, item = pending.pop(future)
+                try:
+                    if kind == 'pdf':
+                        if future.exception():
+                            record_order(item, None, snippet_pending=True)
+                        else:
+                            record_order(item, future.result())
+                        continue
+                    if kind == 'retry':
+                        if future.exception():
+                            store.snippet_failed(item)
+                        else:
+                            store.set_snippet(item, future.result() or NO_ORDER_VALUE_SNIPPET)
+                        continue
+                    announcements = future.result()
+                    if announcements is None:
+                        scanned += 1
+                        print(f"[{scanned}/{len(symbols)}] Skipped {item}: fetch failed; its high-water mark is unchanged.")
+                        continue
+                    handle_announcements(item, announcements)
+                except Exception as e:
+                    print(f"  -> CRITICAL ERROR for {item.get('symbol') if kind == 'pdf' else item}: {e}.")
+        # Marks only advance after a full pass, so an interrupted scan re-fetches what it had not finished recording.
+        store.save_scan_marks(updated_marks)
+    finally:
+        # Publish first: tearing down the pools never waits on a hung download or parse.
+        publish_orders(store, DB_FILE)
+        scan_pool.shutdown(wait=False, cancel_futures=True)
+        pdf_extractor.close()
+        store.close()
     print("\n" + "="*55)
-    print("Scan complete.")
+    print(f"Scan complete in {time.monotonic() - started:.0f}s.")
+    if category_counts:
+        print("Classified announcements: " + ", ".join(f"{category}: {count}" for category, count in sorted(category_counts.items())))
     if new_orders_found_this_run > 0:
         print(f"Found and processed {new_orders_found_this_run} new order announcements.")
     else:
         print("No new order announcements were found in this run.")
 
 if __name__ == "__main__":
+    # gtimeout ends the scan with SIGTERM; turning it into SystemExit lets main's cleanup publish stored orders.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
     # --- THIS WRAPPER HANDLES THE SELF-HEALING LOCK ---
     try:
         with pid.PidFile(pidname="nse_scanner", piddir="."):
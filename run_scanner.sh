@@ -10,10 +10,10 @@ VENV_PYTHON_PATH="/Users/a9768030444/orapps/prj/newtrade/venv/bin/python"
 # Navigate to the project directory
 cd "$PROJECT_DIR" || exit
 
-echo "Starting NSE Scanner with a 2-hour timeout... ($(date))"
+echo "Starting NSE Scanner with a 30-minute timeout... ($(date))"
 
 # The Python script will now fix its own path internally.
-/opt/homebrew/bin/gtimeout 2h "$VENV_PYTHON_PATH" nse_announcements_analyzer.py
+/opt/homebrew/bin/gtimeout 30m "$VENV_PYTHON_PATH" nse_announcements_analyzer.py
 
 # --- CORRECTED FINAL LINE ---
 # Using 'printf' is safer than 'echo' for printing strings with special characters
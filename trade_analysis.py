@@ -1,16 +1,24 @@
 # --- START OF FILE trade_analysis.py ---
 
 import argparse
+import os
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import numpy as np
+import pandas as pd
 from breeze_connect import BreezeConnect
-from collections import OrderedDict
-from datetime import date, datetime, timedelta
 
 # --- START: Date Configuration ---
-start_date_str = "2025-09-01T06:00:00.000Z"
-today_date_str = date.today().strftime("%Y-%m-%dT06:00:00.000Z")
+HISTORY_START = date(2025, 9, 1)
+API_DATE_FORMAT = "%Y-%m-%dT06:00:00.000Z"
+TRADE_DATE_FORMAT = "%d-%b-%Y"
 # --- END: Date Configuration ---
 
+# Raw trade-list rows are cached per instance, so each run only asks the API for the days since the last one.
+TRADE_CACHE_DIR = os.path.join("data", "trade_cache")
+
 
 # --- START: Centralized Instance Configuration ---
 INSTANCE_CONFIG = {
@@ -33,242 +41,291 @@ INSTANCE_CONFIG = {
 }
 # --- END: Centralized Instance Configuration ---
 
-def pair_trades(trades):
-    open_positions = {}
-    completed_trades = []
-    def get_contract_id(trade):
-        return f"{trade['expiry_date']}-{trade['strike_price']}-{trade['right']}"
-    for trade in trades:
-        contract_id = get_contract_id(trade)
-        if contract_id in open_positions:
-            entry_trade = open_positions.pop(contract_id)
-            exit_trade = trade
-            completed_trades.append((entry_trade, exit_trade))
-        else:
-            open_positions[contract_id] = trade
-    return completed_trades, open_positions
-
-def analyze_and_print_summary(api_response):
-    if "Success" not in api_response or not api_response["Success"]:
-        if "Error" in api_response and api_response["Error"]:
-             print(f"API Error: {api_response['Error']}")
-        else:
-             print("Could not retrieve trade data. The 'Success' key is missing or empty in the response.")
-        return
-
-    completed_trades, open_positions = pair_trades(api_response["Success"])
-    daily_summary = {}
 
-    for entry_trade, exit_trade in completed_trades:
-        if entry_trade['action'].lower() == 'buy' and exit_trade['action'].lower() == 'sell':
-            buy_trade, sell_trade = entry_trade, exit_trade
-        elif exit_trade['action'].lower() == 'buy' and entry_trade['action'].lower() == 'sell':
-            buy_trade, sell_trade = exit_trade, entry_trade
-        else:
-            continue
 
-        try:
-            sell_value = float(sell_trade['average_cost']) * int(sell_trade['quantity'])
-            buy_value = float(buy_trade['average_cost']) * int(buy_trade['quantity'])
-            
-            sell_charges = float(sell_trade['brokerage_amount']) + float(sell_trade['total_taxes'])
-            buy_charges = float(buy_trade['brokerage_amount']) + float(buy_trade['total_taxes'])
-            total_pair_charges = sell_charges + buy_charges
-            net_pl = (sell_value - buy_value) - total_pair_charges
-
-            trade_date = sell_trade['trade_date']
-            if trade_date not in daily_summary:
-                daily_summary[trade_date] = {'profitable': 0, 'loss_making': 0, 'net_pl': 0.0, 'total_charges': 0.0}
-            
-            daily_summary[trade_date]['profitable'] += 1 if net_pl > 0 else 0
-            daily_summary[trade_date]['loss_making'] += 1 if net_pl <= 0 else 0
-            daily_summary[trade_date]['net_pl'] += net_pl
-            daily_summary[trade_date]['total_charges'] += total_pair_charges
-
-        except (ValueError, KeyError) as e:
-            print(f"Skipping a trade pair due to data error: {e}")
-            continue
-
-    sorted_summary = OrderedDict(sorted(daily_summary.items(), key=lambda item: datetime.strptime(item[0], '%d-%b-%Y')))
-
-    print("\nDaily Transactions Summary")
-    print("--------------------------")
-    header = f"{'Trade Date':<16} | {'Profit':>6} | {'Loss':>5} | {'Charges':>10} | {'Net Pnl':>12}"
+# ==============================================================================
+# --- TRADE CACHE ---
+# ==============================================================================
+def trade_cache_path(instance):
+    return os.path.join(TRADE_CACHE_DIR, f"trades_{instance}.csv")
+
+def fetch_trade_list(breeze, from_date, to_date):
+    response = breeze.get_trade_list(from_date=from_date.strftime(API_DATE_FORMAT), to_date=to_date.strftime(API_DATE_FORMAT),
+                                     exchange_code="NFO", product_type="", action="", stock_code="")
+    if not response or not response.get("Success"):
+        if response and response.get("Error"):
+            raise RuntimeError(f"API Error: {response['Error']}")
+        return pd.DataFrame()
+    return pd.DataFrame(response["Success"]).fillna("").astype(str)
+
+def load_trades(breeze, instance, refresh=False):
+    """
+    Raw trade-list rows for `instance`: the local cache plus everything the API reports from the last
+    cached trade date onwards. That last day is fetched again in full, since it may have been cached
+    mid-session. `refresh` ignores the cache and refetches from HISTORY_START.
+    """
+    path = trade_cache_path(instance)
+    cached = pd.DataFrame()
+    if os.path.exists(path) and not refresh:
+        cached = pd.read_csv(path, dtype=str, keep_default_na=False)
+
+    from_date = HISTORY_START
+    cached_dates = None
+    if not cached.empty:
+        cached_dates = pd.to_datetime(cached["trade_date"], format=TRADE_DATE_FORMAT).dt.date
+        from_date = cached_dates.max()
+
+    print(f"[{instance}] Fetching trades from {from_date} to {date.today()} ({len(cached)} cached)...")
+    fresh = fetch_trade_list(breeze, from_date, date.today())
+    if fresh.empty and not cached.empty:
+        # The last cached day had trades, so an empty refetch means the API returned nothing usable:
+        # keep the cache as it is rather than losing that day.
+        print(f"[{instance}] ⚠️ No trades returned from {from_date}; using the cache unchanged.")
+        return cached.assign(instance=instance)
+    if cached_dates is not None:
+        cached = cached[cached_dates < from_date]
+    trades = pd.concat([cached, fresh], ignore_index=True).fillna("")
+
+    os.makedirs(TRADE_CACHE_DIR, exist_ok=True)
+    trades.to_csv(path, index=False)
+    return trades.assign(instance=instance)
+
+
+# ==============================================================================
+# --- VECTORIZED PAIRING AND AGGREGATION ---
+# ==============================================================================
+POSITION_KEYS = ["instance", "contract"]
+
+def build_fills(raw):
+    """Numeric fill rows ordered per contract, with each fill's cumulative quantity range on its side."""
+    if raw.empty:
+        return pd.DataFrame(columns=POSITION_KEYS + ["side", "qty", "price", "charges", "trade_date", "order_id", "seq", "cum_start", "cum_end"])
+    fills = pd.DataFrame({
+        "instance": raw["instance"],
+        "contract": raw["stock_code"] + " " + raw["expiry_date"] + " " + raw["strike_price"] + " " + raw["right"],
+        "side": raw["action"].str.lower(),
+        "qty": pd.to_numeric(raw["quantity"], errors="coerce"),
+        "price": pd.to_numeric(raw["average_cost"], errors="coerce"),
+        "charges": pd.to_numeric(raw["brokerage_amount"], errors="coerce") + pd.to_numeric(raw["total_taxes"], errors="coerce"),
+        "trade_date": pd.to_datetime(raw["trade_date"], format=TRADE_DATE_FORMAT, errors="coerce"),
+        "order_id": raw["order_id"],
+    })
+    invalid = fills[["qty", "price", "charges", "trade_date"]].isna().any(axis=1) | ~fills["side"].isin(["buy", "sell"]) | (fills["qty"] <= 0)
+    if invalid.any():
+        print(f"Skipping {int(invalid.sum())} trade row(s) due to missing or invalid fields.")
+    fills = fills[~invalid].astype({"qty": np.int64})
+    fills = fills.sort_values(POSITION_KEYS + ["trade_date", "order_id"], kind="stable").reset_index(drop=True)
+    fills["seq"] = np.arange(len(fills))
+    fills["cum_end"] = fills.groupby(POSITION_KEYS + ["side"])["qty"].cumsum()
+    fills["cum_start"] = fills["cum_end"] - fills["qty"]
+    return fills
+
+def _matched_qty(fills):
+    totals = fills.pivot_table(index=POSITION_KEYS, columns="side", values="qty", aggfunc="sum", fill_value=0)
+    return totals.reindex(columns=["buy", "sell"], fill_value=0).min(axis=1).rename("matched")
+
+def _side_legs(fills, side):
+    columns = ["cum_start", "qty", "price", "charges", "seq", "order_id", "trade_date"]
+    legs = fills.loc[fills["side"] == side, POSITION_KEYS + columns]
+    return legs.rename(columns={c: f"{side}_{c}" for c in columns}).sort_values(f"{side}_cum_start")
+
+def match_round_trips(fills):
+    """
+    FIFO pairing of buys and sells per contract. The n-th unit bought is matched with the n-th unit
+    sold, so partial fills, scaling in/out and repeated round trips on one contract all pair up
+    without a per-trade loop. Matched lots are rolled up to one row per closing order.
+    """
+    if fills.empty:
+        return pd.DataFrame(columns=POSITION_KEYS + ["trade_date", "qty", "buy_price", "sell_price", "charges", "net_pl", "entry_order_id"])
+    # Segment boundaries are every cumulative fill quantity on either side, up to the matched total.
+    bounds = fills[POSITION_KEYS + ["cum_end"]].drop_duplicates().join(_matched_qty(fills), on=POSITION_KEYS)
+    segments = bounds[bounds["cum_end"] <= bounds["matched"]].sort_values(POSITION_KEYS + ["cum_end"])
+    segments = segments.assign(start=segments.groupby(POSITION_KEYS)["cum_end"].shift(fill_value=0))
+    segments["lot"] = segments["cum_end"] - segments["start"]
+    for side in ("buy", "sell"):
+        segments = pd.merge_asof(segments.sort_values("start"), _side_legs(fills, side),
+                                 left_on="start", right_on=f"{side}_cum_start", by=POSITION_KEYS)
+
+    lot = segments["lot"]
+    closes_on_buy = segments["buy_seq"] > segments["sell_seq"]
+    segments = segments.assign(
+        buy_value=segments["buy_price"] * lot,
+        sell_value=segments["sell_price"] * lot,
+        charges=(segments["buy_charges"] / segments["buy_qty"] + segments["sell_charges"] / segments["sell_qty"]) * lot,
+        close_order_id=segments["buy_order_id"].where(closes_on_buy, segments["sell_order_id"]),
+        trade_date=segments["buy_trade_date"].where(closes_on_buy, segments["sell_trade_date"]),
+        entry_order_id=segments["sell_order_id"].where(closes_on_buy, segments["buy_order_id"]),
+    )
+    trades = segments.groupby(POSITION_KEYS + ["close_order_id"], sort=False).agg(
+        trade_date=("trade_date", "max"), qty=("lot", "sum"), buy_value=("buy_value", "sum"),
+        sell_value=("sell_value", "sum"), charges=("charges", "sum"), entry_order_id=("entry_order_id", "min"),
+    ).reset_index()
+    trades["buy_price"] = trades["buy_value"] / trades["qty"]
+    trades["sell_price"] = trades["sell_value"] / trades["qty"]
+    trades["net_pl"] = trades["sell_value"] - trades["buy_value"] - trades["charges"]
+    return trades.sort_values(["entry_order_id", "instance"], kind="stable").reset_index(drop=True)
+
+def open_positions(fills):
+    """Unmatched remainder of each fill: the quantity beyond the contract's matched total on its side."""
+    if fills.empty:
+        return fills
+    fills = fills.join(_matched_qty(fills), on=POSITION_KEYS)
+    open_qty = (fills["cum_end"] - np.maximum(fills["cum_start"], fills["matched"])).clip(lower=0)
+    return fills.assign(open_qty=open_qty)[open_qty > 0]
+
+def summarize_trades(trades):
+    """Daily totals per instance in one groupby; monthly and cross-instance views roll these up."""
+    daily = trades.assign(profitable=trades["net_pl"] > 0).groupby(["instance", "trade_date"]).agg(
+        profitable=("profitable", "sum"), trades=("net_pl", "size"), total_charges=("charges", "sum"), net_pl=("net_pl", "sum"))
+    daily["loss_making"] = daily["trades"] - daily["profitable"]
+    return daily
+
+def rollup(daily, by):
+    return daily.groupby(by).sum()
+
+
+# ==============================================================================
+# --- REPORTS ---
+# ==============================================================================
+def print_summary_table(title, label_header, summary, format_label=str):
+    print(f"\n{title}")
+    print("-" * len(title))
+    header = f"{label_header:<16} | {'Profit':>6} | {'Loss':>5} | {'Charges':>10} | {'Net Pnl':>12}"
     print(header)
     print("-" * len(header))
-
-    total_profitable, total_loss_making, total_charges, total_net_pl = 0, 0, 0.0, 0.0
-    for date_str, data in sorted_summary.items():
-        date_obj = datetime.strptime(date_str, '%d-%b-%Y')
-        formatted_date = date_obj.strftime('%a, %d-%b-%Y')
-        total_profitable += data['profitable']
-        total_loss_making += data['loss_making']
-        total_charges += data['total_charges']
-        total_net_pl += data['net_pl']
-        print(f"{formatted_date:<16} | {data['profitable']:>6} | {data['loss_making']:>5} | {data['total_charges']:>10,.2f} | {data['net_pl']:>12,.2f}")
-
+    for label, row in summary.iterrows():
+        print(f"{format_label(label):<16} | {int(row['profitable']):>6} | {int(row['loss_making']):>5} | {row['total_charges']:>10,.2f} | {row['net_pl']:>12,.2f}")
     print("-" * len(header))
-    print(f"{'Total':<16} | {total_profitable:>6} | {total_loss_making:>5} | {total_charges:>10,.2f} | {total_net_pl:>12,.2f}")
+    totals = summary[["profitable", "loss_making", "total_charges", "net_pl"]].sum()
+    print(f"{'Total':<16} | {int(totals['profitable']):>6} | {int(totals['loss_making']):>5} | {totals['total_charges']:>10,.2f} | {totals['net_pl']:>12,.2f}")
     print("-" * len(header))
 
-    if open_positions:
-        print("\nActive Open Positions")
-        print("---------------------")
-        header = f"{'Contract':<25} | {'Action':<6} | {'Qty':>5} | {'Price':>10} | {'Date':<12}"
-        print(header)
-        print("-" * (len(header) + 2))
-        for _, trade in open_positions.items():
-            contract = f"{trade['stock_code']} {trade['expiry_date']} {trade['strike_price']} {trade['right']}"
-            print(f"{contract:<25} | {trade['action']:<6} | {trade['quantity']:>5} | {float(trade['average_cost']):>10.2f} | {trade['trade_date']:<12}")
-        print("-" * (len(header) + 2))
-
-def analyze_and_print_monthly_summary(api_response):
-    if "Success" not in api_response or not api_response["Success"]:
+def print_open_positions(positions):
+    if positions.empty:
         return
-
-    completed_trades, _ = pair_trades(api_response["Success"])
-    monthly_summary = {}
-
-    for entry_trade, exit_trade in completed_trades:
-        if entry_trade['action'].lower() == 'buy' and exit_trade['action'].lower() == 'sell':
-            buy_trade, sell_trade = entry_trade, exit_trade
-        elif exit_trade['action'].lower() == 'buy' and entry_trade['action'].lower() == 'sell':
-            buy_trade, sell_trade = exit_trade, entry_trade
-        else:
-            continue
-
-        try:
-            sell_value = float(sell_trade['average_cost']) * int(sell_trade['quantity'])
-            buy_value = float(buy_trade['average_cost']) * int(buy_trade['quantity'])
-            
-            sell_charges = float(sell_trade['brokerage_amount']) + float(sell_trade['total_taxes'])
-            buy_charges = float(buy_trade['brokerage_amount']) + float(buy_trade['total_taxes'])
-            total_pair_charges = sell_charges + buy_charges
-            net_pl = (sell_value - buy_value) - total_pair_charges
-
-            date_obj = datetime.strptime(sell_trade['trade_date'], '%d-%b-%Y')
-            month_key = date_obj.strftime('%b-%Y') 
-
-            if month_key not in monthly_summary:
-                monthly_summary[month_key] = {'profitable': 0, 'loss_making': 0, 'net_pl': 0.0, 'total_charges': 0.0}
-            
-            monthly_summary[month_key]['profitable'] += 1 if net_pl > 0 else 0
-            monthly_summary[month_key]['loss_making'] += 1 if net_pl <= 0 else 0
-            monthly_summary[month_key]['net_pl'] += net_pl
-            monthly_summary[month_key]['total_charges'] += total_pair_charges
-
-        except (ValueError, KeyError):
-            continue
-
-    sorted_summary = OrderedDict(sorted(monthly_summary.items(), key=lambda item: datetime.strptime(item[0], '%b-%Y')))
-    
-    print("\n\nMonthly Transactions Summary")
-    print("----------------------------")
-    header = f"{'Month':<16} | {'Profit':>6} | {'Loss':>5} | {'Charges':>10} | {'Net Pnl':>12}"
+    print("\nActive Open Positions")
+    print("---------------------")
+    header = f"{'Contract':<25} | {'Action':<6} | {'Qty':>5} | {'Price':>10} | {'Date':<12}"
     print(header)
-    print("-" * len(header))
+    print("-" * (len(header) + 2))
+    for _, fill in positions.iterrows():
+        print(f"{fill['contract']:<25} | {fill['side'].capitalize():<6} | {int(fill['open_qty']):>5} | {fill['price']:>10.2f} | {fill['trade_date'].strftime(TRADE_DATE_FORMAT):<12}")
+    print("-" * (len(header) + 2))
 
-    total_profitable, total_loss_making, total_charges, total_net_pl = 0, 0, 0.0, 0.0
-    for month_str, data in sorted_summary.items():
-        total_profitable += data['profitable']
-        total_loss_making += data['loss_making']
-        total_charges += data['total_charges']
-        total_net_pl += data['net_pl']
-        print(f"{month_str:<16} | {data['profitable']:>6} | {data['loss_making']:>5} | {data['total_charges']:>10,.2f} | {data['net_pl']:>12,.2f}")
-
-    print("-" * len(header))
-    print(f"{'Total':<16} | {total_profitable:>6} | {total_loss_making:>5} | {total_charges:>10,.2f} | {total_net_pl:>12,.2f}")
-    print("-" * len(header))
-
-# --- REWRITTEN: Simplified function with order_id sorting ---
-def print_individual_trades(api_response):
-    if "Success" not in api_response or not api_response["Success"]:
-        return
-        
-    completed_trades, _ = pair_trades(api_response["Success"])
-    if not completed_trades:
+def print_individual_trades(trades):
+    if trades.empty:
         print("\nNo completed trades found to display in the individual log.")
         return
-
-    trade_details_list = []
-
-    for entry_trade, exit_trade in completed_trades:
-        if entry_trade['action'].lower() == 'buy' and exit_trade['action'].lower() == 'sell':
-            buy_trade, sell_trade = entry_trade, exit_trade
-        elif exit_trade['action'].lower() == 'buy' and entry_trade['action'].lower() == 'sell':
-            buy_trade, sell_trade = exit_trade, entry_trade
-        else:
-            continue
-            
-        try:
-            sell_value = float(sell_trade['average_cost']) * int(sell_trade['quantity'])
-            buy_value = float(buy_trade['average_cost']) * int(buy_trade['quantity'])
-            
-            sell_charges = float(sell_trade['brokerage_amount']) + float(sell_trade['total_taxes'])
-            buy_charges = float(buy_trade['brokerage_amount']) + float(buy_trade['total_taxes'])
-            total_pair_charges = sell_charges + buy_charges
-            net_pl = (sell_value - buy_value) - total_pair_charges
-
-            trade_details = {
-                # This key is now used for sorting but not displayed
-                "sort_key_order_id": buy_trade['order_id'], 
-                "Date": sell_trade['trade_date'],
-                "Contract": f"{sell_trade['stock_code']} {sell_trade['expiry_date']} {sell_trade['strike_price']} {sell_trade['right']}",
-                "Qty": int(sell_trade['quantity']),
-                "Buy Price": float(buy_trade['average_cost']),
-                "Sell Price": float(sell_trade['average_cost']),
-                "Charges": total_pair_charges,
-                "Net PnL": net_pl,
-            }
-            trade_details_list.append(trade_details)
-
-        except (ValueError, KeyError) as e:
-            print(f"Skipping a trade for the detailed log due to data error: {e}")
-            continue
-
-    # Sort trades by the entry order_id
-    sorted_trades = sorted(trade_details_list, key=lambda t: t['sort_key_order_id'])
-    
     print("\n\nIndividual Trade Log")
     print("--------------------")
-    # Updated header to show only "Date"
     header = f"{'Date':<12} | {'Contract':<30} | {'Qty':>5} | {'Buy Price':>10} | {'Sell Price':>11} | {'Charges':>10} | {'Net Pnl':>12}"
     print(header)
     print("-" * len(header))
-
-    # Updated print statement to match the new header
-    for trade in sorted_trades:
-        print(f"{trade['Date']:<12} | {trade['Contract']:<30} | {trade['Qty']:>5} | {trade['Buy Price']:>10.2f} | {trade['Sell Price']:>11.2f} | {trade['Charges']:>10.2f} | {trade['Net PnL']:>12.2f}")
-
+    for _, trade in trades.iterrows():
+        print(f"{trade['trade_date'].strftime(TRADE_DATE_FORMAT):<12} | {trade['contract']:<30} | {int(trade['qty']):>5} | {trade['buy_price']:>10.2f} | {trade['sell_price']:>11.2f} | {trade['charges']:>10.2f} | {trade['net_pl']:>12.2f}")
     print("-" * len(header))
 
+def report(raw, show_trades=False):
+    fills = build_fills(raw)
+    if raw["instance"].nunique() > 1:
+        fills["contract"] = "[" + fills["instance"] + "] " + fills["contract"]
+    trades = match_round_trips(fills)
+    if trades.empty:
+        print("\nNo completed trades found.")
+        print_open_positions(open_positions(fills))
+        return
+    daily = summarize_trades(trades)
+
+    if daily.index.get_level_values("instance").nunique() > 1:
+        print_summary_table("Per-Account Summary", "Account", rollup(daily, "instance"))
+    print_summary_table("Daily Transactions Summary", "Trade Date", rollup(daily, "trade_date"), lambda d: d.strftime('%a, %d-%b-%Y'))
+    print_open_positions(open_positions(fills))
+    monthly = rollup(daily, daily.index.get_level_values("trade_date").to_period("M"))
+    print()
+    print_summary_table("Monthly Transactions Summary", "Month", monthly, lambda m: m.strftime('%b-%Y'))
+
+    if show_trades:
+        print_individual_trades(trades)
+
+
+# ==============================================================================
+# --- MULTI-ACCOUNT ---
+# ==============================================================================
+def connect(instance, token):
+    config = INSTANCE_CONFIG[instance]
+    breeze = BreezeConnect(api_key=config["API_KEY"])
+    breeze.generate_session(api_secret=config["API_SECRET"], session_token=token)
+    return breeze
+
+def load_all_trades(account_tokens, refresh=False):
+    """
+    Connects and loads every account's trades concurrently (each through its own cache), so the
+    reconciliation takes about one session plus one trade-list round trip however many accounts there are.
+    Returns the merged rows and {instance: error} for accounts that failed.
+    """
+    def load(instance, token):
+        return load_trades(connect(instance, token), instance, refresh=refresh)
+
+    frames, failures = [], {}
+    with ThreadPoolExecutor(max_workers=len(account_tokens), thread_name_prefix="trade-analysis") as pool:
+        futures = {instance: pool.submit(load, instance, token) for instance, token in account_tokens.items()}
+        for instance, future in futures.items():
+            try:
+                frames.append(future.result())
+            except Exception as e:
+                failures[instance] = e
+    return (pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()), failures
+
+def _parse_account_tokens(values):
+    accounts = {}
+    for value in values:
+        name, sep, token = value.partition("=")
+        if not sep or name not in INSTANCE_CONFIG:
+            raise argparse.ArgumentTypeError(f"Expected <instance>=<session_token> with instance in {list(INSTANCE_CONFIG)}, got '{value}'.")
+        accounts[name] = token
+    return accounts
+
 
 def main():
     parser = argparse.ArgumentParser(description="Trikal: Trade Analysis Tool")
-    parser.add_argument("--instance", required=True, choices=INSTANCE_CONFIG.keys(), help="The bot instance configuration to use for API connection.")
-    parser.add_argument("--token", required=True, help="Breeze API session token.")
+    parser.add_argument("--instance", choices=INSTANCE_CONFIG.keys(), help="The bot instance configuration to use for API connection.")
+    parser.add_argument("--token", help="Breeze API session token.")
+    parser.add_argument("--accounts", nargs="+", help="Consolidated report across accounts given as <instance>=<session_token>; fetched concurrently.")
     parser.add_argument("--trades", action="store_true", help="Display a detailed list of all individual completed trades.")
+    parser.add_argument("--refresh", action="store_true", help="Ignore the local trade cache and refetch the full history.")
     args = parser.parse_args()
 
-    config = INSTANCE_CONFIG[args.instance]
+    if args.accounts:
+        if args.instance or args.token:
+            parser.error("--accounts cannot be combined with --instance/--token.")
+        try:
+            account_tokens = _parse_account_tokens(args.accounts)
+        except argparse.ArgumentTypeError as e:
+            parser.error(str(e))
+        print(f"Fetching trades for {len(account_tokens)} account(s) concurrently: {', '.join(account_tokens)}...")
+        raw, failures = load_all_trades(account_tokens, refresh=args.refresh)
+        for instance, error in failures.items():
+            print(f"❌ [{instance}] Skipped: {error}")
+        if raw.empty:
+            return
+        report(raw, show_trades=args.trades)
+        return
+
+    if not (args.instance and args.token):
+        parser.error("either --instance and --token, or --accounts, is required.")
 
     try:
         print(f"Connecting to Breeze API for instance: '{args.instance}'...")
-        breeze = BreezeConnect(api_key=config["API_KEY"])
-        breeze.generate_session(api_secret=config["API_SECRET"], session_token=args.token)
+        breeze = connect(args.instance, args.token)
         print("Breeze API session generated successfully.")
     except Exception as e:
         print(f"❌ Failed to connect to Breeze API: {e}"); traceback.print_exc(); return
 
-    # --- SIMPLIFIED: Only fetching the trade list ---
-    print(f"Fetching trades from {start_date_str.split('T')[0]} to {today_date_str.split('T')[0]}...")
-    trade_response = breeze.get_trade_list(from_date=start_date_str, to_date=today_date_str, exchange_code="NFO", product_type="", action="", stock_code="")
-    
-    analyze_and_print_summary(trade_response)
-    analyze_and_print_monthly_summary(trade_response)
-
-    if args.trades:
-        print_individual_trades(trade_response)
+    try:
+        raw = load_trades(breeze, args.instance, refresh=args.refresh)
+    except RuntimeError as e:
+        print(e); return
+    report(raw, show_trades=args.trades)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,17 +1,22 @@
 # --- START OF FILE trikal.py (Unified with Mantri Remote Control) ---
 
 import argparse
+import ast
 import threading
 import asyncio
+import importlib
 import logging
+import re
 from datetime import datetime, date
-from breeze_connect import BreezeConnect
 import traceback
 import warnings
+from typing import TYPE_CHECKING
 
-# --- NEW IMPORTS FOR TELEGRAM INTEGRATION ---
-from telegram import Update
-from telegram.ext import Application, CommandHandler, ContextTypes
+# Heavy and mode-specific modules (pandas via the engine, breeze_connect, telegram) are imported
+# inside main()/run_mantri_remote() so `--help` and backtests only pay for what they use.
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import ContextTypes
 
 warnings.filterwarnings(
     'ignore',
@@ -19,12 +24,7 @@ warnings.filterwarnings(
     category=UserWarning
 )
 
-from trikal_engine import TrikalEngine
-from trikal_backtest import backtest_data_generator
-from trikal_live import live_data_generator
-from trikal_provider import TrikalProvider
-from yuktidhar import TrendPullbackStrategy
-from trikal_helpers import get_monthly_expiry_for_date
+from trikal_logging import configure_logging
 
 # ==============================================================================
 # --- CONFIGURATION ---
@@ -110,12 +110,50 @@ STRATEGY_PARAMS = {
     }
 }
 
+# Strategy name -> (module, class). Classes are imported on first use by get_strategy_class().
 STRATEGY_MAP = {
-    "TrendPullback": TrendPullbackStrategy
+    "TrendPullback": ("yuktidhar", "TrendPullbackStrategy")
 }
 
-# --- NEW: GLOBAL VARIABLE TO SHARE THE ENGINE INSTANCE ---
-trikal_engine_instance: TrikalEngine = None
+
+def get_strategy_class(name):
+    module_name, class_name = STRATEGY_MAP[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def parse_strategy_spec(spec):
+    """
+    Parses a `--strategy` value of the form NAME[:KEY=VAL,...] into (variant_name, base_name, config).
+    Overrides replace keys of STRATEGY_PARAMS[NAME]; values are Python literals (0.1, 30, True, [("09:30", "15:00")])
+    and anything else is kept as a string. The variant name is the spec itself, so every variant is named uniquely.
+    """
+    base_name, _, overrides = spec.partition(":")
+    if base_name not in STRATEGY_MAP:
+        raise argparse.ArgumentTypeError(f"Unknown strategy '{base_name}'; expected one of {list(STRATEGY_MAP)}.")
+    config = dict(STRATEGY_PARAMS[base_name])
+    if not overrides:
+        return base_name, base_name, config
+    # Split only on commas that start a new KEY=, so list and tuple values may contain commas.
+    for item in re.split(r",(?=\s*[A-Za-z_]\w*=)", overrides):
+        key, sep, raw_value = item.partition("=")
+        key = key.strip()
+        if not sep or key not in config:
+            raise argparse.ArgumentTypeError(f"Expected KEY=VAL with KEY in STRATEGY_PARAMS['{base_name}'], got '{item}'.")
+        try:
+            config[key] = ast.literal_eval(raw_value.strip())
+        except (ValueError, SyntaxError):
+            config[key] = raw_value.strip()
+    return spec, base_name, config
+
+
+def build_strategy(spec):
+    """Instantiates the strategy for a (variant_name, base_name, config) tuple from parse_strategy_spec."""
+    variant_name, base_name, config = spec
+    return get_strategy_class(base_name)(name=variant_name, config=config)
+
+# --- NEW: GLOBAL VARIABLE TO SHARE THE ENGINE INSTANCES ---
+# One engine per account; the orchestrator (trikal_orchestrator.py) registers several.
+trikal_engine_instances: list = []
 
 # ==============================================================================
 # --- NEW: TELEGRAM HANDLER LOGIC (FOR DIRECT CALLS) ---
@@ -128,10 +166,8 @@ logging.basicConfig(
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
-async def exit_command_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handles the /exit command by directly calling the engine's exit function."""
-    global trikal_engine_instance
-    
+async def exit_command_handler(update: "Update", context: "ContextTypes.DEFAULT_TYPE") -> None:
+    """Handles the /exit command by directly calling the exit function of every engine with an open trade."""
     if not update.message or not update.message.chat:
         return
 
@@ -142,35 +178,69 @@ async def exit_command_handler(update: Update, context: ContextTypes.DEFAULT_TYP
 
     logger.info("Received '/exit' command. Attempting direct manual exit...")
 
-    if trikal_engine_instance and trikal_engine_instance.active_trade:
+    engines_in_trade = [engine for engine in trikal_engine_instances if engine.active_trade]
+    if not engines_in_trade:
+        await update.message.reply_text("ℹ️ No active trade found in Trikal to exit.")
+        logger.warning("Received /exit command, but no active trade was found.")
+        return
+
+    for engine in engines_in_trade:
         try:
             # Run the synchronous exit function in a thread to avoid blocking the async loop
-            await asyncio.to_thread(trikal_engine_instance._execute_manual_exit, "Manual Override (Telegram)")
+            await asyncio.to_thread(engine._execute_manual_exit, "Manual Override (Telegram)")
             
-            await update.message.reply_text("✅ Instantaneous exit signal sent. Trikal is squaring off the position now.")
-            logger.info("Successfully called _execute_manual_exit.")
+            await update.message.reply_text(f"✅ [{engine.instance_name}] Instantaneous exit signal sent. Trikal is squaring off the position now.")
+            logger.info(f"Successfully called _execute_manual_exit for '{engine.instance_name}'.")
 
         except Exception as e:
-            logger.error(f"Failed to call _execute_manual_exit: {e}")
-            await update.message.reply_text(f"❌ ERROR: Could not execute manual exit: {e}")
-    else:
-        await update.message.reply_text("ℹ️ No active trade found in Trikal to exit.")
-        logger.warning("Received /exit command, but no active trade was found.")
+            logger.error(f"Failed to call _execute_manual_exit for '{engine.instance_name}': {e}")
+            await update.message.reply_text(f"❌ [{engine.instance_name}] ERROR: Could not execute manual exit: {e}")
+
+def run_mantri_remote(engine_thread: threading.Thread):
+    """Runs the Telegram listener on the calling thread while the engine(s) run in `engine_thread`."""
+    print("\n--- Starting Mantri remote control listener... ---")
+    if "YOUR_" in TELEGRAM_CONFIG["BOT_TOKEN"] or "YOUR_" in TELEGRAM_CONFIG["CHAT_ID"]:
+        logger.error("Telegram Bot Token or Chat ID is not configured. Remote control is disabled.")
+        # The engine thread will continue to run, but without remote control.
+        engine_thread.join() # Wait for the engine to finish (runs forever)
+        return
+
+    from telegram.ext import Application, CommandHandler
+
+    application = Application.builder().token(TELEGRAM_CONFIG["BOT_TOKEN"]).build()
+    application.add_handler(CommandHandler("exit", exit_command_handler))
+    
+    print("--- Mantri is now listening for the /exit command. ---")
+    # This is a blocking call that runs forever, listening for Telegram updates.
+    application.run_polling(drop_pending_updates=True)
 
 # ==============================================================================
 # --- MAIN APPLICATION ENTRY POINT (MODIFIED) ---
 # ==============================================================================
 
 def main():
-    global trikal_engine_instance
-
     # --- This entire block of argument parsing and config loading is UNCHANGED ---
     parser = argparse.ArgumentParser(description="Trikal: Unified Trading Engine with Mantri Remote")
     parser.add_argument("--date", help="Run in BACKTEST mode for a specific date (YYYY-MM-DD).")
     parser.add_argument("--token", required=True, help="Breeze API session token.")
-    parser.add_argument("--strategy", required=True, choices=STRATEGY_MAP.keys(), help="The name of the strategy to run.")
+    parser.add_argument("--strategy", required=True, type=parse_strategy_spec, help=f"The strategy to run as NAME[:KEY=VAL,...], NAME one of {list(STRATEGY_MAP)}.")
     parser.add_argument("--instance", required=True, choices=INSTANCE_CONFIG.keys(), help="The bot instance configuration to run.")
+    parser.add_argument("--paper", action="store_true", help="Run on the live feed with locally simulated fills instead of real orders.")
+    parser.add_argument("--quiet", action="store_true", help="Silence per-candle analysis and signal diagnostics (trades and exits are still logged).")
+    parser.add_argument("--results-db", default="trikal_results.db", help="SQLite results store for backtest and paper runs.")
+    parser.add_argument("--run-label", help="Label that groups this run with others in the results store (e.g. a parameter sweep).")
+    parser.add_argument("--no-results", action="store_true", help="Do not record this run in the results store.")
     args = parser.parse_args()
+    if args.paper and args.date:
+        parser.error("--paper runs on the live feed and cannot be combined with --date.")
+    run_mode = 'backtest' if args.date else ('paper' if args.paper else 'live')
+
+    configure_logging(args.instance, mode=run_mode, candle_output=not args.quiet)
+
+    from breeze_connect import BreezeConnect
+    from trikal_engine import TrikalEngine
+    from trikal_provider import TrikalProvider
+    from trikal_helpers import get_monthly_expiry_for_date
 
     config = INSTANCE_CONFIG[args.instance]
     try:
@@ -181,42 +251,47 @@ def main():
     except Exception as e:
         print(f"❌ Failed to connect to Breeze API: {e}"); traceback.print_exc(); return
 
-    strategy_name = args.strategy
-    strategy_class = STRATEGY_MAP[strategy_name]
-    strategy_config = STRATEGY_PARAMS[strategy_name]
-    strategy_to_run = strategy_class(name=strategy_name, config=strategy_config)
-    print(f"✅ Strategy selected: {strategy_name}")
+    strategy_to_run = build_strategy(args.strategy)
+    print(f"✅ Strategy selected: {strategy_to_run.name}")
+
+    results_store = None
+    if run_mode != 'live' and not args.no_results:
+        from trikal_results import ResultsStore
+        results_store = ResultsStore(args.results_db, label=args.run_label)
 
     # --- THE LOGIC NOW SPLITS FOR BACKTEST vs LIVE ---
 
     if args.date:
         # --- BACKTEST MODE: RUNS NORMALLY, NO TELEGRAM ---
         print("\n--- Running in BACKTEST mode. Mantri remote is disabled. ---")
+        from trikal_backtest import backtest_data_generator
         run_date_obj = datetime.strptime(args.date, "%Y-%m-%d").date()
         expiry_date = get_monthly_expiry_for_date(run_date_obj, roll_on_expiry_day=True)
         provider = TrikalProvider(mode='backtest', date_str=args.date, breeze_api=breeze, interval="1minute")
-        engine = TrikalEngine(strategy_to_run, provider, config["CAPITAL_CONFIG"], expiry_date, interval_minutes=5, instance_name=args.instance)
+        engine = TrikalEngine(strategy_to_run, provider, config["CAPITAL_CONFIG"], expiry_date, interval_minutes=5, instance_name=args.instance, results_store=results_store)
         data_gen = backtest_data_generator(provider)
         
         # This is a blocking call, as it should be for backtesting.
         engine.run(data_iterator=data_gen)
 
     else:
-        # --- LIVE MODE: RUNS ENGINE IN BACKGROUND AND TELEGRAM IN FOREGROUND ---
-        print("\n--- Running in LIVE mode. Initializing Mantri remote... ---")
+        # --- LIVE / PAPER MODE: RUNS ENGINE IN BACKGROUND AND TELEGRAM IN FOREGROUND ---
+        print(f"\n--- Running in {run_mode.upper()} mode. Initializing Mantri remote... ---")
+        from trikal_live import live_data_generator
         today = date.today()
         expiry_date = get_monthly_expiry_for_date(today, roll_on_expiry_day=True)
-        provider = TrikalProvider(mode='live', breeze_api=breeze, interval="1minute")
+        provider = TrikalProvider(mode=run_mode, breeze_api=breeze, interval="1minute")
         
-        # Create the engine instance and assign it to the global variable
-        trikal_engine_instance = TrikalEngine(strategy_to_run, provider, config["CAPITAL_CONFIG"], expiry_date, interval_minutes=5, instance_name=args.instance)
+        # Create the engine instance and register it for the Telegram remote
+        engine = TrikalEngine(strategy_to_run, provider, config["CAPITAL_CONFIG"], expiry_date, interval_minutes=5, instance_name=args.instance, results_store=results_store)
+        trikal_engine_instances.append(engine)
         
         data_gen = live_data_generator(provider, expiry_date)
 
         # Start the Trikal Engine in a separate, background thread
         print("--- Starting Trikal Engine in background... ---")
         engine_thread = threading.Thread(
-            target=trikal_engine_instance.run,
+            target=engine.run,
             args=(data_gen,),
             daemon=True
         )
@@ -224,19 +299,7 @@ def main():
         print("--- Trikal Engine is running. ---")
 
         # Start the Telegram bot on the main thread to listen for commands
-        print("\n--- Starting Mantri remote control listener... ---")
-        if "YOUR_" in TELEGRAM_CONFIG["BOT_TOKEN"] or "YOUR_" in TELEGRAM_CONFIG["CHAT_ID"]:
-            logger.error("Telegram Bot Token or Chat ID is not configured. Remote control is disabled.")
-            # The engine thread will continue to run, but without remote control.
-            engine_thread.join() # Wait for the engine to finish (runs forever)
-            return
-
-        application = Application.builder().token(TELEGRAM_CONFIG["BOT_TOKEN"]).build()
-        application.add_handler(CommandHandler("exit", exit_command_handler))
-        
-        print("--- Mantri is now listening for the /exit command. ---")
-        # This is a blocking call that runs forever, listening for Telegram updates.
-        application.run_polling(drop_pending_updates=True)
+        run_mantri_remote(engine_thread)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,380 @@
+# --- START OF FILE trikal_archive.py ---
+
+import argparse
+import glob
+import json
+import os
+import re
+from datetime import date, datetime
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from trikal_logging import get_logger
+from trikal_schema import PRICE_COLUMNS, PRICE_DTYPE, SchemaError, to_price_array
+
+log = get_logger("trikal.archive")
+
+DEFAULT_FUTURES_ARCHIVE = os.path.join("data", "archive", "futures", "NIFTY")
+DEFAULT_FUTURES_SOURCES = (os.path.join("data", "futures"), os.path.join("nifty", "futures"))
+
+# Column name -> on-disk dtype, matching trikal_schema's in-memory layout. Timestamps are epoch
+# nanoseconds (UTC); prices are float32 and checked on write to round-trip at 2 decimals.
+FUTURES_COLUMNS = {
+    "ts": np.int64,
+    "open": PRICE_DTYPE,
+    "high": PRICE_DTYPE,
+    "low": PRICE_DTYPE,
+    "close": PRICE_DTYPE,
+    "volume": np.int64,
+}
+
+_FUT_FILE_DATE = re.compile(r"FUT_(\d{4}-\d{2}-\d{2})\.csv$")
+
+
+class FuturesArchive:
+    """
+    Append-only, memory-mapped store of 1-minute futures candles. Each column is a flat binary file
+    under `root` and index.json maps every archived date to its [start, stop) row range, so a day,
+    or a run of consecutive days, is read as a slice of the mapped arrays instead of parsing CSVs.
+    """
+
+    def __init__(self, root: str = DEFAULT_FUTURES_ARCHIVE, timezone: str = "Asia/Kolkata"):
+        self.root = root
+        self.timezone = timezone
+        self._index_path = os.path.join(root, "index.json")
+        self._index = self._read_index()
+        self._maps = None
+        self._mapped_rows = -1
+
+    # --- Index ---
+
+    def _read_index(self):
+        if not os.path.exists(self._index_path):
+            return {"rows": 0, "dates": {}}
+        with open(self._index_path) as f:
+            return json.load(f)
+
+    def _write_index(self):
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self._index_path)
+
+    @property
+    def rows(self) -> int:
+        return self._index["rows"]
+
+    def dates(self) -> List[str]:
+        return sorted(self._index["dates"])
+
+    def has_date(self, day) -> bool:
+        return _date_key(day) in self._index["dates"]
+
+    def covers(self, from_day, to_day) -> bool:
+        """True when the archived span starts on/before `from_day` and has a day before `to_day`."""
+        archived = self.dates()
+        return bool(archived) and archived[0] <= _date_key(from_day) and any(d < _date_key(to_day) for d in archived)
+
+    # --- Reading ---
+
+    def _columns(self):
+        rows = self._index["rows"]
+        if self._mapped_rows != rows:
+            self._maps = {
+                name: np.memmap(self._column_path(name), dtype=dtype, mode="r", shape=(rows,)) if rows else np.empty(0, dtype=dtype)
+                for name, dtype in FUTURES_COLUMNS.items()
+            }
+            self._mapped_rows = rows
+        return self._maps
+
+    def _column_path(self, name):
+        return os.path.join(self.root, f"{name}.bin")
+
+    def _frame(self, row_ranges) -> pd.DataFrame:
+        columns = self._columns()
+        # Consecutive ranges (the normal case for days appended in order) collapse into one slice.
+        merged = []
+        for start, stop in row_ranges:
+            if merged and merged[-1][1] == start:
+                merged[-1][1] = stop
+            else:
+                merged.append([start, stop])
+        data = {}
+        for name in FUTURES_COLUMNS:
+            parts = [columns[name][start:stop] for start, stop in merged]
+            data[name] = np.array(parts[0]) if len(parts) == 1 else np.concatenate(parts) if parts else columns[name][:0]
+        index = pd.to_datetime(data.pop("ts"), utc=True).tz_convert(self.timezone)
+        index.name = "datetime"
+        return pd.DataFrame(data, index=index)
+
+    def read_day(self, day) -> Optional[pd.DataFrame]:
+        row_range = self._index["dates"].get(_date_key(day))
+        return self._frame([row_range]) if row_range else None
+
+    def read_range(self, from_day, to_day) -> pd.DataFrame:
+        """Candles for every archived date in [from_day, to_day)."""
+        from_key, to_key = _date_key(from_day), _date_key(to_day)
+        ranges = [self._index["dates"][d] for d in self.dates() if from_key <= d < to_key]
+        return self._frame(ranges)
+
+    # --- Writing ---
+
+    def append_day(self, day, df_day: pd.DataFrame) -> bool:
+        """
+        Appends one day's candles (tz-aware DatetimeIndex, OHLCV columns). Days already in the archive
+        are left untouched, since existing rows are never rewritten. Returns True if rows were added.
+        """
+        key = _date_key(day)
+        if key in self._index["dates"]:
+            return False
+        df_day = df_day[~df_day.index.duplicated(keep="last")].sort_index()
+        if df_day.empty:
+            return False
+
+        encoded = {"ts": df_day.index.tz_convert("UTC").asi8.astype(np.int64)}
+        for name in PRICE_COLUMNS:
+            encoded[name] = to_price_array(pd.to_numeric(df_day[name], errors="coerce"), f"{key} {name}")
+        encoded["volume"] = pd.to_numeric(df_day["volume"], errors="coerce").fillna(0).to_numpy().astype(np.int64)
+
+        os.makedirs(self.root, exist_ok=True)
+        start = self._index["rows"]
+        for name, dtype in FUTURES_COLUMNS.items():
+            with open(self._column_path(name), "ab") as f:
+                f.write(np.ascontiguousarray(encoded[name], dtype=dtype).tobytes())
+        self._index["rows"] = start + len(df_day)
+        self._index["dates"][key] = [start, self._index["rows"]]
+        self._write_index()
+        return True
+
+
+def _date_key(day) -> str:
+    if isinstance(day, (datetime, pd.Timestamp)):
+        day = day.date()
+    return day.isoformat() if isinstance(day, date) else str(day)
+
+
+def read_futures_csv(file_path: str) -> pd.DataFrame:
+    """Parses a FUT_<date>.csv the same way the backtest feed does: IST index, numeric OHLCV."""
+    from trikal_helpers import robust_datetime_parser
+
+    df = pd.read_csv(file_path)
+    df["datetime"] = robust_datetime_parser(df["datetime"])
+    df = df.dropna(subset=["datetime"]).set_index("datetime")
+    for col in ["open", "high", "low", "close", "volume"]:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df[["open", "high", "low", "close", "volume"]]
+
+
+def build_futures_archive(source_dirs: Iterable[str] = DEFAULT_FUTURES_SOURCES, root: str = DEFAULT_FUTURES_ARCHIVE) -> FuturesArchive:
+    """Ingests every FUT_<date>.csv under `source_dirs` in date order. Already archived dates are skipped."""
+    files = {}
+    for source_dir in source_dirs:
+        for file_path in glob.glob(os.path.join(source_dir, "FUT_*.csv")):
+            match = _FUT_FILE_DATE.search(os.path.basename(file_path))
+            if match:
+                # The first source wins when a date exists in several directories.
+                files.setdefault(match.group(1), file_path)
+
+    archive = FuturesArchive(root)
+    added = 0
+    for day in sorted(files):
+        if archive.has_date(day):
+            continue
+        try:
+            df_day = read_futures_csv(files[day])
+            df_day = df_day[df_day.index.date == date.fromisoformat(day)]
+            if archive.append_day(day, df_day):
+                added += 1
+        except Exception as e:
+            log.warning("   └── [Archive] ⚠️ Skipping %s: %s", files[day], e)
+    log.info("🗄️  Futures archive at %s: %d day(s) added, %d day(s) total, %d rows.", root, added, len(archive.dates()), archive.rows)
+    return archive
+
+
+# ==============================================================================
+# --- PER-DAY OPTIONS ARCHIVE ---
+# ==============================================================================
+
+DEFAULT_OPTIONS_ARCHIVE = os.path.join("data", "archive", "options_1s")
+DEFAULT_OPTIONS_SOURCES = (os.path.join("data", "options_1s"), os.path.join("nifty", "options_1s"))
+
+# One record per 1-second candle; every contract's rows are contiguous and sorted by time.
+OPTIONS_RECORD = np.dtype([
+    ("ts", "<i8"), ("open", "<f4"), ("high", "<f4"), ("low", "<f4"), ("close", "<f4"), ("volume", "<i4"),
+])
+
+_OPTION_FILE = re.compile(r"(CALL|PUT)_(\d+(?:\.\d+)?)\.csv$")
+
+
+class OptionsDayArchive:
+    """
+    All 1-second option contracts of one trading day in a single memory-mapped record file, with a
+    JSON index of (right, strike) -> [offset, length]. Range reads are views into the mapping, so a
+    candle's worth of ticks costs a binary search rather than a CSV parse.
+    """
+
+    def __init__(self, day, root: str = DEFAULT_OPTIONS_ARCHIVE, timezone: str = "Asia/Kolkata"):
+        self.day = _date_key(day)
+        self.root = root
+        self.timezone = timezone
+        self.data_path = os.path.join(root, f"{self.day}.bin")
+        self.index_path = os.path.join(root, f"{self.day}.json")
+        with open(self.index_path) as f:
+            self._index = {_contract_from_key(key): tuple(span) for key, span in json.load(f)["contracts"].items()}
+        total_rows = max((offset + length for offset, length in self._index.values()), default=0)
+        self._records = np.memmap(self.data_path, dtype=OPTIONS_RECORD, mode="r", shape=(total_rows,)) if total_rows else np.empty(0, dtype=OPTIONS_RECORD)
+
+    @staticmethod
+    def available(day, root: str = DEFAULT_OPTIONS_ARCHIVE) -> bool:
+        return os.path.exists(os.path.join(root, f"{_date_key(day)}.json"))
+
+    def contracts(self):
+        return sorted(self._index)
+
+    def has_contract(self, right: str, strike) -> bool:
+        return _contract(right, strike) in self._index
+
+    def nearest_strike(self, right: str, strike) -> Optional[int]:
+        """The archived strike of `right` closest to `strike` (lower strike on ties), or None."""
+        right = right.lower()
+        strikes = [s for r, s in self._index if r == right]
+        return min(strikes, key=lambda s: (abs(s - float(strike)), s)) if strikes else None
+
+    def read(self, right: str, strike, from_dt=None, to_dt=None) -> np.ndarray:
+        """Zero-copy view of the contract's records with from_dt <= time < to_dt (either bound optional)."""
+        span = self._index.get(_contract(right, strike))
+        if span is None:
+            return self._records[:0]
+        offset, length = span
+        records = self._records[offset:offset + length]
+        ts = records["ts"]
+        lo = 0 if from_dt is None else int(np.searchsorted(ts, pd.Timestamp(from_dt).value, side="left"))
+        hi = length if to_dt is None else int(np.searchsorted(ts, pd.Timestamp(to_dt).value, side="left"))
+        return records[lo:hi]
+
+    def read_frame(self, right: str, strike, from_dt=None, to_dt=None) -> pd.DataFrame:
+        records = self.read(right, strike, from_dt, to_dt)
+        index = pd.to_datetime(records["ts"], utc=True).tz_convert(self.timezone)
+        index.name = "datetime"
+        data = {name: np.ascontiguousarray(records[name]) for name in PRICE_COLUMNS}
+        data["volume"] = records["volume"].astype(np.int64)
+        return pd.DataFrame(data, index=index)
+
+    @classmethod
+    def write(cls, day, contracts: dict, root: str = DEFAULT_OPTIONS_ARCHIVE):
+        """
+        Writes a day's archive from {(right, strike): DataFrame with tz-aware index and OHLCV columns}.
+        The record file is written before its index, so a partially written day is never visible.
+        """
+        day = _date_key(day)
+        os.makedirs(root, exist_ok=True)
+        index, offset = {}, 0
+        data_path = os.path.join(root, f"{day}.bin")
+        with open(data_path + ".tmp", "wb") as f:
+            for (right, strike), df in sorted(contracts.items()):
+                df = df[~df.index.duplicated(keep="last")].sort_index()
+                records = np.empty(len(df), dtype=OPTIONS_RECORD)
+                records["ts"] = df.index.tz_convert("UTC").asi8
+                for name in PRICE_COLUMNS:
+                    records[name] = to_price_array(pd.to_numeric(df[name], errors="coerce"), f"{day} {right.upper()}_{strike} {name}")
+                volume = pd.to_numeric(df["volume"], errors="coerce").fillna(0).to_numpy()
+                if volume.size and volume.max() > np.iinfo(np.int32).max:
+                    raise SchemaError(f"{day} {right.upper()}_{strike}: volume exceeds int32.")
+                records["volume"] = volume
+                f.write(records.tobytes())
+                index[_contract_key(right, strike)] = [offset, len(records)]
+                offset += len(records)
+        os.replace(data_path + ".tmp", data_path)
+        index_path = os.path.join(root, f"{day}.json")
+        with open(index_path + ".tmp", "w") as f:
+            json.dump({"contracts": index}, f, indent=1, sort_keys=True)
+        os.replace(index_path + ".tmp", index_path)
+        return cls(day, root)
+
+
+def _contract(right: str, strike):
+    return right.lower(), int(float(strike))
+
+
+def _contract_key(right: str, strike) -> str:
+    right, strike = _contract(right, strike)
+    return f"{right.upper()}_{strike}"
+
+
+def _contract_from_key(key: str):
+    right, strike = key.split("_")
+    return _contract(right, strike)
+
+
+def read_options_csv(file_path: str, timezone: str = "Asia/Kolkata") -> pd.DataFrame:
+    """Parses a CALL_/PUT_<strike>.csv the way the backtest provider does (naive times are IST)."""
+    df = pd.read_csv(file_path)
+    df["datetime"] = pd.to_datetime(df["datetime"])
+    if df["datetime"].dt.tz is None:
+        df["datetime"] = df["datetime"].dt.tz_localize(timezone)
+    else:
+        df["datetime"] = df["datetime"].dt.tz_convert(timezone)
+    return df.set_index("datetime")[["open", "high", "low", "close", "volume"]]
+
+
+def convert_options_tree(source_dirs: Iterable[str] = DEFAULT_OPTIONS_SOURCES, root: str = DEFAULT_OPTIONS_ARCHIVE) -> int:
+    """Converts every <source>/<date>/ directory of per-contract CSVs into one archive per day. Returns days written."""
+    day_dirs = {}
+    for source_dir in source_dirs:
+        for day_dir in glob.glob(os.path.join(source_dir, "*-*-*")):
+            day_dirs.setdefault(os.path.basename(day_dir), day_dir)
+
+    written = 0
+    for day in sorted(day_dirs):
+        if OptionsDayArchive.available(day, root):
+            continue
+        contracts = {}
+        for file_path in glob.glob(os.path.join(day_dirs[day], "*.csv")):
+            match = _OPTION_FILE.search(os.path.basename(file_path))
+            if not match:
+                continue
+            try:
+                contracts[_contract(match.group(1), match.group(2))] = read_options_csv(file_path)
+            except Exception as e:
+                log.warning("   └── [Archive] ⚠️ Skipping %s: %s", file_path, e)
+        if not contracts:
+            continue
+        try:
+            OptionsDayArchive.write(day, contracts, root)
+            written += 1
+        except SchemaError as e:
+            log.warning("   └── [Archive] ⚠️ Could not archive options for %s: %s", day, e)
+    log.info("🗄️  Options archive at %s: %d day(s) converted.", root, written)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect the memory-mapped futures and options archives.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Ingest FUT_<date>.csv files into the archive.")
+    build.add_argument("--source", nargs="+", default=list(DEFAULT_FUTURES_SOURCES), help="Directories with FUT_<date>.csv files.")
+    build.add_argument("--root", default=DEFAULT_FUTURES_ARCHIVE, help="Archive directory.")
+    build_options = sub.add_parser("build-options", help="Convert options_1s/<date>/ CSV trees into per-day archives.")
+    build_options.add_argument("--source", nargs="+", default=list(DEFAULT_OPTIONS_SOURCES), help="options_1s directories.")
+    build_options.add_argument("--root", default=DEFAULT_OPTIONS_ARCHIVE, help="Options archive directory.")
+    info = sub.add_parser("info", help="Show the archived date span.")
+    info.add_argument("--root", default=DEFAULT_FUTURES_ARCHIVE, help="Archive directory.")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_futures_archive(args.source, args.root)
+    elif args.command == "build-options":
+        convert_options_tree(args.source, args.root)
+    else:
+        archive = FuturesArchive(args.root)
+        dates = archive.dates()
+        if not dates:
+            print(f"No archived days in {args.root}.")
+        else:
+            print(f"{len(dates)} day(s) from {dates[0]} to {dates[-1]}, {archive.rows} rows.")
+
+
+if __name__ == "__main__":
+    main()
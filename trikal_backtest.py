@@ -5,6 +5,9 @@ from typing import Iterator, Tuple
 from datetime import datetime
 
 from trikal_provider import TrikalProvider
+from trikal_logging import get_logger
+
+log = get_logger("trikal.feed")
 
 def backtest_data_generator(provider: TrikalProvider) -> Iterator[Tuple[datetime, pd.DataFrame]]:
     """
@@ -12,10 +15,11 @@ def backtest_data_generator(provider: TrikalProvider) -> Iterator[Tuple[datetime
     """
     day_futures_df = provider.get_day_data_feed()
     if day_futures_df is None or day_futures_df.empty:
-        print("❌ No futures data found for the specified backtest date. Backtest cannot run.")
+        log.error("❌ No futures data found for the specified backtest date. Backtest cannot run.")
         return
 
     # MODIFIED: Corrected the log message to accurately reflect the 1-minute interval.
-    print(f"✅ Backtest data source initialized. Yielding {len(day_futures_df)} historical 1-min candles...")
-    for fut_timestamp, fut_row in day_futures_df.iterrows():
-        yield fut_timestamp, fut_row.to_frame().T
\ No newline at end of file
+    log.info("✅ Backtest data source initialized. Yielding %d historical 1-min candles...", len(day_futures_df))
+    # iloc[[i]] keeps each column's compact dtype; iterrows()/to_frame().T would turn the row into object dtype.
+    for i, fut_timestamp in enumerate(day_futures_df.index):
+        yield fut_timestamp, day_futures_df.iloc[[i]]
\ No newline at end of file
@@ -0,0 +1,78 @@
+# --- START OF FILE trikal_charges.py ---
+
+from dataclasses import dataclass
+from datetime import date, datetime
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class FeeSchedule:
+    """Per-order and percentage charges for one round trip in NIFTY options (rates are fractions of value)."""
+    effective_from: date
+    flat_brokerage_per_order: float
+    exchange_txn_charge_perc: float
+    gst_perc: float
+    sebi_charge_perc: float
+    stt_sell_perc: float
+    stamp_duty_perc: float
+
+
+# Ordered by effective_from. A trade uses the latest schedule effective on its trade date; add a new
+# entry here when rates change instead of editing an old one, so past results stay reproducible.
+FEE_SCHEDULES = (
+    FeeSchedule(effective_from=date(2000, 1, 1), flat_brokerage_per_order=20.0, exchange_txn_charge_perc=0.00053,
+                gst_perc=0.18, sebi_charge_perc=0.000001, stt_sell_perc=0.000625, stamp_duty_perc=0.000003),
+)
+
+_EFFECTIVE_DAYS = np.array([np.datetime64(s.effective_from, "D") for s in FEE_SCHEDULES])
+_RATE_FIELDS = ("flat_brokerage_per_order", "exchange_txn_charge_perc", "gst_perc", "sebi_charge_perc", "stt_sell_perc", "stamp_duty_perc")
+# One row per schedule, one column per rate; indexed by _schedule_indices.
+_RATE_TABLE = np.array([[getattr(s, f) for f in _RATE_FIELDS] for s in FEE_SCHEDULES])
+
+
+def fee_schedule_for(trade_date=None) -> FeeSchedule:
+    return FEE_SCHEDULES[_schedule_indices(trade_date, 1)[0]]
+
+
+def _schedule_indices(trade_dates, n):
+    if trade_dates is None:
+        return np.full(n, len(FEE_SCHEDULES) - 1)
+    if isinstance(trade_dates, datetime):
+        trade_dates = trade_dates.date()
+    days = np.broadcast_to(np.asarray(trade_dates, dtype="datetime64[D]"), (n,))
+    indices = np.searchsorted(_EFFECTIVE_DAYS, days, side="right") - 1
+    if np.any(indices < 0):
+        raise ValueError("Trade date precedes the earliest fee schedule.")
+    return indices
+
+
+def _schedule_columns(indices):
+    return dict(zip(_RATE_FIELDS, _RATE_TABLE[indices].T))
+
+
+def compute_charges(buy_price, sell_price, qty, trade_dates=None) -> dict:
+    """
+    Charges for arrays of round trips (scalars broadcast). Returns each component and 'total' as
+    float64 arrays, using the fee schedule effective on each trade date (the latest when omitted).
+    """
+    buy_price, sell_price, qty = np.broadcast_arrays(
+        np.asarray(buy_price, dtype=np.float64), np.asarray(sell_price, dtype=np.float64), np.asarray(qty, dtype=np.float64))
+    buy_price, sell_price, qty = np.atleast_1d(buy_price, sell_price, qty)
+    rates = _schedule_columns(_schedule_indices(trade_dates, buy_price.shape[0]))
+
+    buy_value = buy_price * qty
+    sell_value = sell_price * qty
+    turnover = buy_value + sell_value
+    brokerage = rates["flat_brokerage_per_order"] * 2
+    stt = sell_value * rates["stt_sell_perc"]
+    exchange_txn_charge = turnover * rates["exchange_txn_charge_perc"]
+    sebi_charge = turnover * rates["sebi_charge_perc"]
+    stamp_duty = buy_value * rates["stamp_duty_perc"]
+    gst = (brokerage + exchange_txn_charge + sebi_charge) * rates["gst_perc"]
+    return {
+        "brokerage": brokerage, "stt": stt, "exchange_txn_charge": exchange_txn_charge, "sebi_charge": sebi_charge,
+        "stamp_duty": stamp_duty, "gst": gst,
+        "total": brokerage + stt + exchange_txn_charge + sebi_charge + stamp_duty + gst,
+    }
+
@@ -2,22 +2,75 @@
 
 import pandas as pd
 from datetime import datetime, date, timedelta
-from typing import Optional, Iterator, Tuple
+from typing import Optional, Iterator, Tuple, TYPE_CHECKING
+from functools import partial
 import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 import os
+import logging
 
 from trikal_provider import TrikalProvider
+from trikal_latency import LatencyTracker
+from trikal_orders import OrderStateTracker
+from trikal_logging import get_logger, CANDLE_LOGGER
+from trikal_schema import enforce_ohlcv_schema
 from yuktidhar import BaseStrategy
 from trikal_helpers import (
     Trade, LIVE_BOT_CONFIG, ist_timezone, apply_indicators_and_bias,
-    handle_exit_logic,  write_chart_data, is_trade_restricted,
+    handle_exit_logic,  write_chart_data, is_trade_restricted, gtt_leg_hit,
     MANUAL_TRIGGER_FILE
 )
 
+if TYPE_CHECKING:
+    from trikal_results import ResultsStore
+
+def load_warmup_history(provider: TrikalProvider, expiry_date: str, interval_minutes: int) -> pd.DataFrame:
+    """Warm-up futures history resampled to the engine timeframe, without indicators."""
+    if provider.mode == 'backtest':
+        df_history = provider.get_initial_warmup_data()
+    else:
+        from trikal_helpers import load_and_prepare_data
+        df_history = load_and_prepare_data(provider, expiry_date, 'live')
+
+    if df_history is None or df_history.empty:
+        raise RuntimeError("❌ Could not load warm-up data.")
+
+    if interval_minutes > 1:
+        resample_rules = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+        df_history = df_history.resample(f'{interval_minutes}min').apply(resample_rules).dropna()
+
+    df_history['volume'] = df_history['volume'].where(df_history['volume'] >= 0).ffill().fillna(0)
+    return df_history
+
+def append_candle(df_history: pd.DataFrame, candle: pd.DataFrame) -> pd.DataFrame:
+    # A float64 candle would upcast the whole float32 history (and its representation error) on concat.
+    df_history = pd.concat([df_history, enforce_ohlcv_schema(candle, "Appended Candle")])
+    return df_history[~df_history.index.duplicated(keep='last')]
+
+def aggregate_candles(data_iterator: Iterator[Tuple[datetime, pd.DataFrame]], interval_minutes: int) -> Iterator[Tuple[datetime, pd.DataFrame]]:
+    """Turns a stream of 1-minute futures candles into (candle_start_time, candle) pairs on the engine timeframe."""
+    one_min_buffer = []
+    for candle_start_time, fut_candle_row in data_iterator:
+        if interval_minutes == 1:
+            yield candle_start_time, fut_candle_row
+            continue
+        one_min_buffer.append(fut_candle_row)
+        if (candle_start_time.minute + 1) % interval_minutes == 0:
+            if not one_min_buffer: continue
+            df_1min = pd.concat(one_min_buffer)
+            one_min_buffer.clear()
+            resample_rules = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+            df_resampled = df_1min.resample(f'{interval_minutes}min', label='right').apply(resample_rules).dropna()
+            if not df_resampled.empty:
+                new_candle = df_resampled.iloc[[0]]
+                yield new_candle.index[0] - timedelta(minutes=interval_minutes), new_candle
+
 class TrikalEngine:
-    def __init__(self, strategy: BaseStrategy, provider: TrikalProvider, capital_config: dict, expiry_date: str, interval_minutes: int = 1, instance_name: str = "default"):
-        print(f"⚙️  Initializing TrikalEngine for instance: '{instance_name}'...")
+    def __init__(self, strategy: BaseStrategy, provider: TrikalProvider, capital_config: dict, expiry_date: str, interval_minutes: int = 1, instance_name: str = "default", track_latency: Optional[bool] = None, results_store: Optional["ResultsStore"] = None, per_instance_backtest_files: bool = False):
+        self.log = get_logger("trikal.engine", instance_name)
+        self.candle_log = get_logger(CANDLE_LOGGER, instance_name)
+        self.log.info("⚙️  Initializing TrikalEngine for instance: '%s'...", instance_name)
         self.strategy = strategy
         self.provider = provider
         self.capital_config = capital_config
@@ -25,7 +78,20 @@ class TrikalEngine:
         self.interval_minutes = interval_minutes
         self.instance_name = instance_name
         self.active_trade: Optional[Trade] = None
+        self._warm_contracts = set()
+        self._stop_event = threading.Event()
+        self.order_tracker = OrderStateTracker(provider.order_api)
         self.df_fut_history: Optional[pd.DataFrame] = None
+        self.results_store = results_store
+        self.run_id: Optional[str] = None
+        # Set when several engines share one backtest: trades go to a per-instance file, and the caller writes chart data once.
+        self.per_instance_backtest_files = per_instance_backtest_files
+
+        # Latency instrumentation is on by default in live mode only; backtest candles have no wall-clock boundary.
+        if track_latency is None:
+            track_latency = provider.is_realtime
+        self.latency = LatencyTracker(instance_name, enabled=track_latency)
+        self.provider.latency_tracker = self.latency
         
         self.run_date = provider.backtest_date_obj if provider.mode == 'backtest' else date.today()
         run_date = self.run_date
@@ -33,166 +99,176 @@ class TrikalEngine:
         self.square_off_time = ist_timezone.localize(datetime.combine(run_date, datetime.min.time())).replace(hour=LIVE_BOT_CONFIG["SQUARE_OFF_TIME"][0], minute=LIVE_BOT_CONFIG["SQUARE_OFF_TIME"][1])
 
     def _prepare_warmup_data(self):
-        if self.provider.mode == 'backtest':
-            self.df_fut_history = self.provider.get_initial_warmup_data()
-        else:
-            from trikal_helpers import load_and_prepare_data
-            self.df_fut_history = load_and_prepare_data(self.provider, self.expiry_date, 'live')
-        
-        if self.df_fut_history is None or self.df_fut_history.empty:
-            raise RuntimeError("❌ Could not load warm-up data.")
-        
-        if self.interval_minutes > 1:
-            resample_rules = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
-            self.df_fut_history = self.df_fut_history.resample(f'{self.interval_minutes}min').apply(resample_rules).dropna()
-            
-        self.df_fut_history['volume'] = self.df_fut_history['volume'].where(self.df_fut_history['volume'] >= 0).ffill().fillna(0)
+        self.df_fut_history = load_warmup_history(self.provider, self.expiry_date, self.interval_minutes)
         self.df_fut_history = apply_indicators_and_bias(self.df_fut_history, self.strategy)
-        print(f"✅ Warm-up complete. Initialized with {len(self.df_fut_history)} historical candles.")
+        self.log.info("✅ Warm-up complete. Initialized with %d historical candles.", len(self.df_fut_history))
 
     def run(self, data_iterator: Iterator[Tuple[datetime, pd.DataFrame]]):
-        print(f"🚀 TrikalEngine starting in [{self.provider.mode.upper()}] mode on a {self.interval_minutes}-minute timeframe.")
+        self.log.info("🚀 TrikalEngine starting in [%s] mode on a %d-minute timeframe.", self.provider.mode.upper(), self.interval_minutes)
         self._prepare_warmup_data()
+        self.open_results_run()
+        self.start_trade_manager()
 
-        if self.provider.mode == 'live':
-            print("🚀 Starting 30-second live trade manager loop...")
-            self._stop_requested = False
-            self.trade_manager_thread = threading.Thread(target=self._live_trade_manager_loop, daemon=True)
-            self.trade_manager_thread.start()
-
-        one_min_buffer = []
         try:
-            for candle_start_time, fut_candle_row in data_iterator:
-                if self.interval_minutes == 1:
-                    self._process_candle(candle_start_time, fut_candle_row)
-                else:
-                    one_min_buffer.append(fut_candle_row)
-                    if (candle_start_time.minute + 1) % self.interval_minutes == 0:
-                        if not one_min_buffer: continue
-                        df_1min = pd.concat(one_min_buffer)
-                        one_min_buffer.clear()
-                        resample_rules = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
-                        df_resampled = df_1min.resample(f'{self.interval_minutes}min', label='right').apply(resample_rules).dropna()
-                        if not df_resampled.empty:
-                            new_candle = df_resampled.iloc[[0]]
-                            new_timestamp = new_candle.index[0] - timedelta(minutes=self.interval_minutes)
-                            self._process_candle(new_timestamp, new_candle)
+            for candle_start_time, candle in aggregate_candles(data_iterator, self.interval_minutes):
+                self._process_candle(candle_start_time, candle)
         except KeyboardInterrupt:
-            print(f"\nGracefully shutting down {self.provider.mode} engine...")
+            self.log.info("Gracefully shutting down %s engine...", self.provider.mode)
         finally:
             self._cleanup()
 
-    # --- In trikal_engine.py, replace the entire function ---
+    def open_results_run(self):
+        """Registers this session in the results store (if any); closed trades and per-candle equity are recorded under it."""
+        if self.results_store is None or self.run_id is not None:
+            return
+        self.run_id = self.results_store.start_run(
+            self.provider.mode, self.instance_name, self.strategy.name,
+            {"strategy": self.strategy.config, "capital": self.capital_config, "interval_minutes": self.interval_minutes},
+            trading_date=self.run_date.isoformat(), expiry_date=self.expiry_date)
+        self.log.info("🗃️  Recording results as run %s in %s.", self.run_id, self.results_store.path)
+
+    def _record_equity(self, candle_start_time: datetime):
+        close_price = float(self.df_fut_history.iloc[-1]['close'])
+        open_pnl = 0.0
+        trade = self.active_trade
+        if trade:
+            move = trade.entry_price - trade.last_known_price if trade.position_type == 'SHORT' else trade.last_known_price - trade.entry_price
+            open_pnl = move * trade.qty
+        self.results_store.record_equity(self.run_id, candle_start_time + timedelta(minutes=self.interval_minutes), close_price, open_pnl)
+
+    def start_trade_manager(self):
+        if self.provider.is_realtime:
+            self.log.info("🚀 Starting %d-second live trade manager loop...", LIVE_BOT_CONFIG["TRADE_MANAGER_INTERVAL_SEC"])
+            self._stop_event.clear()
+            self.trade_manager_thread = threading.Thread(target=self._live_trade_manager_loop, daemon=True)
+            self.trade_manager_thread.start()
 
     def _live_trade_manager_loop(self):
-        while not getattr(self, '_stop_requested', True):
-            try:
-                # Priority 1: Check for manual override file
-                if self.active_trade and os.path.exists(MANUAL_TRIGGER_FILE):
-                    print(f"   └── [LIVE FAST LOOP] Manual trigger file detected! Executing square-off...")
-                    self._execute_manual_exit("Manual Override")
-                    continue 
-                
-                if self.active_trade:
-                    trade = self.active_trade
-
-                    # --- PRIORITY 2: RESTORED ROBUST STATE SYNCHRONIZATION ---
-                    # This uses get_order_list, which is the ultimate source of truth for executions.
-                    try:
-                        now_time = datetime.now(ist_timezone)
-                        from_date_str = (now_time - timedelta(days=1)).strftime("%Y-%m-%dT06:00:00.000Z")
-                        to_date_str = now_time.strftime("%Y-%m-%dT18:00:00.000Z")
-                        order_list = self.provider.breeze.get_order_list(
-                            exchange_code="NFO", from_date=from_date_str, to_date=to_date_str
-                        )
-                        if order_list and order_list.get('Success'):
-                            for order in reversed(order_list['Success']):
-                                # This complex check correctly identifies our specific exit order.
-                                is_our_trade = (
-                                    order.get('status', '').lower() == 'executed' and
-                                    order.get('action', '').lower() == 'sell' and
-                                    str(int(order.get('strike_price', 0))) == str(int(trade.strike)) and
-                                    order.get('right', '').lower() == ('call' if trade.opt_type == 'C' else 'put') and
-                                    str(order.get('quantity')) == str(trade.qty) and
-                                    pd.to_datetime(order['order_datetime']).tz_localize(ist_timezone) > trade.entry_time
-                                )
-                                if is_our_trade:
-                                    exit_price = float(order['average_price'])
-                                    exit_time = pd.to_datetime(order['order_datetime']).tz_localize(ist_timezone)
-                                    # Determine reason based on price
-                                    exit_reason = "GTT Target Hit" if exit_price >= trade.target_price else "GTT SL Hit"
-                                    if trade.is_winner_mode_active and exit_price <= trade.stoploss_price:
-                                        exit_reason = "Winner Mode SL"
-                                    
-                                    print(f"   └── ✅ [LIVE FAST LOOP] Exit Confirmed via Order List! Reason: {exit_reason}")
-                                    handle_exit_logic(trade, exit_reason, exit_price, exit_time, exit_time.strftime('%H:%M:%S'))
-                                    self._cleanup_after_exit()
-                                    break # Exit the for loop
-                    except Exception as e:
-                        print(f"   └── ⚠️ [LIVE FAST LOOP] Could not get order list for sync: {e}")
-                    
-                    # --- START: NEW 30-SECOND ASYMMETRIC MOMENTUM EXIT LOGIC ---
-                    
-                    # If the trade was closed by the GTT check above, self.active_trade will be None.
-                    # This check ensures we don't proceed if the trade is already closed.
-                    if not self.active_trade:
-                        continue
-
-                    # A. Get the REAL-TIME Option Price (LTP)
-                    right_str = 'call' if trade.opt_type == 'C' else 'put'
-                    ltp_data, _ = self.provider.get_live_ltp(self.expiry_date, right_str, trade.strike)
-                    
-                    if not ltp_data:
-                        # If we can't get the price, skip this check for this loop iteration
-                        time.sleep(30)
-                        continue
-                    
-                    current_ltp = ltp_data['close']
-                    
-                    # B. Determine REAL Profit/Loss State
-                    is_in_profit = current_ltp > trade.entry_price
-                    
-                    # C. Get the latest 5-minute candle with all indicators
-                    latest_candle = self.df_fut_history.iloc[-1]
-                    exit_reason = None
-
-                    if is_in_profit:
-                        # PATIENT CHECK (for winning trades)
-                        if 'EMA_50' in latest_candle and pd.notna(latest_candle['EMA_50']):
-                            if (trade.opt_type == 'C' and latest_candle['close'] < latest_candle['EMA_50']) or \
-                            (trade.opt_type == 'P' and latest_candle['close'] > latest_candle['EMA_50']):
-                                exit_reason = "Momentum Exit (Profit): Breached 50EMA"
-                    else: # If trade is in a loss
-                        # IMPATIENT CHECKS (for losing trades)
-                        if 'ema_slope' in latest_candle and pd.notna(latest_candle['ema_slope']):
-                            if (trade.opt_type == 'C' and latest_candle['ema_slope'] < 0 and latest_candle['ema_slope_p_value'] < 0.15) or \
-                            (trade.opt_type == 'P' and latest_candle['ema_slope'] > 0 and latest_candle['ema_slope_p_value'] < 0.15):
-                                exit_reason = "Momentum Exit (Loss): Slope Reversal"
-                        
-                        if not exit_reason and 'EMA_20' in latest_candle and pd.notna(latest_candle['EMA_20']):
-                            if (trade.opt_type == 'C' and latest_candle['close'] < latest_candle['EMA_20']) or \
-                            (trade.opt_type == 'P' and latest_candle['close'] > latest_candle['EMA_20']):
-                                exit_reason = "Momentum Exit (Loss): Breached 20EMA"
-                    
-                    if exit_reason:
-                        print(f"   └── ⚠️ [LIVE FAST LOOP] ASYMMETRIC MOMENTUM EXIT! Reason: {exit_reason}")
-                        self._execute_manual_exit(exit_reason)
-                        continue # Stop processing this loop after exit
-
-                    # --- END: NEW 30-SECOND MOMENTUM LOGIC ---
-
-                    # Priority 4: Manage "Ride the Winner" GTT modification
-                    use_winner_mode = self.strategy.config.get("USE_RIDE_WINNER_MODE", False)
-                    if use_winner_mode and not trade.is_winner_mode_active:
-                        trigger_pct = self.strategy.config.get("RIDE_WINNER_TRIGGER_PCT", 0.90)
-                        trigger_price = trade.entry_price * (1 + trigger_pct)
-                        if current_ltp >= trigger_price:
-                            print(f"   └── [LIVE FAST LOOP] RIDE WINNER TRIGGERED! Modifying GTT...")
-                            self._modify_gtt_for_winner_mode(trade)
-
-            except Exception as e:
-                print(f"   └── ❌ Error in live trade manager loop: {e}")
-            time.sleep(30)
+        """
+        Fast loop for the open trade. Each tick issues the order-list sync and the LTP quote
+        concurrently, and ticks are scheduled on a fixed cadence measured from the previous
+        tick's start, so slow broker calls do not stretch the interval.
+        """
+        next_tick = time.monotonic()
+        with ThreadPoolExecutor(max_workers=2, thread_name_prefix=f"trikal-{self.instance_name}-mgr") as pool:
+            while not self._stop_event.is_set():
+                cadence = LIVE_BOT_CONFIG["TRADE_MANAGER_INTERVAL_SEC"]
+                try:
+                    cadence = self._trade_manager_tick(pool)
+                except Exception as e:
+                    self.log.error("   └── ❌ Error in live trade manager loop: %s", e)
+
+                next_tick += cadence
+                delay = next_tick - time.monotonic()
+                if delay < 0:
+                    # Overran the cadence: start the next tick now instead of bursting to catch up.
+                    next_tick = time.monotonic()
+                    delay = 0
+                self._stop_event.wait(delay)
+
+    def _trade_manager_tick(self, pool: ThreadPoolExecutor) -> float:
+        """Runs one fast-loop check and returns the number of seconds until the next one."""
+        normal_cadence = LIVE_BOT_CONFIG["TRADE_MANAGER_INTERVAL_SEC"]
+
+        # Priority 1: Check for manual override file
+        if self.active_trade and os.path.exists(MANUAL_TRIGGER_FILE):
+            self.log.warning("   └── [LIVE FAST LOOP] Manual trigger file detected! Executing square-off...")
+            self._execute_manual_exit("Manual Override")
+            return 0
+
+        trade = self.active_trade
+        if not trade:
+            return normal_cadence
+
+        right_str = 'call' if trade.opt_type == 'C' else 'put'
+        exit_sync_future = pool.submit(self._sync_exit_from_order_list, trade)
+        ltp_future = pool.submit(self.provider.get_live_ltp, self.expiry_date, right_str, trade.strike)
+
+        # --- PRIORITY 2: STATE SYNCHRONIZATION ---
+        # The broker's order book is the ultimate source of truth for executions.
+        if exit_sync_future.result():
+            return normal_cadence
+
+        # --- ASYMMETRIC MOMENTUM EXIT LOGIC ---
+        # A. Get the REAL-TIME Option Price (LTP)
+        ltp_data, _ = ltp_future.result()
+        if not ltp_data:
+            # If we can't get the price, skip this check for this tick
+            return normal_cadence
+
+        current_ltp = ltp_data['close']
+
+        # B. Determine REAL Profit/Loss State
+        is_in_profit = current_ltp > trade.entry_price
+
+        # C. Get the latest 5-minute candle with all indicators
+        latest_candle = self.df_fut_history.iloc[-1]
+        exit_reason = None
+
+        if is_in_profit:
+            # PATIENT CHECK (for winning trades)
+            if 'EMA_50' in latest_candle and pd.notna(latest_candle['EMA_50']):
+                if (trade.opt_type == 'C' and latest_candle['close'] < latest_candle['EMA_50']) or \
+                (trade.opt_type == 'P' and latest_candle['close'] > latest_candle['EMA_50']):
+                    exit_reason = "Momentum Exit (Profit): Breached 50EMA"
+        else: # If trade is in a loss
+            # IMPATIENT CHECKS (for losing trades)
+            if 'ema_slope' in latest_candle and pd.notna(latest_candle['ema_slope']):
+                if (trade.opt_type == 'C' and latest_candle['ema_slope'] < 0 and latest_candle['ema_slope_p_value'] < 0.15) or \
+                (trade.opt_type == 'P' and latest_candle['ema_slope'] > 0 and latest_candle['ema_slope_p_value'] < 0.15):
+                    exit_reason = "Momentum Exit (Loss): Slope Reversal"
+
+            if not exit_reason and 'EMA_20' in latest_candle and pd.notna(latest_candle['EMA_20']):
+                if (trade.opt_type == 'C' and latest_candle['close'] < latest_candle['EMA_20']) or \
+                (trade.opt_type == 'P' and latest_candle['close'] > latest_candle['EMA_20']):
+                    exit_reason = "Momentum Exit (Loss): Breached 20EMA"
+
+        if exit_reason:
+            self.log.warning("   └── ⚠️ [LIVE FAST LOOP] ASYMMETRIC MOMENTUM EXIT! Reason: %s", exit_reason)
+            self._execute_manual_exit(exit_reason)
+            return normal_cadence
+
+        # Priority 4: Manage "Ride the Winner" GTT modification
+        use_winner_mode = self.strategy.config.get("USE_RIDE_WINNER_MODE", False)
+        winner_trigger_price = None
+        if use_winner_mode and not trade.is_winner_mode_active:
+            trigger_pct = self.strategy.config.get("RIDE_WINNER_TRIGGER_PCT", 0.90)
+            winner_trigger_price = trade.entry_price * (1 + trigger_pct)
+            if current_ltp >= winner_trigger_price:
+                self.log.info("   └── [LIVE FAST LOOP] RIDE WINNER TRIGGERED! Modifying GTT...")
+                self._modify_gtt_for_winner_mode(trade)
+
+        return self._trade_manager_cadence(trade, current_ltp, winner_trigger_price)
+
+    def _trade_manager_cadence(self, trade: Trade, current_ltp: float, winner_trigger_price: Optional[float]) -> float:
+        """Tightens the fast-loop cadence while the LTP is close to the SL, TP or winner-mode trigger."""
+        near_pct = LIVE_BOT_CONFIG["TRADE_MANAGER_NEAR_PCT"]
+        levels = [trade.stoploss_price, trade.target_price]
+        if winner_trigger_price is not None:
+            levels.append(winner_trigger_price)
+        if current_ltp > 0 and any(abs(current_ltp - level) / current_ltp <= near_pct for level in levels):
+            return LIVE_BOT_CONFIG["TRADE_MANAGER_NEAR_INTERVAL_SEC"]
+        return LIVE_BOT_CONFIG["TRADE_MANAGER_INTERVAL_SEC"]
+
+    def _sync_exit_from_order_list(self, trade: Trade) -> bool:
+        """Closes the trade if the order tracker has seen its executed exit order. Returns True if it did."""
+        if not self.order_tracker.sync(since=trade.entry_time):
+            return False
+        exit_order = self.order_tracker.find_exit('call' if trade.opt_type == 'C' else 'put', trade.strike, trade.qty, after=trade.entry_time)
+        if not exit_order:
+            return False
+
+        exit_price = exit_order['average_price']
+        exit_time = exit_order['order_datetime']
+        # Determine reason based on price
+        exit_reason = "GTT Target Hit" if exit_price >= trade.target_price else "GTT SL Hit"
+        if trade.is_winner_mode_active and exit_price <= trade.stoploss_price:
+            exit_reason = "Winner Mode SL"
+
+        self.log.info("   └── ✅ [LIVE FAST LOOP] Exit Confirmed via Order List! Reason: %s", exit_reason)
+        handle_exit_logic(trade, exit_reason, exit_price, exit_time, exit_time.strftime('%H:%M:%S'))
+        self._cleanup_after_exit()
+        return True
 
     def _modify_gtt_for_winner_mode(self, trade: Trade):
         try:
@@ -201,62 +277,126 @@ class TrikalEngine:
             new_target_price = trade.entry_price * (1 + new_target_pct)
             new_stop_price = trade.entry_price * (1 + profit_lock_pct)
             
-            res = self.provider.breeze.gtt_three_leg_modify_order(
+            res = self.provider.order_api.gtt_three_leg_modify_order(
                 exchange_code="NFO", gtt_order_id=trade.gtt_order_id, gtt_type="oco",
                 order_details=[
                     {"gtt_leg_type": "target", "action": "sell", "limit_price": str(round(new_target_price*0.99, 1)), "trigger_price": str(round(new_target_price, 1))},
                     {"gtt_leg_type": "stoploss", "action": "sell", "limit_price": str(round(new_stop_price*0.99, 1)), "trigger_price": str(round(new_stop_price, 1))},
                 ]
             )
-            print(f"      └── Modify GTT Response: {res}")
+            self.log.info("      └── Modify GTT Response: %s", res)
             if res and res.get('Success'):
                 trade.target_price = new_target_price
                 trade.stoploss_price = new_stop_price
                 trade.is_winner_mode_active = True
-                print("      └── ✅ GTT Modified Successfully for Ride Winner Mode!")
+                self.log.info("      └── ✅ GTT Modified Successfully for Ride Winner Mode!")
         except Exception as e:
-            print(f"      └── ❌ Failed to modify GTT for winner mode: {e}")
+            self.log.error("      └── ❌ Failed to modify GTT for winner mode: %s", e)
 
     def _process_candle(self, candle_start_time: datetime, fut_candle_row: pd.DataFrame):
-        self.df_fut_history = pd.concat([self.df_fut_history, fut_candle_row])
-        self.df_fut_history = self.df_fut_history[~self.df_fut_history.index.duplicated(keep='last')]
+        self.latency.start_candle(candle_start_time + timedelta(minutes=self.interval_minutes))
+        try:
+            self._process_candle_stages(candle_start_time, fut_candle_row)
+        finally:
+            self.latency.end_candle()
+
+    def _process_candle_stages(self, candle_start_time: datetime, fut_candle_row: pd.DataFrame):
+        self.df_fut_history = append_candle(self.df_fut_history, fut_candle_row)
         self.df_fut_history = apply_indicators_and_bias(self.df_fut_history, self.strategy)
-        latest_candle_with_indicators = self.df_fut_history.iloc[[-1]]
-        write_chart_data(latest_candle_with_indicators, self.instance_name, self.provider.mode)
+        self.latency.mark("indicators_done")
+        self._act_on_candle(candle_start_time)
+
+    def process_shared_candle(self, candle_start_time: datetime, df_history: pd.DataFrame, defer_entry: bool = False):
+        """
+        Entry point when indicators are computed once upstream (see trikal_orchestrator) and shared across engines.
+        With defer_entry, an entry signal is returned as (new_trade, options_data_block) instead of being placed,
+        so the caller can submit several accounts' orders together.
+        """
+        self.latency.start_candle(candle_start_time + timedelta(minutes=self.interval_minutes))
+        try:
+            self.df_fut_history = df_history
+            self.latency.mark("indicators_done")
+            return self._act_on_candle(candle_start_time, defer_entry)
+        finally:
+            self.latency.end_candle()
+
+    def _act_on_candle(self, candle_start_time: datetime, defer_entry: bool = False):
+        if not (self.per_instance_backtest_files and self.provider.mode == 'backtest'):
+            write_chart_data(self.df_fut_history.iloc[[-1]], self.instance_name, self.provider.mode)
         
-        close_price = self.df_fut_history.iloc[-1]['close']
-        time_range_str = f"{candle_start_time.strftime('%H:%M')}-{(candle_start_time + timedelta(minutes=self.interval_minutes)).strftime('%H:%M')}"
-        analysis_string = self.strategy.get_analysis_string(self.df_fut_history, self.strategy.config, ist_timezone)
-        print(f"[{time_range_str}] Close Price: {close_price:<8.2f} Analysis: {analysis_string}")
+        if self.candle_log.isEnabledFor(logging.INFO):
+            close_price = self.df_fut_history.iloc[-1]['close']
+            candle_end_time = candle_start_time + timedelta(minutes=self.interval_minutes)
+            analysis_string = self.strategy.get_analysis_string(self.df_fut_history, self.strategy.config, ist_timezone)
+            self.candle_log.info("[%s-%s] Close Price: %-8.2f Analysis: %s", candle_start_time.strftime('%H:%M'), candle_end_time.strftime('%H:%M'), close_price, analysis_string)
 
         if self.active_trade:
             self._handle_price_based_exits(candle_start_time)
+        pending_entry = None
         if not self.active_trade:
-             self._check_for_entry(candle_start_time + timedelta(minutes=self.interval_minutes, seconds=3))
+             pending_entry = self._check_for_entry(candle_start_time + timedelta(minutes=self.interval_minutes, seconds=3), defer_entry)
+        self._warm_entry_candidates(candle_start_time, entry_pending=pending_entry is not None)
+        if self.run_id:
+            self._record_equity(candle_start_time)
+        return pending_entry
+
+    def _warm_entry_candidates(self, candle_start_time: datetime, entry_pending: bool = False):
+        """
+        Prefetches (backtest) or pre-subscribes quotes for (live/paper) the contracts the strategy could
+        enter on the next candle, so the entry path reads warm data. Released once a trade is open.
+        """
+        if self.active_trade or entry_pending:
+            candidates = []
+        else:
+            candidates = self.strategy.entry_candidates(self.df_fut_history)
+        if self.provider.mode == 'backtest':
+            # File reads are cheap next to quote calls, so backtests prefetch every candidate.
+            date_str = candle_start_time.strftime('%Y-%m-%d')
+            for right in {right for right, _ in candidates}:
+                self.provider.prefetch_options(date_str, right, [strike for r, strike in candidates if r == right])
+            return
+        candidates = set(candidates[:LIVE_BOT_CONFIG["WARM_QUOTE_MAX_CONTRACTS"]])
+        for right, strike in self._warm_contracts - candidates:
+            self.provider.unsubscribe_quote(self.expiry_date, right, strike, warm=True)
+        for right, strike in candidates - self._warm_contracts:
+            self.provider.subscribe_quote(self.expiry_date, right, strike, warm=True)
+        self._warm_contracts = candidates
     
-    def _check_for_entry(self, action_timestamp: datetime):
+    def _check_for_entry(self, action_timestamp: datetime, defer_entry: bool = False):
         new_trade, options_data_block = self.strategy.check_entry(
             self.provider, self.df_fut_history, self.expiry_date, self.capital_config, action_timestamp
         )
+        self.latency.mark("signal")
         if new_trade:
+            if defer_entry:
+                return new_trade, options_data_block
             self._handle_entry_signal(new_trade, options_data_block)
+        return None
 
     def _handle_entry_signal(self, new_trade: Trade, options_data_block: Optional[pd.DataFrame]):
+        self._place_entry(new_trade)
+        self._simulate_backtest_entry(options_data_block)
+
+    def _place_entry(self, new_trade: Trade):
+        """Opens the trade and, in live/paper mode, places its GTT order. Safe to run on an OrderFanout worker."""
         if os.path.exists(MANUAL_TRIGGER_FILE):
             try:
                 os.remove(MANUAL_TRIGGER_FILE)
             except (FileNotFoundError, OSError) as e:
-                print(f"   └── ⚠️  Error removing trigger file: {e}")
+                self.log.warning("   └── ⚠️  Error removing trigger file: %s", e)
 
         self.active_trade = new_trade
         self.active_trade.instance_name = self.instance_name
         self.active_trade.mode = self.provider.mode
+        self.active_trade.per_instance_csv = self.per_instance_backtest_files
+        if self.run_id:
+            self.active_trade.results_sink = partial(self.results_store.record_trade, self.run_id)
 
         log_entry_time = self.active_trade.entry_time_str.split(' ')[-1] if ' ' in self.active_trade.entry_time_str else self.active_trade.entry_time_str
-        print(f"[{log_entry_time}] 🔔 SIGNAL | {self.active_trade.contract} | Qty: {self.active_trade.qty} at ~{self.active_trade.entry_price:.2f} | SL: {self.active_trade.stoploss_price:.2f} | TP: {self.active_trade.target_price:.2f}")
+        self.log.info("[%s] 🔔 SIGNAL | %s | Qty: %s at ~%.2f | SL: %.2f | TP: %.2f", log_entry_time, self.active_trade.contract, self.active_trade.qty, self.active_trade.entry_price, self.active_trade.stoploss_price, self.active_trade.target_price)
 
-        if self.provider.mode == 'live':
-            print("   └── [LIVE] Placing 3-leg GTT order...")
+        if self.provider.is_realtime:
+            self.log.info("   └── [%s] Placing 3-leg GTT order...", self.provider.mode.upper())
             try:
                 sl_trigger = round(self.active_trade.stoploss_price, 1)
                 sl_limit = round(sl_trigger * 0.99, 1)
@@ -265,7 +405,7 @@ class TrikalEngine:
                 entry_limit_price = round(self.active_trade.entry_price * 1.01, 1)
                 expiry_date_api_format = f"{self.expiry_date}T06:00:00.000Z"
                 
-                res = self.provider.breeze.gtt_three_leg_place_order(
+                res = self.provider.order_api.gtt_three_leg_place_order(
                     exchange_code="NFO", stock_code="NIFTY", product="options",
                     quantity=str(self.active_trade.qty), expiry_date=expiry_date_api_format,
                     right="call" if self.active_trade.opt_type == 'C' else "put",
@@ -278,27 +418,33 @@ class TrikalEngine:
                         {"gtt_leg_type": "stoploss", "action": "sell", "limit_price": str(sl_limit), "trigger_price": str(sl_trigger)},
                     ]
                 )
+                self.latency.mark("order_acked")
                 if res and res.get('Success') and res.get('Success').get('gtt_order_id'):
                     self.active_trade.gtt_order_id = res['Success']['gtt_order_id']
-                    print(f"   └── ✅ [LIVE] GTT Order Placed Successfully! Main ID: {self.active_trade.gtt_order_id}")
+                    self.provider.subscribe_quote(self.expiry_date, 'call' if self.active_trade.opt_type == 'C' else 'put', self.active_trade.strike)
+                    self.log.info("   └── ✅ [%s] GTT Order Placed Successfully! Main ID: %s", self.provider.mode.upper(), self.active_trade.gtt_order_id)
                 else:
-                    print(f"   └── ❌ [LIVE] GTT Order Placement FAILED. Response: {res}")
+                    self.log.error("   └── ❌ [%s] GTT Order Placement FAILED. Response: %s", self.provider.mode.upper(), res)
                     self.active_trade = None
             except Exception as e:
-                print(f"   └── ❌ [LIVE] An exception occurred during GTT order placement: {e}")
+                self.log.error("   └── ❌ [%s] An exception occurred during GTT order placement: %s", self.provider.mode.upper(), e)
                 self.active_trade = None
 
-        elif self.provider.mode == 'backtest':
+    def _simulate_backtest_entry(self, options_data_block: Optional[pd.DataFrame]):
+        """Backtest only: replays the entry minute's 1s data for exits. Runs on the candle thread, as it uses the shared provider."""
+        if self.provider.mode == 'backtest' and self.active_trade:
+            self.provider.prefetch_neighbour_strikes(self.active_trade.entry_time.strftime('%Y-%m-%d'),
+                                                     'call' if self.active_trade.opt_type == 'C' else 'put', self.active_trade.strike)
             self._iterate_and_check_exits(options_data_block)
     
     def _handle_price_based_exits(self, candle_start_time: datetime):
         if not self.active_trade: return
 
-        # In live mode, this function handles EOD and momentum exits. GTT is in the fast loop.
-        if self.provider.mode == 'live':
+        # In live/paper mode, this function handles EOD and momentum exits. GTT is in the fast loop.
+        if self.provider.is_realtime:
             now_time = datetime.now(ist_timezone)
             if now_time >= self.square_off_time:
-                print(f"   └── [LIVE EOD] Squaring off position...")
+                self.log.info("   └── [LIVE EOD] Squaring off position...")
                 self._execute_manual_exit("Square-Off")
                 return
         
@@ -328,16 +474,20 @@ class TrikalEngine:
         # --- END: Backtest Logic Restructuring ---
         
     def _execute_manual_exit(self, reason: str):
-        if not self.active_trade or self.provider.mode != 'live':
+        if not self.active_trade or not self.provider.is_realtime:
             return
         
         # Store the trade object locally before we potentially clear it
         trade_to_exit = self.active_trade
         
         try:
-            print(f"      └── Placing market square-off order for reason: {reason}...")
+            # The subscribed quote is the freshest price at the moment we decide to exit.
+            ltp_data, _ = self.provider.get_live_ltp(self.expiry_date, 'call' if trade_to_exit.opt_type == 'C' else 'put', trade_to_exit.strike)
+            exit_price = ltp_data['close'] if ltp_data else trade_to_exit.entry_price
+
+            self.log.info("      └── Placing market square-off order for reason: %s...", reason)
             # --- (API calls remain the same) ---
-            res = self.provider.breeze.square_off(
+            res = self.provider.order_api.square_off(
                 exchange_code="NFO", product="options", stock_code="NIFTY",
                 expiry_date=f"{self.expiry_date}T06:00:00.000Z",
                 right="call" if trade_to_exit.opt_type == 'C' else "put",
@@ -345,28 +495,25 @@ class TrikalEngine:
                 action="sell", order_type="market", validity="day",
                 quantity=str(trade_to_exit.qty)
             )
-            print(f"      └── Square-off response: {res}")
+            self.log.info("      └── Square-off response: %s", res)
             
             if trade_to_exit.gtt_order_id:
                 try:
-                    print(f"      └── Cleaning up by cancelling GTT order ID: {trade_to_exit.gtt_order_id}...")
-                    cancel_res = self.provider.breeze.gtt_three_leg_cancel_order(
+                    self.log.info("      └── Cleaning up by cancelling GTT order ID: %s...", trade_to_exit.gtt_order_id)
+                    cancel_res = self.provider.order_api.gtt_three_leg_cancel_order(
                         exchange_code="NFO",
                         gtt_order_id=trade_to_exit.gtt_order_id
                     )
-                    print(f"      └── GTT Cancel response: {cancel_res}")
+                    self.log.info("      └── GTT Cancel response: %s", cancel_res)
                 except Exception as e:
-                    print(f"      └── ⚠️ [LIVE] Could not cancel GTT order. Please check manually. Error: {e}")
+                    self.log.error("      └── ⚠️ [%s] Could not cancel GTT order. Please check manually. Error: %s", self.provider.mode.upper(), e)
 
             # Log the successful exit
             now_time = datetime.now(ist_timezone)
-            ltp_data, _ = self.provider.get_live_ltp(self.expiry_date, 'call' if trade_to_exit.opt_type == 'C' else 'put', trade_to_exit.strike)
-            exit_price = ltp_data['close'] if ltp_data else trade_to_exit.entry_price
-            
             handle_exit_logic(trade_to_exit, reason, exit_price, now_time, now_time.strftime('%H:%M:%S'))
 
         except Exception as e:
-            print(f"      └── ❌ [LIVE] An exception occurred during forced exit: {e}")
+            self.log.error("      └── ❌ [%s] An exception occurred during forced exit: %s", self.provider.mode.upper(), e)
             # Even if the exit fails, we should still log an attempt and clean up
             # so the bot doesn't get stuck. We can use last known price for logging.
             now_time = datetime.now(ist_timezone)
@@ -375,7 +522,7 @@ class TrikalEngine:
         finally:
             # --- THIS BLOCK IS THE CRITICAL FIX ---
             # It will run ALWAYS, whether the try block succeeded or failed.
-            print(f"      └── Finalizing manual exit: Cleaning up state and trigger file.")
+            self.log.info("      └── Finalizing manual exit: Cleaning up state and trigger file.")
             
             # 1. Clean up the bot's internal state
             self._cleanup_after_exit() 
@@ -384,9 +531,9 @@ class TrikalEngine:
             try:
                 if os.path.exists(MANUAL_TRIGGER_FILE):
                     os.remove(MANUAL_TRIGGER_FILE)
-                    print(f"      └── Trigger file '{MANUAL_TRIGGER_FILE}' removed.")
+                    self.log.info("      └── Trigger file '%s' removed.", MANUAL_TRIGGER_FILE)
             except (FileNotFoundError, OSError) as e:
-                print(f"      └── ⚠️  Could not remove trigger file: {e}")
+                self.log.warning("      └── ⚠️  Could not remove trigger file: %s", e)
             # --- END OF FIX ---
 
 
@@ -433,7 +580,7 @@ class TrikalEngine:
                                 trade.target_price = trade.entry_price * (1 + new_target_pct)
                                 trade.stoploss_price = trade.entry_price * (1 + profit_lock_pct)
                                 trade.is_winner_mode_active = True
-                                print(f"   └── [{opt_timestamp.strftime('%H:%M:%S')}] RIDE WINNER MODE ARMED! New TP: {trade.target_price:.2f}, New SL: {trade.stoploss_price:.2f}")
+                                self.log.info("   └── [%s] RIDE WINNER MODE ARMED! New TP: %.2f, New SL: %.2f", opt_timestamp.strftime('%H:%M:%S'), trade.target_price, trade.stoploss_price)
 
                 # B. Check for Asymmetric Momentum Exits (Original "Impatient" Logic)
                 is_in_profit = current_ltp > trade.entry_price
@@ -457,21 +604,20 @@ class TrikalEngine:
                             exit_reason = "Momentum Exit (Loss): Breached 20EMA"
                 
                 if exit_reason:
-                    print(f"   └── ⚠️ [{opt_timestamp.strftime('%H:%M:%S')}] ASYMMETRIC MOMENTUM EXIT! Reason: {exit_reason}")
+                    self.log.info("   └── ⚠️ [%s] ASYMMETRIC MOMENTUM EXIT! Reason: %s", opt_timestamp.strftime('%H:%M:%S'), exit_reason)
                     handle_exit_logic(trade, exit_reason, current_ltp, opt_timestamp, opt_timestamp.strftime('%H:%M:%S'))
                     self.active_trade = None
                     return
 
             # --- PRIORITY 2: BROKER-SIDE GTT SIMULATION (CHECKED ON EVERY TICK) ---
-            if tick.low <= trade.stoploss_price:
-                exit_reason = "SL Hit"
-                if trade.is_winner_mode_active: exit_reason = "Winner Mode SL"
-                handle_exit_logic(trade, exit_reason, trade.stoploss_price, opt_timestamp, opt_timestamp.strftime('%H:%M:%S'))
-                self.active_trade = None
-                return
-
-            if tick.high >= trade.target_price:
-                handle_exit_logic(trade, "Target Hit", trade.target_price, opt_timestamp, opt_timestamp.strftime('%H:%M:%S'))
+            leg_hit = gtt_leg_hit(tick.low, tick.high, trade.stoploss_price, trade.target_price)
+            if leg_hit:
+                leg, fill_price = leg_hit
+                if leg == 'stoploss':
+                    exit_reason = "Winner Mode SL" if trade.is_winner_mode_active else "SL Hit"
+                else:
+                    exit_reason = "Target Hit"
+                handle_exit_logic(trade, exit_reason, fill_price, opt_timestamp, opt_timestamp.strftime('%H:%M:%S'))
                 self.active_trade = None
                 return
 
@@ -483,16 +629,22 @@ class TrikalEngine:
             self.active_trade.last_known_price = valid_ticks_df.iloc[-1].close        
             
     def _cleanup_after_exit(self):
+        if self.active_trade and self.provider.is_realtime:
+            self.provider.unsubscribe_quote(self.expiry_date, 'call' if self.active_trade.opt_type == 'C' else 'put', self.active_trade.strike)
         self.active_trade = None
 
     def _cleanup(self):
         if hasattr(self, 'trade_manager_thread') and self.trade_manager_thread.is_alive():
-            print("🛑 Stopping live trade manager loop...")
-            self._stop_requested = True
+            self.log.info("🛑 Stopping live trade manager loop...")
+            self._stop_event.set()
             self.trade_manager_thread.join(timeout=5)
         
+        if self.latency.enabled:
+            self.log.info("⏱️  Latency summary: %s", self.latency.summary_string())
         if self.active_trade:
-            print("Engine shutting down with an active trade. This should not happen in a clean exit.")
+            self.log.warning("Engine shutting down with an active trade. This should not happen in a clean exit.")
+        if self.run_id:
+            self.results_store.finish_run(self.run_id)
         if self.provider:
             self.provider.shutdown()
-        print("✅ Engine has stopped.")
\ No newline at end of file
+        self.log.info("✅ Engine has stopped.")
\ No newline at end of file
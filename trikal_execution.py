@@ -0,0 +1,98 @@
+# --- START OF FILE trikal_execution.py ---
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from trikal_latency import percentile
+from trikal_logging import get_logger, LATENCY_LOGGER
+
+log = get_logger("trikal.execution")
+
+
+class OrderFanout:
+    """
+    Places one signal's entry orders for several accounts at the same time. Each account's
+    _place_entry runs on its own worker thread, so the last account no longer waits for every
+    earlier account's GTT round trip. With rotate=True the submission order shifts by one
+    account per signal so queueing delay is spread evenly. Only order placement runs on the
+    workers; the caller does the rest of the entry (e.g. the backtest exit replay) on its own thread.
+    """
+
+    def __init__(self, max_workers: int = 8, rotate: bool = True, window: int = 200):
+        self.rotate = rotate
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="trikal-fanout")
+        self._rotation = 0
+        self._window = window
+        self.submit_latency = {}
+        self.ack_latency = {}
+
+    def execute(self, pending_entries):
+        """
+        `pending_entries` is a list of (engine, new_trade, options_data_block). Blocks until every
+        account's placement has returned and returns {instance_name: (submit_sec, ack_sec)}.
+        """
+        if not pending_entries:
+            return {}
+        ordered = list(pending_entries)
+        if self.rotate and len(ordered) > 1:
+            offset = self._rotation % len(ordered)
+            ordered = ordered[offset:] + ordered[:offset]
+            self._rotation += 1
+
+        positions = {engine.instance_name: i for i, (engine, _, _) in enumerate(ordered)}
+        fanout_start = time.perf_counter()
+        futures = [
+            (engine, self._pool.submit(self._place, engine, new_trade, options_data_block, fanout_start))
+            for engine, new_trade, options_data_block in ordered
+        ]
+
+        results = {}
+        for engine, future in futures:
+            try:
+                submit_sec, ack_sec = future.result()
+            except Exception as e:
+                log.error("   └── ❌ [%s] Entry placement raised: %s", engine.instance_name, e)
+                continue
+            results[engine.instance_name] = (submit_sec, ack_sec)
+            self.submit_latency.setdefault(engine.instance_name, deque(maxlen=self._window)).append(submit_sec)
+            self.ack_latency.setdefault(engine.instance_name, deque(maxlen=self._window)).append(ack_sec)
+            # The engine's tracker ignores marks from worker threads, so its order_acked stage is recorded here.
+            engine.latency.record("order_acked", ack_sec)
+            get_logger(LATENCY_LOGGER, engine.instance_name).info({
+                "instance": engine.instance_name,
+                "event": "order_fanout",
+                "time": datetime.now().isoformat(),
+                "accounts": len(ordered),
+                "position": positions[engine.instance_name],
+                "submit_sec": round(submit_sec, 4),
+                "ack_sec": round(ack_sec, 4),
+            })
+
+        log.info("   └── 📤 Fanned out entry to %d account(s): %s", len(results),
+                 ", ".join(f"{name} submit={s * 1000:.0f}ms ack={a * 1000:.0f}ms" for name, (s, a) in results.items()))
+        return results
+
+    @staticmethod
+    def _place(engine, new_trade, options_data_block, fanout_start):
+        submitted = time.perf_counter()
+        engine._place_entry(new_trade)
+        acked = time.perf_counter()
+        return submitted - fanout_start, acked - submitted
+
+    def summary(self):
+        out = {}
+        for name, values in self.ack_latency.items():
+            ack_sorted = sorted(values)
+            submit_sorted = sorted(self.submit_latency[name])
+            out[name] = {
+                "n": len(ack_sorted),
+                "submit_p50": round(percentile(submit_sorted, 0.50), 4),
+                "ack_p50": round(percentile(ack_sorted, 0.50), 4),
+                "ack_p95": round(percentile(ack_sorted, 0.95), 4),
+            }
+        return out
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
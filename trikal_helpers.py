@@ -7,11 +7,18 @@ from datetime import datetime, date, timedelta
 import csv
 import calendar
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Callable, Optional
 # --- ADDED IMPORTS ---
 import numpy as np
-from scipy import stats
+from trikal_indicators import rolling_ols
+from trikal_schema import enforce_ohlcv_schema
+from trikal_charges import compute_charges
 # --- END ADDED IMPORTS ---
+from trikal_logging import get_logger, CANDLE_LOGGER
+
+log = get_logger("trikal.helpers")
+trade_log = get_logger("trikal.trades")
+candle_log = get_logger(CANDLE_LOGGER)
 
 
 # ==============================================================================
@@ -42,8 +49,12 @@ class Trade:
     # --- MODIFICATION: Added fields to track instance and mode for logging ---
     instance_name: str = "default"
     mode: str = "live"
+    # Backtests with several engines log each one's trades to its own file instead of the shared one.
+    per_instance_csv: bool = False
     
     is_winner_mode_active: bool = False
+    # Set by the engine when the run is recorded in a results store; called once with the final exit figures.
+    results_sink: Optional[Callable] = field(default=None, repr=False)
 
     def __post_init__(self):
         self.highest_ltp = self.entry_price
@@ -54,7 +65,19 @@ class Trade:
 # ==============================================================================
 # --- CONFIGURATIONS & HELPERS ---
 # ==============================================================================
-LIVE_BOT_CONFIG = {"NO_ENTRY_AFTER": (15, 00), "SQUARE_OFF_TIME": (15, 20)}
+LIVE_BOT_CONFIG = {
+    "NO_ENTRY_AFTER": (15, 00), "SQUARE_OFF_TIME": (15, 20),
+    # Live trade-manager cadence: normal interval, and the tighter one used when LTP is within
+    # TRADE_MANAGER_NEAR_PCT of the SL, TP or ride-winner trigger.
+    "TRADE_MANAGER_INTERVAL_SEC": 30, "TRADE_MANAGER_NEAR_INTERVAL_SEC": 5, "TRADE_MANAGER_NEAR_PCT": 0.02,
+    # Quote cache: subscribed contracts are re-quoted every QUOTE_POLL_INTERVAL_SEC (warm entry candidates only
+    # every WARM_QUOTE_POLL_INTERVAL_SEC, and at most WARM_QUOTE_MAX_CONTRACTS of them per engine), and a cached
+    # LTP older than QUOTE_MAX_AGE_SEC is re-fetched on read. Kept modest to stay inside Breeze's daily call quota.
+    "QUOTE_POLL_INTERVAL_SEC": 5, "WARM_QUOTE_POLL_INTERVAL_SEC": 15, "WARM_QUOTE_MAX_CONTRACTS": 2, "QUOTE_MAX_AGE_SEC": 6,
+    # Backtest 1s options cache: memory budget across all cached contract-days, and how many strikes on
+    # each side of a newly traded strike are loaded in the background.
+    "OPTIONS_CACHE_MAX_MB": 512, "OPTIONS_PREFETCH_NEIGHBOURS": 1, "OPTIONS_STRIKE_STEP": 50,
+}
 MANUAL_TRIGGER_FILE = "MANUAL_SQUARE_OFF.trigger"
 ist_timezone = pytz.timezone("Asia/Kolkata")
 
@@ -99,24 +122,36 @@ def is_sideways_market(df, lookback, ema_short_col, ema_long_col, ema_diff_thres
             reasons.append(f"Flat+LowVol({ema_gap_ratio:.4f}, {range_ratio:.4f})")
         if choppy:
             reasons.append(f"Choppy({crossover_flips} flips)")
-        print(f"   └── Sideways Market Detected. Reason(s): {', '.join(reasons)}. No entry.")
+        candle_log.info("   └── Sideways Market Detected. Reason(s): %s. No entry.", ', '.join(reasons))
         return True
 
     return False
 
 
+def gtt_leg_hit(low: float, high: float, stoploss_price: float, target_price: float):
+    """
+    Broker-side GTT OCO simulation for one price update. Returns ('stoploss', fill_price),
+    ('target', fill_price) or None. The stop-loss leg is checked first and legs fill at their trigger.
+    """
+    if low <= stoploss_price:
+        return 'stoploss', stoploss_price
+    if high >= target_price:
+        return 'target', target_price
+    return None
+
+
 def handle_exit_logic(trade: Trade, exit_reason: str, exit_price: float, exit_time: datetime, exit_time_str: str):
     final_high = max(trade.highest_ltp, trade.last_known_price)
     final_low = min(trade.lowest_ltp, trade.last_known_price)
     log_exit_time = exit_time_str.split(' ')[-1] if ' ' in exit_time_str else exit_time_str
-    print(f"💰 EXIT at {log_exit_time} | {trade.contract} at {exit_price:.2f} | Reason: {exit_reason} | HLtp: {final_high:.2f}, LLtp: {final_low:.2f}")
+    trade_log.info("💰 EXIT at %s | %s at %.2f | Reason: %s | HLtp: %.2f, LLtp: %.2f", log_exit_time, trade.contract, exit_price, exit_reason, final_high, final_low, extra={"instance": trade.instance_name})
 
     if trade.position_type == 'SHORT':
         gross_pnl = (trade.entry_price - exit_price) * trade.qty
     else:
         gross_pnl = (exit_price - trade.entry_price) * trade.qty
 
-    charges = calculate_detailed_charges(trade.entry_price, exit_price, trade.qty)
+    charges = calculate_detailed_charges(trade.entry_price, exit_price, trade.qty, exit_time.date())
     net_pnl = gross_pnl - charges
     csv_entry_time = trade.entry_time_str.split(' ')[-1] if ' ' in trade.entry_time_str else trade.entry_time_str
     csv_exit_time = exit_time_str.split(' ')[-1] if ' ' in exit_time_str else exit_time_str
@@ -127,7 +162,9 @@ def handle_exit_logic(trade: Trade, exit_reason: str, exit_price: float, exit_ti
                       "ExitPrice": f"{exit_price:.2f}", "ExitReason": exit_reason,
                       "NetPnL": f"{net_pnl:.2f}"}
     # --- MODIFICATION: Pass the instance_name and mode from the trade to the logger ---
-    log_trade_to_csv(trade_log_data, trade.instance_name, trade.mode)
+    log_trade_to_csv(trade_log_data, trade.instance_name, trade.mode, per_instance=trade.per_instance_csv)
+    if trade.results_sink:
+        trade.results_sink(trade, exit_reason, exit_price, exit_time, gross_pnl, charges, net_pnl, final_high, final_low)
 
 def robust_datetime_parser(series):
     def convert_element(dt_obj):
@@ -145,7 +182,7 @@ def robust_datetime_parser(series):
 
 def parse_breeze_response(response, contract_info=""):
     if not response or not isinstance(response, dict):
-        print(f"⚠️ Invalid or empty Breeze response for {contract_info}. Response: {response}")
+        log.warning("⚠️ Invalid or empty Breeze response for %s. Response: %s", contract_info, response)
         return []
     if response.get('Status') == 200:
         if 'Success' in response:
@@ -163,7 +200,7 @@ def load_and_prepare_data(provider, expiry_date, mode, target_date_obj=None):
     from_date = to_date - timedelta(days=40)
     from_date_str = from_date.strftime("%Y-%m-%dT%H:%M:%S.000Z")
     to_date_str = to_date.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-    print(f"   └── Fetching warm-up data from {from_date.strftime('%Y-%m-%d')} to {to_date.strftime('%Y-%m-%d %H:%M:%S')}...")
+    log.info("   └── Fetching warm-up data from %s to %s...", from_date.strftime('%Y-%m-%d'), to_date.strftime('%Y-%m-%d %H:%M:%S'))
     response = provider.get_initial_historical_data(from_date_str, to_date_str, expiry_date)
     fut_data_list = parse_breeze_response(response, "Initial Futures")
     if not fut_data_list: return None
@@ -174,82 +211,41 @@ def load_and_prepare_data(provider, expiry_date, mode, target_date_obj=None):
     df_fut = df_fut.drop_duplicates(subset=["datetime"]).sort_values("datetime").set_index("datetime")
     for col in ["high", "low", "close", "open", "volume"]:
         df_fut[col] = pd.to_numeric(df_fut[col], errors='coerce')
-    print(f"✅ Initial data preparation complete. Loaded {len(df_fut)} warm-up candles.")
+    df_fut = enforce_ohlcv_schema(df_fut, "Initial Futures")
+    log.info("✅ Initial data preparation complete. Loaded %d warm-up candles.", len(df_fut))
     return df_fut
 
 # --- ADDED THIS ENTIRE FUNCTION ---
-def rolling_ols_slope(series, lookback):
+def rolling_ols_slope(series, lookback, with_p_value=True):
     """
     Calculates a statistically robust slope using Ordinary Least Squares regression.
-    Also returns the p-value to measure the slope's significance.
+    Also returns the p-value to measure the slope's significance (left NaN when with_p_value is False).
     """
-    # --- CHANGE 1: DO NOT reset the index here. Keep the original DatetimeIndex. ---
-    # s = pd.Series(series).reset_index(drop=True) # <-- OLD LINE
-    s = pd.Series(series) # <-- NEW LINE
-
-    n = len(s)
-    # Initialize with the original index
-    out = {'slope': pd.Series(index=s.index, dtype=float), 
-           'p_value': pd.Series(index=s.index, dtype=float)}
-    
-    # We need to iterate using integer positions, but access data using the series `s`
-    series_values = s.values
+    s = pd.Series(series)
+    slope, p_value = rolling_ols(s.to_numpy(dtype=float), lookback, with_p_value)
+    return pd.DataFrame({'slope': slope, 'p_value': p_value if with_p_value else np.nan}, index=s.index)
 
-    for t in range(lookback - 1, n):
-        y = series_values[t - lookback + 1: t + 1]
-        if np.any(np.isnan(y)):
-            continue
-        
-        x = np.arange(lookback).astype(float)
-        x_mean = x.mean()
-        y_mean = y.mean()
-        denom = np.sum((x - x_mean)**2)
-        if denom == 0:
-            continue
-            
-        beta = np.sum((x - x_mean) * (y - y_mean)) / denom
-        alpha = y_mean - beta * x_mean
-        residuals = y - (alpha + beta * x)
-        dof = lookback - 2
-        if dof <= 0:
-            continue
-            
-        sigma2 = np.sum(residuals**2) / dof
-        se_beta = np.sqrt(sigma2 / denom)
-        t_stat = beta / (se_beta + 1e-12)
-        pval = 2 * (1 - stats.t.cdf(abs(t_stat), df=dof))
-
-        # --- CHANGE 2: Use .iloc to assign to the correct integer position in our output Series ---
-        out['slope'].iloc[t] = beta
-        out['p_value'].iloc[t] = pval
-
-    # The returned DataFrame now has the correct DatetimeIndex
-    return pd.DataFrame(out)# --- END OF ADDITION ---
+def ema_slope_specs(strategy):
+    """
+    The EMA slopes apply_indicators_and_bias adds, as (output columns by OLS result key, source column, lookback).
+    The short EMA slope keeps its p-value; the long EMA slope only needs the slope.
+    """
+    lookback = strategy.config.get("SLOPE_LOOKBACK_PERIOD", 20)
+    return [
+        ({"slope": "ema_slope", "p_value": "ema_slope_p_value"}, f"EMA_{strategy.config.get('SHORT_EMA_PERIOD', 20)}", lookback),
+        ({"slope": "long_ema_slope"}, f"EMA_{strategy.config.get('LONG_EMA_PERIOD', 50)}", lookback),
+    ]
 
 # --- THIS FUNCTION HAS BEEN MODIFIED ---
 def apply_indicators_and_bias(df, strategy):
     df = strategy.add_indicators(df.copy())
     
-    # Calculate the statistically significant slope of the 20-EMA
-    ema_short_period = strategy.config.get("SHORT_EMA_PERIOD", 20)
-    ema_short_slope_lookback = strategy.config.get("SLOPE_LOOKBACK_PERIOD", 20)
-    ema_short_col = f"EMA_{ema_short_period}"
-    
-    if ema_short_col in df.columns and not df[ema_short_col].isnull().all():
-        ols_results_ema_short = rolling_ols_slope(df[ema_short_col], ema_short_slope_lookback)
-        df['ema_slope'] = ols_results_ema_short['slope']
-        df['ema_slope_p_value'] = ols_results_ema_short['p_value']
-
-    # --- ADD THIS ENTIRE BLOCK ---
-    # Calculate the statistically significant slope of the 50-EMA
-    ema_long_period = strategy.config.get("LONG_EMA_PERIOD", 50)
-    ema_long_slope_lookback = strategy.config.get("SLOPE_LOOKBACK_PERIOD", 20) # Can use the same lookback
-    ema_long_col = f"EMA_{ema_long_period}"
-
-    if ema_long_col in df.columns and not df[ema_long_col].isnull().all():
-        ols_results_ema_long = rolling_ols_slope(df[ema_long_col], ema_long_slope_lookback)
-        df['long_ema_slope'] = ols_results_ema_long['slope']
-    # --- END OF ADDITION ---
+    # Calculate the statistically significant slopes of the 20-EMA and 50-EMA
+    for output_columns, source_col, lookback in ema_slope_specs(strategy):
+        if source_col in df.columns and not df[source_col].isnull().all():
+            ols_results = rolling_ols_slope(df[source_col], lookback, with_p_value="p_value" in output_columns)
+            for result_key, column in output_columns.items():
+                df[column] = ols_results[result_key]
             
     return df
 # --- END OF MODIFICATION ---
@@ -300,19 +296,18 @@ def is_trade_restricted(run_date: date, expiry_date_str: str, days_to_restrict:
         current_date_check -= timedelta(days=1)
     return run_date in restricted_dates
 
-def calculate_detailed_charges(buy_price, sell_price, qty):
-    FLAT_BROKERAGE_PER_ORDER = 20.0; EXCHANGE_TXN_CHARGE_PERC = 0.00053; GST_PERC = 0.18
-    SEBI_CHARGE_PERC = 0.000001; STT_SELL_PERC = 0.000625; STAMP_DUTY_PERC = 0.000003
-    buy_value = buy_price * qty; sell_value = sell_price * qty; turnover = buy_value + sell_value
-    brokerage = FLAT_BROKERAGE_PER_ORDER * 2; stt = sell_value * STT_SELL_PERC
-    exchange_txn_charge = turnover * EXCHANGE_TXN_CHARGE_PERC; sebi_charge = turnover * SEBI_CHARGE_PERC
-    stamp_duty = buy_value * STAMP_DUTY_PERC; gst = (brokerage + exchange_txn_charge + sebi_charge) * GST_PERC
-    return brokerage + stt + exchange_txn_charge + sebi_charge + stamp_duty + gst
+def calculate_detailed_charges(buy_price, sell_price, qty, trade_date=None):
+    """Total charges for one round trip; see trikal_charges for the fee schedule and the vectorised version."""
+    return float(compute_charges(buy_price, sell_price, qty, trade_date)["total"][0])
 
 # --- MODIFICATION: Logging functions now use the 'mode' to determine the filename ---
-def log_trade_to_csv(trade_log_data, instance_name="default", mode="live"):
+def log_trade_to_csv(trade_log_data, instance_name="default", mode="live", per_instance=False):
     if mode == 'live':
         file_path = f'trades_summary_{instance_name}.csv'
+    elif mode == 'paper':
+        file_path = f'trades_summary_paper_{instance_name}.csv'
+    elif per_instance:  # backtest with several engines
+        file_path = f'trades_summary_backtest_{instance_name}.csv'
     else:  # backtest mode
         file_path = 'trades_summary.csv'
     
@@ -323,7 +318,7 @@ def log_trade_to_csv(trade_log_data, instance_name="default", mode="live"):
             writer = csv.DictWriter(csvfile, fieldnames=headers)
             if not file_exists: writer.writeheader()
             writer.writerow(trade_log_data)
-    except IOError as e: print(f"❌ Error writing to trade summary CSV: {e}")
+    except IOError as e: log.error("❌ Error writing to trade summary CSV: %s", e)
 
 # In trikal_helpers.py
 
@@ -343,6 +338,8 @@ def write_chart_data(df_to_write: pd.DataFrame, instance_name="default", mode="l
 
     if mode == 'live':
         file_path = f'live_chart_data_{instance_name}.csv'
+    elif mode == 'paper':
+        file_path = f'paper_chart_data_{instance_name}.csv'
     else:  # backtest mode
         # In backtest mode, we will now intelligently append to a single, persistent file.
         file_path = 'live_chart_data.csv'
@@ -355,9 +352,9 @@ def write_chart_data(df_to_write: pd.DataFrame, instance_name="default", mode="l
         df_to_write.to_csv(file_path, mode='a', header=not file_exists, index=True, index_label='datetime')
         
         if not file_exists:
-            print(f"📈 Created and wrote initial data to {file_path}")
+            log.info("📈 Created and wrote initial data to %s", file_path)
         
     except IOError as e:
-        print(f"❌ Error writing chart data to CSV: {e}")
+        log.error("❌ Error writing chart data to CSV: %s", e)
 
 # --- END OF REPLACEMENT ---
@@ -0,0 +1,391 @@
+# --- START OF FILE trikal_indicators.py ---
+#
+# NumPy implementations of the indicators the strategies use, so the per-candle path no longer goes
+# through pandas_ta. Batch functions take array-likes and return float64 arrays aligned with the
+# input (NaN until the indicator has enough data); the *State classes compute the same values one
+# bar at a time. With TRIKAL_NUMBA=1 (and numba installed) the recursive cores are compiled; it is
+# opt-in because importing numba costs more startup time than a backtest spends in these loops.
+#
+# Conventions (checked by `python trikal_indicators.py`):
+#   ema        SMA-seeded EMA, identical to pandas_ta.ema(talib=False, presma=True) and TA-Lib EMA.
+#   sma        Plain rolling mean.
+#   atr, rsi   Wilder smoothing seeded with an SMA, identical to TA-Lib ATR/RSI.
+#   vwap       Session-anchored VWAP on the typical price, identical to pandas_ta.vwap(anchor="D").
+#   rolling_ols  Least-squares slope of the last `lookback` values against 0..lookback-1, with an
+#              optional two-sided p-value; same numbers as the loop it replaced in trikal_helpers.
+
+import math
+import os
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from trikal_schema import PRICE_DECIMALS, PRICE_DTYPE
+
+
+def _jit(func):
+    return func
+
+
+if os.environ.get("TRIKAL_NUMBA") == "1":
+    try:
+        from numba import njit
+        _jit = njit(cache=True)
+    except ImportError:  # numba is optional; the cores stay plain Python loops without it.
+        pass
+
+
+def _as_float_array(values):
+    values = np.asarray(values)
+    if values.dtype == PRICE_DTYPE:
+        # Compact float32 price columns (trikal_schema) are widened back to their exact 2-decimal values.
+        return np.round(values.astype(np.float64), PRICE_DECIMALS)
+    return values.astype(np.float64, copy=False)
+
+
+# ==============================================================================
+# --- BATCH API ---
+# ==============================================================================
+
+@_jit
+def _ema_core(values, length):
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+    if n < length:
+        return out
+    alpha = 2.0 / (length + 1)
+    prev = 0.0
+    for i in range(length):
+        prev += values[i]
+    prev /= length
+    out[length - 1] = prev
+    for i in range(length, n):
+        x = values[i]
+        if x == x:
+            # A NaN seed window restarts the average at the first valid value, like ewm does.
+            prev = x if prev != prev else alpha * x + (1.0 - alpha) * prev
+        out[i] = prev
+    return out
+
+
+@_jit
+def _wilder_core(values, length):
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+    start = 0
+    while start < n and values[start] != values[start]:
+        start += 1
+    if n - start < length:
+        return out
+    prev = 0.0
+    for i in range(start, start + length):
+        prev += values[i]
+    prev /= length
+    out[start + length - 1] = prev
+    for i in range(start + length, n):
+        x = values[i]
+        if x == x:
+            prev = (prev * (length - 1) + x) / length
+        out[i] = prev
+    return out
+
+
+def ema(values, length: int) -> np.ndarray:
+    return _ema_core(_as_float_array(values), int(length))
+
+
+def sma(values, length: int) -> np.ndarray:
+    values = _as_float_array(values)
+    out = np.full(values.shape[0], np.nan)
+    if values.shape[0] >= length:
+        out[length - 1:] = sliding_window_view(values, length).mean(axis=1)
+    return out
+
+
+def true_range(high, low, close) -> np.ndarray:
+    high, low, close = _as_float_array(high), _as_float_array(low), _as_float_array(close)
+    prev_close = np.empty_like(close)
+    prev_close[0] = np.nan
+    prev_close[1:] = close[:-1]
+    tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(prev_close - low)))
+    tr[0] = np.nan
+    return tr
+
+
+def atr(high, low, close, length: int = 14) -> np.ndarray:
+    return _wilder_core(true_range(high, low, close), int(length))
+
+
+def rsi(close, length: int = 14) -> np.ndarray:
+    close = _as_float_array(close)
+    change = np.full(close.shape[0], np.nan)
+    change[1:] = np.diff(close)
+    avg_gain = _wilder_core(np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.0)), int(length))
+    avg_loss = _wilder_core(np.where(change < 0, -change, np.where(np.isnan(change), np.nan, 0.0)), int(length))
+    total = avg_gain + avg_loss
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, 100.0 * avg_gain / total, np.where(np.isnan(total), np.nan, 0.0))
+
+
+def vwap(high, low, close, volume, session_keys) -> np.ndarray:
+    """VWAP of the typical price, restarting whenever `session_keys` (e.g. the candle's date) changes."""
+    typical = (_as_float_array(high) + _as_float_array(low) + _as_float_array(close)) / 3.0
+    volume = _as_float_array(volume)
+    session_keys = np.asarray(session_keys)
+    if typical.shape[0] == 0:
+        return typical
+    missing = np.isnan(typical) | np.isnan(volume)
+    cum_pv = np.cumsum(np.where(missing, 0.0, typical * volume))
+    cum_v = np.cumsum(np.where(missing, 0.0, volume))
+    session_start = np.flatnonzero(np.r_[True, session_keys[1:] != session_keys[:-1]])
+    run_lengths = np.diff(np.r_[session_start, typical.shape[0]])
+    base_pv = np.repeat(np.r_[0.0, cum_pv][session_start], run_lengths)
+    base_v = np.repeat(np.r_[0.0, cum_v][session_start], run_lengths)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = (cum_pv - base_pv) / (cum_v - base_v)
+    out[missing] = np.nan
+    return out
+
+
+def ols_p_value(t_stat, dof):
+    """
+    Two-sided p-value of an OLS slope's t statistic. Only scipy.special is imported, and only when a
+    p-value is asked for; stdtr is the Student-t CDF that scipy.stats.t.cdf evaluates.
+    """
+    from scipy.special import stdtr
+    return 2 * (1 - stdtr(dof, np.abs(t_stat)))
+
+
+def rolling_ols(values, lookback: int, with_p_value: bool = True):
+    """
+    Slope (and p-value) of an OLS fit over each trailing `lookback` window. Windows containing NaN
+    are NaN. Returns (slope, p_value); p_value is None when with_p_value is False.
+    """
+    values = _as_float_array(values)
+    n = values.shape[0]
+    slope = np.full(n, np.nan)
+    p_value = np.full(n, np.nan) if with_p_value else None
+    dof = lookback - 2
+    if n < lookback or dof <= 0:
+        return slope, p_value
+
+    x = np.arange(lookback, dtype=np.float64)
+    x_centered = x - x.mean()
+    denom = np.sum(x_centered ** 2)
+    windows = sliding_window_view(values, lookback)
+    valid = ~np.isnan(windows).any(axis=1)
+    windows = windows[valid]
+    if windows.shape[0] == 0:
+        return slope, p_value
+
+    beta = (windows - windows.mean(axis=1, keepdims=True)) @ x_centered / denom
+    valid_rows = np.flatnonzero(valid) + lookback - 1
+    slope[valid_rows] = beta
+    if with_p_value:
+        alpha = windows.mean(axis=1) - beta * x.mean()
+        residuals = windows - (alpha[:, None] + beta[:, None] * x)
+        se_beta = np.sqrt(np.sum(residuals ** 2, axis=1) / dof / denom)
+        p_value[valid_rows] = ols_p_value(beta / (se_beta + 1e-12), dof)
+    return slope, p_value
+
+
+# ==============================================================================
+# --- INCREMENTAL API ---
+# ==============================================================================
+
+class EMAState:
+    """One-bar-at-a-time ema(); update() returns the same value the batch function has at that bar."""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.value = math.nan
+        self._seed = []
+
+    def update(self, x: float) -> float:
+        if len(self._seed) < self.length:
+            self._seed.append(x)
+            if len(self._seed) == self.length:
+                self.value = sum(self._seed) / self.length
+        elif not math.isnan(x):
+            self.value = x if math.isnan(self.value) else self.alpha * x + (1.0 - self.alpha) * self.value
+        return self.value
+
+
+class SMAState:
+    def __init__(self, length: int):
+        self.length = length
+        self._window = deque(maxlen=length)
+        self.value = math.nan
+
+    def update(self, x: float) -> float:
+        self._window.append(x)
+        self.value = sum(self._window) / self.length if len(self._window) == self.length else math.nan
+        return self.value
+
+
+class WilderState:
+    """Wilder smoothing with an SMA seed; leading NaNs are skipped, later NaNs hold the last value."""
+
+    def __init__(self, length: int):
+        self.length = length
+        self.value = math.nan
+        self._seed = []
+
+    def update(self, x: float) -> float:
+        if math.isnan(x):
+            return self.value
+        if len(self._seed) < self.length:
+            self._seed.append(x)
+            if len(self._seed) == self.length:
+                self.value = sum(self._seed) / self.length
+        else:
+            self.value = (self.value * (self.length - 1) + x) / self.length
+        return self.value
+
+
+class ATRState:
+    def __init__(self, length: int = 14):
+        self._wilder = WilderState(length)
+        self._prev_close = math.nan
+        self.value = math.nan
+
+    def update(self, high: float, low: float, close: float) -> float:
+        if math.isnan(self._prev_close):
+            tr = math.nan
+        else:
+            tr = max(high - low, abs(high - self._prev_close), abs(self._prev_close - low))
+        self._prev_close = close
+        self.value = self._wilder.update(tr)
+        return self.value
+
+
+class RSIState:
+    def __init__(self, length: int = 14):
+        self._gain = WilderState(length)
+        self._loss = WilderState(length)
+        self._prev_close = math.nan
+        self.value = math.nan
+
+    def update(self, close: float) -> float:
+        change = close - self._prev_close
+        self._prev_close = close
+        if math.isnan(change):
+            return self.value
+        avg_gain = self._gain.update(max(change, 0.0))
+        avg_loss = self._loss.update(max(-change, 0.0))
+        if not math.isnan(avg_gain):
+            total = avg_gain + avg_loss
+            self.value = 100.0 * avg_gain / total if total > 0 else 0.0
+        return self.value
+
+
+class VWAPState:
+    def __init__(self):
+        self._session = None
+        self._cum_pv = 0.0
+        self._cum_v = 0.0
+        self.value = math.nan
+
+    def update(self, high: float, low: float, close: float, volume: float, session_key) -> float:
+        if session_key != self._session:
+            self._session, self._cum_pv, self._cum_v = session_key, 0.0, 0.0
+        typical = (high + low + close) / 3.0
+        if math.isnan(typical) or math.isnan(volume):
+            return math.nan
+        self._cum_pv += typical * volume
+        self._cum_v += volume
+        self.value = self._cum_pv / self._cum_v if self._cum_v else math.nan
+        return self.value
+
+
+class RollingOLSState:
+    """Trailing-window OLS slope; update() returns (slope, p_value) with p_value None unless requested."""
+
+    def __init__(self, lookback: int, with_p_value: bool = False):
+        self.lookback = lookback
+        self.with_p_value = with_p_value
+        self._window = deque(maxlen=lookback)
+
+    def update(self, y: float):
+        self._window.append(y)
+        if len(self._window) < self.lookback:
+            return math.nan, (math.nan if self.with_p_value else None)
+        slope, p_value = rolling_ols(np.fromiter(self._window, dtype=np.float64, count=self.lookback), self.lookback, self.with_p_value)
+        return slope[-1], (p_value[-1] if self.with_p_value else None)
+
+
+# ==============================================================================
+# --- VALIDATION AGAINST pandas_ta ---
+# ==============================================================================
+
+def _synthetic_candles(n=3000, seed=7):
+    import pandas as pd
+    rng = np.random.default_rng(seed)
+    close = 24000 + np.cumsum(rng.normal(0, 8, n))
+    spread = np.abs(rng.normal(0, 6, n))
+    index = pd.date_range("2025-09-01 09:15", periods=n, freq="min", tz="Asia/Kolkata")
+    return pd.DataFrame({
+        "open": close + rng.normal(0, 2, n), "high": close + spread, "low": close - spread,
+        "close": close, "volume": rng.integers(100, 5000, n).astype(float),
+    }, index=index)
+
+
+def validate(df=None, length=20, lookback=20):
+    """Compares every batch and incremental indicator with its pandas_ta / scipy reference. Returns True if all match."""
+    import pandas_ta as ta
+    from scipy import stats
+
+    df = _synthetic_candles() if df is None else df
+    high, low, close, volume = (df[c].to_numpy(dtype=np.float64) for c in ("high", "low", "close", "volume"))
+    session_keys = df.index.tz_localize(None).normalize().to_numpy() if hasattr(df.index, "normalize") else np.zeros(len(df))
+
+    ols_ref_slope = np.full(len(close), np.nan)
+    ols_ref_p = np.full(len(close), np.nan)
+    for t in range(lookback - 1, len(close)):
+        fit = stats.linregress(np.arange(lookback), close[t - lookback + 1:t + 1])
+        ols_ref_slope[t], ols_ref_p[t] = fit.slope, fit.pvalue
+    ols_slope, ols_p = rolling_ols(close, lookback)
+
+    def incremental(state_factory, *columns):
+        state = state_factory()
+        return np.array([state.update(*row) for row in zip(*columns)], dtype=np.float64)
+
+    checks = [
+        ("ema", ema(close, length), ta.ema(df["close"], length=length, talib=False)),
+        ("ema (incremental)", incremental(lambda: EMAState(length), close), ta.ema(df["close"], length=length, talib=False)),
+        ("sma", sma(close, length), ta.sma(df["close"], length=length, talib=False)),
+        ("atr", atr(high, low, close, 14), ta.atr(df["high"], df["low"], df["close"], length=14, talib=True)),
+        ("atr (incremental)", incremental(lambda: ATRState(14), high, low, close), ta.atr(df["high"], df["low"], df["close"], length=14, talib=True)),
+        ("rsi", rsi(close, 14), ta.rsi(df["close"], length=14, talib=True)),
+        ("rsi (incremental)", incremental(lambda: RSIState(14), close), ta.rsi(df["close"], length=14, talib=True)),
+        ("vwap", vwap(high, low, close, volume, session_keys), ta.vwap(df["high"], df["low"], df["close"], df["volume"])),
+        ("vwap (incremental)", incremental(VWAPState, high, low, close, volume, session_keys), ta.vwap(df["high"], df["low"], df["close"], df["volume"])),
+        ("ols slope", ols_slope, ols_ref_slope),
+        ("ols p-value", ols_p, ols_ref_p),
+    ]
+    all_ok = True
+    for name, ours, reference in checks:
+        reference = np.asarray(reference, dtype=np.float64)
+        ok = np.allclose(ours, reference, rtol=1e-7, atol=1e-8, equal_nan=True)
+        both = ~np.isnan(ours) & ~np.isnan(reference)
+        max_diff = np.max(np.abs(ours[both] - reference[both])) if both.any() else 0.0
+        print(f"{'✅' if ok else '❌'} {name:<20} max |diff| = {max_diff:.3e}")
+        all_ok &= ok
+    return all_ok
+
+
+if __name__ == "__main__":
+    import argparse
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Validate trikal_indicators against pandas_ta.")
+    parser.add_argument("--csv", help="Candle CSV with datetime/open/high/low/close/volume (defaults to a synthetic random walk).")
+    args = parser.parse_args()
+    candles = None
+    if args.csv:
+        candles = pd.read_csv(args.csv)
+        candles["datetime"] = pd.to_datetime(candles["datetime"])
+        candles = candles.set_index("datetime")
+    raise SystemExit(0 if validate(candles) else 1)
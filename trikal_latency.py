@@ -0,0 +1,101 @@
+# --- START OF FILE trikal_latency.py ---
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from trikal_logging import get_logger, LATENCY_LOGGER
+
+# Stage order for one candle. Each stage's duration is measured from the previous mark,
+# except 'data_received' which is measured from the wall-clock candle boundary.
+LATENCY_STAGES = ("data_received", "indicators_done", "ltp_received", "signal", "order_acked")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class LatencyTracker:
+    """
+    Timestamps each stage of a candle's processing and keeps rolling p50/p95/p99 per stage.
+    One JSON line per candle is written to latency_<instance>.jsonl by the logging listener thread.
+    """
+
+    def __init__(self, instance_name: str = "default", enabled: bool = True, window: int = 500):
+        self.instance_name = instance_name
+        self.enabled = enabled
+        self._log = get_logger(LATENCY_LOGGER, instance_name)
+        self.samples = {stage: deque(maxlen=window) for stage in LATENCY_STAGES + ("total",)}
+        self._candle_time = None
+        self._candle_thread = None
+        self._start_perf = None
+        self._last_perf = None
+        self._marks = {}
+
+    def start_candle(self, candle_boundary: datetime):
+        """Called when a candle arrives. `candle_boundary` is the wall-clock time the candle closed."""
+        if not self.enabled:
+            return
+        now_perf = time.perf_counter()
+        self._candle_time = candle_boundary
+        self._candle_thread = threading.get_ident()
+        self._marks = {}
+        feed_delay = time.time() - candle_boundary.timestamp()
+        self._marks["data_received"] = feed_delay
+        self._start_perf = now_perf - feed_delay
+        self._last_perf = now_perf
+
+    def mark(self, stage: str):
+        # Marks from other threads (e.g. the trade manager fetching an LTP) are not part of this candle.
+        if not self.enabled or self._candle_time is None or threading.get_ident() != self._candle_thread:
+            return
+        now_perf = time.perf_counter()
+        self._marks[stage] = now_perf - self._last_perf
+        self._last_perf = now_perf
+
+    def record(self, stage: str, value: float):
+        """Adds a stage duration measured outside the candle thread (e.g. an order ack timed by OrderFanout)."""
+        if self.enabled and stage in self.samples:
+            self.samples[stage].append(value)
+
+    def end_candle(self):
+        if not self.enabled or self._candle_time is None:
+            return
+        total = self._last_perf - self._start_perf
+        self._marks["total"] = total
+        for stage, value in self._marks.items():
+            if stage in self.samples:
+                self.samples[stage].append(value)
+
+        record = {
+            "instance": self.instance_name,
+            "candle": self._candle_time.isoformat(),
+            "stages": {stage: round(value, 4) for stage, value in self._marks.items()},
+            "rolling": self.summary(),
+        }
+        self._candle_time = None
+        self._log.info(record)
+
+    def summary(self):
+        out = {}
+        for stage, values in self.samples.items():
+            if not values:
+                continue
+            ordered = sorted(values)
+            out[stage] = {
+                "n": len(ordered),
+                "p50": round(percentile(ordered, 0.50), 4),
+                "p95": round(percentile(ordered, 0.95), 4),
+                "p99": round(percentile(ordered, 0.99), 4),
+            }
+        return out
+
+    def summary_string(self):
+        parts = [f"{stage}: p50={s['p50']:.3f}s p95={s['p95']:.3f}s p99={s['p99']:.3f}s" for stage, s in self.summary().items()]
+        return " | ".join(parts) if parts else "no samples"
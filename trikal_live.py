@@ -11,6 +11,10 @@ from trikal_provider import TrikalProvider
 from trikal_helpers import (
     robust_datetime_parser, ist_timezone, parse_breeze_response
 )
+from trikal_logging import get_logger
+from trikal_schema import enforce_ohlcv_schema
+
+log = get_logger("trikal.feed")
 
 if TYPE_CHECKING:
     from trikal_helpers import Trade
@@ -27,7 +31,7 @@ def get_next_run_time(interval_minutes=1):
     return next_run
 
 def live_data_generator(provider: TrikalProvider, expiry_date_str: str, interval_minutes: int = 1) -> Iterator[Tuple[datetime, pd.DataFrame]]:
-    print(f"\n🚀 Live data source starting for {interval_minutes}-minute candles...")
+    log.info("🚀 Live data source starting for %d-minute candles...", interval_minutes)
     now = datetime.now(ist_timezone)
     market_open = now.replace(hour=9, minute=15, second=0, microsecond=0)
     market_close = now.replace(hour=15, minute=30, second=0, microsecond=0)
@@ -36,10 +40,10 @@ def live_data_generator(provider: TrikalProvider, expiry_date_str: str, interval
         wait_seconds = (market_open - now).total_seconds()
         m, s = divmod(wait_seconds, 60)
         h, m = divmod(m, 60)
-        print(f"Market opens at {market_open.strftime('%H:%M:%S')}. Waiting for {int(h)}h {int(m)}m {int(s)}s...")
+        log.info("Market opens at %s. Waiting for %dh %dm %ds...", market_open.strftime('%H:%M:%S'), h, m, s)
         time_sleep.sleep(wait_seconds)
     elif now >= market_close:
-        print("Market is already closed. Live data source will not produce any data."); return
+        log.warning("Market is already closed. Live data source will not produce any data."); return
 
     next_candle_time = get_next_run_time(interval_minutes)
     seen_candle_times = set()
@@ -49,7 +53,7 @@ def live_data_generator(provider: TrikalProvider, expiry_date_str: str, interval
         
         # --- MODIFICATION START: Graceful shutdown after market close ---
         if now >= market_close:
-            print(f"[{now.strftime('%H:%M:%S')}] Market is now closed. Shutting down live data feed.")
+            log.info("[%s] Market is now closed. Shutting down live data feed.", now.strftime('%H:%M:%S'))
             break
         # --- MODIFICATION END ---
         
@@ -84,7 +88,7 @@ def live_data_generator(provider: TrikalProvider, expiry_date_str: str, interval
                             "low": float(matched_candle['low']), "close": float(matched_candle['close']),
                             "volume": int(matched_candle['volume'])
                         }
-                        new_row = pd.DataFrame(new_candle_data, index=[candle_start_time])
+                        new_row = enforce_ohlcv_schema(pd.DataFrame(new_candle_data, index=[candle_start_time]), "Live Futures Poll")
                         
                         yield candle_start_time, new_row
                         
@@ -95,7 +99,7 @@ def live_data_generator(provider: TrikalProvider, expiry_date_str: str, interval
                 time_sleep.sleep(5)
 
             if not got_new_candle:
-                print(f"⚠️ No candle found for {candle_start_time.strftime('%H:%M')} after 5 attempts.")
+                log.warning("⚠️ No candle found for %s after 5 attempts.", candle_start_time.strftime('%H:%M'))
 
             next_candle_time += timedelta(minutes=interval_minutes)
             
@@ -0,0 +1,111 @@
+# --- START OF FILE trikal_logging.py ---
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+
+# Per-candle diagnostics (analysis line, signal checks, sideways filter) go to this logger,
+# so backtests can silence them without touching trade/exit output.
+CANDLE_LOGGER = "trikal.candles"
+LATENCY_LOGGER = "trikal.latency"
+
+_listener = None
+_config_lock = threading.Lock()
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Puts the raw record on the queue; message formatting happens on the listener thread."""
+
+    def prepare(self, record):
+        return record
+
+
+class _InstanceContextFilter(logging.Filter):
+    def __init__(self, default_instance):
+        super().__init__()
+        self.default_instance = default_instance
+
+    def filter(self, record):
+        if not hasattr(record, "instance"):
+            record.instance = self.default_instance
+        return True
+
+
+class _ExcludeLoggerFilter(logging.Filter):
+    def filter(self, record):
+        return not record.name.startswith(LATENCY_LOGGER)
+
+
+class _InstanceJsonLinesHandler(logging.Handler):
+    """Writes dict messages as JSON lines to a file chosen by the record's instance."""
+
+    def __init__(self, path_pattern):
+        super().__init__()
+        self.path_pattern = path_pattern
+        self.addFilter(logging.Filter(LATENCY_LOGGER))
+
+    def emit(self, record):
+        try:
+            payload = record.msg if isinstance(record.msg, dict) else {"message": record.getMessage()}
+            with open(self.path_pattern.format(instance=record.instance), "a") as f:
+                f.write(json.dumps(payload) + "\n")
+        except Exception:
+            self.handleError(record)
+
+
+def configure_logging(instance_name="default", mode="live", candle_output=True, level=logging.INFO):
+    """
+    Routes every 'trikal.*' logger through a queue so formatting and I/O run on a background
+    listener thread instead of the trading thread. Safe to call more than once; the last call wins.
+    """
+    global _listener
+    with _config_lock:
+        if _listener is not None:
+            _listener.stop()
+
+        console = logging.StreamHandler(sys.stdout)
+        fmt = "%(message)s" if mode == "backtest" else "%(asctime)s [%(instance)s] %(message)s"
+        console.setFormatter(logging.Formatter(fmt, datefmt="%H:%M:%S"))
+        console.addFilter(_ExcludeLoggerFilter())
+
+        log_queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(
+            log_queue, console, _InstanceJsonLinesHandler("latency_{instance}.jsonl"), respect_handler_level=True
+        )
+
+        root = logging.getLogger("trikal")
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        queue_handler = _DeferredQueueHandler(log_queue)
+        queue_handler.addFilter(_InstanceContextFilter(instance_name))
+        root.addHandler(queue_handler)
+        root.setLevel(level)
+        root.propagate = False
+
+        logging.getLogger(CANDLE_LOGGER).setLevel(logging.NOTSET if candle_output else logging.WARNING)
+        _listener.start()
+
+
+def shutdown_logging():
+    global _listener
+    with _config_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+def get_logger(name, instance_name=None):
+    """Returns a 'trikal.*' logger, bound to an instance name when one is given."""
+    if _listener is None:
+        configure_logging()
+    logger = logging.getLogger(name)
+    if instance_name is None:
+        return logger
+    return logging.LoggerAdapter(logger, {"instance": instance_name})
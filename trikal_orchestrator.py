@@ -0,0 +1,288 @@
+# --- START OF FILE trikal_orchestrator.py ---
+
+import argparse
+import threading
+import traceback
+from datetime import datetime, date
+from typing import Iterator, Tuple, Optional
+
+import pandas as pd
+
+import trikal
+from trikal_engine import TrikalEngine, load_warmup_history, append_candle, aggregate_candles
+from trikal_provider import TrikalProvider
+from trikal_backtest import backtest_data_generator
+from trikal_live import live_data_generator
+from trikal_helpers import apply_indicators_and_bias, ema_slope_specs, rolling_ols_slope, get_monthly_expiry_for_date, write_chart_data
+from trikal_execution import OrderFanout
+from trikal_logging import get_logger, configure_logging
+from trikal_paper import PaperBroker
+
+log = get_logger("trikal.orchestrator")
+
+
+class AccountProvider:
+    """
+    Per-account view of a shared TrikalProvider. Market data, quotes and the options cache come
+    from the shared provider; orders and order-book queries go through the account's own session.
+    """
+
+    def __init__(self, shared_provider: TrikalProvider, order_api):
+        self._shared = shared_provider
+        self.order_api = order_api
+        self.latency_tracker = None
+
+    def __getattr__(self, name):
+        return getattr(self._shared, name)
+
+    def get_live_ltp(self, *args, **kwargs):
+        price_dict, ltt_str = self._shared.get_live_ltp(*args, **kwargs)
+        if price_dict and self.latency_tracker:
+            self.latency_tracker.mark("ltp_received")
+        return price_dict, ltt_str
+
+    def shutdown(self):
+        # The shared provider is shut down once by the orchestrator, not by each account's engine.
+        pass
+
+
+class SharedIndicatorPlan:
+    """
+    Computes indicators for several strategies over one futures history. Strategies that declare
+    indicator_specs() share each distinct indicator (and each distinct EMA slope) instead of
+    recomputing it; strategies that do not are handled by their own apply_indicators_and_bias call.
+    """
+
+    def __init__(self, strategies):
+        self.strategies = list(strategies)
+        self.shared_specs = []
+        for strategy in self.strategies:
+            for spec in strategy.indicator_specs() or []:
+                if spec not in self.shared_specs:
+                    self.shared_specs.append(spec)
+        log.info("📐 Indicator plan: %d strategy(ies), %d distinct shared indicator(s).", len(self.strategies), len(self.shared_specs))
+
+    def compute(self, df_raw: pd.DataFrame) -> dict:
+        """Returns {strategy.name: history with that strategy's indicator columns}."""
+        df_shared = df_raw.copy()
+        spec_columns = {}
+        for spec in self.shared_specs:
+            # Any declaring strategy can compute a spec; specs are defined by BaseStrategy.compute_indicator.
+            column, values = self.strategies[0].compute_indicator(df_shared, spec)
+            df_shared[column] = values
+            spec_columns[spec] = column
+
+        ols_cache = {}
+        views = {}
+        for strategy in self.strategies:
+            specs = strategy.indicator_specs()
+            if specs is None:
+                views[strategy.name] = apply_indicators_and_bias(df_raw, strategy)
+                continue
+            view = df_shared[list(df_raw.columns) + [spec_columns[spec] for spec in specs]].copy()
+            for output_columns, source_col, lookback in ema_slope_specs(strategy):
+                if source_col not in view.columns or view[source_col].isnull().all():
+                    continue
+                with_p_value = "p_value" in output_columns
+                key = (source_col, lookback, with_p_value)
+                if key not in ols_cache:
+                    ols_cache[key] = rolling_ols_slope(view[source_col], lookback, with_p_value=with_p_value)
+                for result_key, column in output_columns.items():
+                    view[column] = ols_cache[key][result_key]
+            views[strategy.name] = view
+        return views
+
+
+class StrategyPipeline:
+    """The engines (one per account) running one strategy. They all read the same indicator history."""
+
+    def __init__(self, strategy, fanout: OrderFanout):
+        self.strategy = strategy
+        self.fanout = fanout
+        self.engines = []
+
+    def on_candle(self, candle_start_time: datetime, df_history: pd.DataFrame):
+        pending_entries = []
+        for engine in self.engines:
+            try:
+                pending = engine.process_shared_candle(candle_start_time, df_history, defer_entry=True)
+            except Exception as e:
+                log.error("❌ [%s] Error processing candle for '%s': %s", self.strategy.name, engine.instance_name, e)
+                continue
+            if pending:
+                pending_entries.append((engine, *pending))
+        # Every account that signalled on this candle has its order submitted at the same time.
+        self.fanout.execute(pending_entries)
+        # The rest of the entry touches the shared provider, so it runs here, one engine at a time.
+        for engine, _, options_data_block in pending_entries:
+            try:
+                engine._simulate_backtest_entry(options_data_block)
+            except Exception as e:
+                log.error("❌ [%s] Error simulating entry for '%s': %s", self.strategy.name, engine.instance_name, e)
+
+
+class TrikalOrchestrator:
+    """
+    Runs several accounts and strategies off one market-data pipeline. The futures feed and warm-up
+    are fetched once, indicators are computed once per distinct indicator across all strategies,
+    and every (account, strategy) pair gets its own TrikalEngine for position state, capital config
+    and order placement.
+    """
+
+    def __init__(self, provider: TrikalProvider, expiry_date: str, interval_minutes: int = 5, rotate_order_fanout: bool = True, results_store=None):
+        self.provider = provider
+        self.results_store = results_store
+        self.expiry_date = expiry_date
+        self.interval_minutes = interval_minutes
+        self.fanout = OrderFanout(rotate=rotate_order_fanout)
+        self.pipelines = {}
+        self.engines = []
+        self.df_raw = None
+        self.indicator_plan = None
+
+    def add_account(self, strategy, instance_name: str, capital_config: dict, order_api) -> TrikalEngine:
+        pipeline = self.pipelines.get(strategy.name)
+        if pipeline is None:
+            pipeline = StrategyPipeline(strategy, self.fanout)
+            self.pipelines[strategy.name] = pipeline
+        engine = TrikalEngine(pipeline.strategy, AccountProvider(self.provider, order_api), capital_config,
+                              self.expiry_date, interval_minutes=self.interval_minutes, instance_name=instance_name,
+                              results_store=self.results_store, per_instance_backtest_files=True)
+        pipeline.engines.append(engine)
+        self.engines.append(engine)
+        return engine
+
+    def _dispatch(self, candle_start_time: Optional[datetime]):
+        views = self.indicator_plan.compute(self.df_raw)
+        if candle_start_time is None:
+            return
+        if self.provider.mode == 'backtest':
+            # Every engine sees the same futures candle; write the backtest chart row once, not once per engine.
+            write_chart_data(next(iter(views.values())).iloc[[-1]], mode=self.provider.mode)
+        for name, pipeline in self.pipelines.items():
+            pipeline.on_candle(candle_start_time, views[name])
+
+    def run(self, data_iterator: Iterator[Tuple[datetime, pd.DataFrame]]):
+        log.info("🚀 Orchestrator starting in [%s] mode: %d engine(s) across %d strategy pipeline(s).",
+                 self.provider.mode.upper(), len(self.engines), len(self.pipelines))
+        self.df_raw = load_warmup_history(self.provider, self.expiry_date, self.interval_minutes)
+        self.indicator_plan = SharedIndicatorPlan(pipeline.strategy for pipeline in self.pipelines.values())
+        self._dispatch(None)
+        log.info("✅ Warm-up complete. Initialized with %d historical candles.", len(self.df_raw))
+        for engine in self.engines:
+            engine.open_results_run()
+            engine.start_trade_manager()
+
+        try:
+            for candle_start_time, candle in aggregate_candles(data_iterator, self.interval_minutes):
+                self.df_raw = append_candle(self.df_raw, candle)
+                self._dispatch(candle_start_time)
+        except KeyboardInterrupt:
+            log.info("Gracefully shutting down orchestrator...")
+        finally:
+            for engine in self.engines:
+                engine._cleanup()
+            self.fanout.shutdown()
+            for engine in self.engines:
+                if isinstance(engine.provider.order_api, PaperBroker):
+                    engine.provider.order_api.shutdown()
+            if self.fanout.ack_latency:
+                log.info("⏱️  Order fan-out latency: %s", self.fanout.summary())
+            self.provider.shutdown()
+
+
+def _parse_account_tokens(values):
+    accounts = {}
+    for value in values:
+        name, sep, token = value.partition("=")
+        if not sep or name not in trikal.INSTANCE_CONFIG:
+            raise argparse.ArgumentTypeError(f"Expected <instance>=<session_token> with instance in {list(trikal.INSTANCE_CONFIG)}, got '{value}'.")
+        accounts[name] = token
+    return accounts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Trikal Orchestrator: one market-data pipeline, many accounts and strategies")
+    parser.add_argument("--date", help="Run in BACKTEST mode for a specific date (YYYY-MM-DD).")
+    parser.add_argument("--strategy", required=True, nargs="+", type=trikal.parse_strategy_spec,
+                        help="Strategies to run as NAME[:KEY=VAL,...]; variants of one strategy may run side by side. Every account runs each of them with independent position state.")
+    parser.add_argument("--accounts", required=True, nargs="+", help="Accounts to run as <instance>=<session_token>.")
+    parser.add_argument("--data-account", help="Account whose session fetches market data (defaults to the first account).")
+    parser.add_argument("--quiet", action="store_true", help="Silence per-candle analysis and signal diagnostics.")
+    parser.add_argument("--paper", action="store_true", help="Run on the live feed with locally simulated fills; every account and strategy gets its own paper book.")
+    parser.add_argument("--results-db", default="trikal_results.db", help="SQLite results store for backtest and paper runs.")
+    parser.add_argument("--run-label", help="Label that groups these runs with others in the results store.")
+    parser.add_argument("--no-results", action="store_true", help="Do not record these runs in the results store.")
+    parser.add_argument("--no-rotate", action="store_true", help="Always submit multi-account orders in --accounts order instead of rotating.")
+    args = parser.parse_args()
+
+    if args.paper and args.date:
+        parser.error("--paper runs on the live feed and cannot be combined with --date.")
+    run_mode = 'backtest' if args.date else ('paper' if args.paper else 'live')
+    configure_logging("orchestrator", mode=run_mode, candle_output=not args.quiet)
+    try:
+        account_tokens = _parse_account_tokens(args.accounts)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    # Keyed by variant name: pipelines, indicator views and instance names all use it.
+    strategy_specs = list({spec[0]: spec for spec in args.strategy}.values())
+    if len(strategy_specs) > 1 and run_mode == 'live':
+        # Engines sharing a real account would see each other's executions in the broker order book.
+        parser.error("Running several strategies per account is only supported in backtest and paper mode.")
+
+    from breeze_connect import BreezeConnect
+
+    sessions = {}
+    for name, token in account_tokens.items():
+        config = trikal.INSTANCE_CONFIG[name]
+        try:
+            print(f"Connecting to Breeze API for instance: '{name}'...")
+            breeze = BreezeConnect(api_key=config["API_KEY"])
+            breeze.generate_session(api_secret=config["API_SECRET"], session_token=token)
+            sessions[name] = breeze
+        except Exception as e:
+            print(f"❌ Failed to connect to Breeze API for '{name}': {e}"); traceback.print_exc(); return
+    print("Breeze API sessions generated successfully.")
+
+    data_account = args.data_account or next(iter(sessions))
+    if data_account not in sessions:
+        parser.error(f"--data-account '{data_account}' is not one of the --accounts.")
+
+    strategies = [trikal.build_strategy(spec) for spec in strategy_specs]
+
+    if args.date:
+        print("\n--- Running orchestrator in BACKTEST mode. Mantri remote is disabled. ---")
+        run_date_obj = datetime.strptime(args.date, "%Y-%m-%d").date()
+        expiry_date = get_monthly_expiry_for_date(run_date_obj, roll_on_expiry_day=True)
+        provider = TrikalProvider(mode='backtest', date_str=args.date, breeze_api=sessions[data_account], interval="1minute")
+    else:
+        print(f"\n--- Running orchestrator in {run_mode.upper()} mode. Initializing Mantri remote... ---")
+        expiry_date = get_monthly_expiry_for_date(date.today(), roll_on_expiry_day=True)
+        provider = TrikalProvider(mode=run_mode, breeze_api=sessions[data_account], interval="1minute")
+
+    results_store = None
+    if run_mode != 'live' and not args.no_results:
+        from trikal_results import ResultsStore
+        results_store = ResultsStore(args.results_db, label=args.run_label)
+    orchestrator = TrikalOrchestrator(provider, expiry_date, interval_minutes=5, rotate_order_fanout=not args.no_rotate,
+                                      results_store=results_store)
+    for name, breeze in sessions.items():
+        for strategy in strategies:
+            instance_name = name if len(strategies) == 1 else f"{name}-{strategy.name}"
+            # In paper mode each engine gets its own simulated order book, so variants never see each other's fills.
+            order_api = PaperBroker(provider) if run_mode == 'paper' else breeze
+            engine = orchestrator.add_account(strategy, instance_name, trikal.INSTANCE_CONFIG[name]["CAPITAL_CONFIG"], order_api)
+            trikal.trikal_engine_instances.append(engine)
+
+    if args.date:
+        orchestrator.run(backtest_data_generator(provider))
+        return
+
+    engine_thread = threading.Thread(target=orchestrator.run, args=(live_data_generator(provider, expiry_date),), daemon=True)
+    engine_thread.start()
+    print("--- Trikal Orchestrator is running. ---")
+    trikal.run_mantri_remote(engine_thread)
+
+
+if __name__ == "__main__":
+    main()
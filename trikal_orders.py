@@ -0,0 +1,111 @@
+# --- START OF FILE trikal_orders.py ---
+
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+import pytz
+
+from trikal_helpers import ist_timezone
+from trikal_logging import get_logger
+
+log = get_logger("trikal.orders")
+
+# Orders in these states never change again, so they are parsed once and then skipped.
+TERMINAL_ORDER_STATUSES = {"executed", "cancelled", "rejected", "expired"}
+# Each sync's window reaches this far behind where the previous one left off, covering clock skew with the broker.
+SYNC_OVERLAP = timedelta(minutes=1)
+
+
+def parse_order_datetime(value: str) -> datetime:
+    """Parses Breeze's order_datetime ('19-Oct-2025 10:15:32') into an IST-aware datetime."""
+    try:
+        parsed = datetime.strptime(value, "%d-%b-%Y %H:%M:%S")
+    except (ValueError, TypeError):
+        parsed = pd.to_datetime(value).to_pydatetime()
+        if parsed.tzinfo is not None:
+            return parsed.astimezone(ist_timezone)
+    return ist_timezone.localize(parsed)
+
+
+def contract_key(right: str, strike) -> tuple:
+    return (right.lower(), int(float(strike)))
+
+
+class OrderStateTracker:
+    """
+    Incremental view of the broker's order book. Each sync only parses orders it has not seen in
+    a terminal state, and executed orders are indexed by (right, strike) so exit lookups do not
+    rescan the whole list. Later syncs request only from the earliest order still open at the
+    previous sync (or that sync's time, if none was open), since everything older is settled.
+    """
+
+    def __init__(self, order_api, exchange_code: str = "NFO"):
+        self.order_api = order_api
+        self.exchange_code = exchange_code
+        self.executions = defaultdict(list)
+        self._resume_from: Optional[datetime] = None
+        self._settled_order_ids = set()
+        self._lock = threading.Lock()
+
+    def sync(self, since: datetime) -> bool:
+        """Pulls the order list from `since` onwards and indexes new executions. Returns False on API failure."""
+        now_time = datetime.now(ist_timezone)
+        # GTT exit legs are created at entry, so the window never needs to reach further back than `since`.
+        # Converting the IST start to UTC can only widen the window if the API reads it as local time.
+        window_start = since if self._resume_from is None else max(since, self._resume_from)
+        from_date_str = (window_start - SYNC_OVERLAP).astimezone(pytz.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        to_date_str = now_time.strftime("%Y-%m-%dT18:00:00.000Z")
+        try:
+            response = self.order_api.get_order_list(
+                exchange_code=self.exchange_code, from_date=from_date_str, to_date=to_date_str
+            )
+        except Exception as e:
+            log.warning("   └── ⚠️ [Orders] Could not get order list for sync: %s", e)
+            return False
+        if not response or not response.get('Success'):
+            return False
+
+        with self._lock:
+            resume_from = now_time
+            for order in response['Success']:
+                order_id = order.get('order_id')
+                if order_id in self._settled_order_ids:
+                    continue
+                status = (order.get('status') or '').lower()
+                if status not in TERMINAL_ORDER_STATUSES:
+                    # Still open: the next sync must reach back to it. Without a readable time, keep the full window.
+                    try:
+                        resume_from = min(resume_from, parse_order_datetime(order['order_datetime']))
+                    except (KeyError, ValueError, TypeError):
+                        resume_from = min(resume_from, since)
+                    continue
+                self._settled_order_ids.add(order_id)
+                if status != 'executed':
+                    continue
+                try:
+                    execution = {
+                        "order_id": order_id,
+                        "action": (order.get('action') or '').lower(),
+                        "quantity": str(order.get('quantity')),
+                        "average_price": float(order['average_price']),
+                        "order_datetime": parse_order_datetime(order['order_datetime']),
+                    }
+                    key = contract_key(order.get('right', ''), order.get('strike_price', 0))
+                except (KeyError, ValueError, TypeError) as e:
+                    log.warning("   └── ⚠️ [Orders] Skipping unparseable order %s: %s", order_id, e)
+                    continue
+                self.executions[key].append(execution)
+            self._resume_from = resume_from
+        return True
+
+    def find_exit(self, right: str, strike, qty, after: datetime) -> Optional[dict]:
+        """Latest executed sell for the contract and quantity placed after `after`, if any."""
+        with self._lock:
+            candidates = [
+                e for e in self.executions.get(contract_key(right, strike), [])
+                if e["action"] == 'sell' and e["quantity"] == str(qty) and e["order_datetime"] > after
+            ]
+        return max(candidates, key=lambda e: e["order_datetime"]) if candidates else None
@@ -0,0 +1,144 @@
+# --- START OF FILE trikal_paper.py ---
+
+import itertools
+import threading
+from datetime import datetime
+
+from trikal_helpers import gtt_leg_hit, ist_timezone, LIVE_BOT_CONFIG
+from trikal_logging import get_logger
+
+log = get_logger("trikal.paper")
+
+
+def _paper_response(payload):
+    return {'Status': 200, 'Success': payload, 'Error': None}
+
+
+class PaperBroker:
+    """
+    Local stand-in for the Breeze order API used in paper mode. Entries fill immediately at the
+    streamed LTP, or are rejected when the LTP is above the limit price; GTT legs are watched against the provider's quote
+    cache with the same stop-loss-first rule as the backtest tick loop, and every fill is reported
+    through get_order_list in Breeze's order-book format so the engine's fast loop confirms exits
+    exactly as it does in live mode.
+    """
+
+    def __init__(self, provider, poll_interval: float = None):
+        self.provider = provider
+        self.poll_interval = LIVE_BOT_CONFIG["QUOTE_POLL_INTERVAL_SEC"] if poll_interval is None else poll_interval
+        self.orders = []
+        self.active_gtts = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._simulator = None
+
+    def _next_id(self, prefix):
+        return f"{prefix}{datetime.now(ist_timezone).strftime('%Y%m%d')}{next(self._ids):05d}"
+
+    def _record_execution(self, action, right, strike, quantity, price):
+        order = {
+            "order_id": self._next_id("PAPER"),
+            "status": "Executed",
+            "action": action.capitalize(),
+            "stock_code": "NIFTY",
+            "right": right.capitalize(),
+            "strike_price": str(int(float(strike))),
+            "quantity": str(quantity),
+            "average_price": str(round(price, 2)),
+            "order_datetime": datetime.now(ist_timezone).strftime("%d-%b-%Y %H:%M:%S"),
+        }
+        with self._lock:
+            self.orders.append(order)
+        return order
+
+    @staticmethod
+    def _legs_from_details(order_details):
+        legs = {leg["gtt_leg_type"]: float(leg["trigger_price"]) for leg in order_details}
+        return legs["stoploss"], legs["target"]
+
+    def _expiry(self, expiry_date):
+        return expiry_date.split("T")[0]
+
+    def gtt_three_leg_place_order(self, expiry_date, right, strike_price, quantity, fresh_order_price, order_details, **kwargs):
+        expiry = self._expiry(expiry_date)
+        price_dict, _ = self.provider.get_live_ltp(expiry, right, strike_price)
+        if not price_dict:
+            return {'Status': 500, 'Success': None, 'Error': "No live quote available for paper fill."}
+        fill_price, limit_price = price_dict['close'], float(fresh_order_price)
+        if fill_price > limit_price:
+            # A real buy limit would not fill with the market above it; the engine treats this as a failed placement.
+            log.info("   └── 🧪 [PAPER] Entry not filled: LTP %.2f is above the %.2f limit.", fill_price, limit_price)
+            return {'Status': 500, 'Success': None, 'Error': f"LTP {fill_price:.2f} is above the buy limit {limit_price:.2f}; paper entry not filled."}
+        self._record_execution("buy", right, strike_price, quantity, fill_price)
+
+        stoploss_trigger, target_trigger = self._legs_from_details(order_details)
+        gtt_order_id = self._next_id("PGTT")
+        with self._lock:
+            self.active_gtts[gtt_order_id] = {
+                "expiry": expiry, "right": right, "strike": strike_price, "quantity": quantity,
+                "stoploss": stoploss_trigger, "target": target_trigger,
+            }
+        self.provider.subscribe_quote(expiry, right, strike_price)
+        self._ensure_simulator()
+        log.info("   └── 🧪 [PAPER] Entry filled at %.2f. Watching GTT %s (SL %.1f / TP %.1f).", fill_price, gtt_order_id, stoploss_trigger, target_trigger)
+        return _paper_response({"gtt_order_id": gtt_order_id})
+
+    def gtt_three_leg_modify_order(self, gtt_order_id, order_details, **kwargs):
+        with self._lock:
+            gtt = self.active_gtts.get(gtt_order_id)
+            if gtt is None:
+                return {'Status': 500, 'Success': None, 'Error': f"GTT {gtt_order_id} is not active."}
+            gtt["stoploss"], gtt["target"] = self._legs_from_details(order_details)
+        return _paper_response({"gtt_order_id": gtt_order_id})
+
+    def gtt_three_leg_cancel_order(self, gtt_order_id, **kwargs):
+        if not self._close_gtt(gtt_order_id):
+            return {'Status': 500, 'Success': None, 'Error': f"GTT {gtt_order_id} is not active."}
+        return _paper_response({"gtt_order_id": gtt_order_id})
+
+    def square_off(self, expiry_date, right, strike_price, quantity, action="sell", **kwargs):
+        price_dict, _ = self.provider.get_live_ltp(self._expiry(expiry_date), right, strike_price)
+        if not price_dict:
+            return {'Status': 500, 'Success': None, 'Error': "No live quote available for paper fill."}
+        order = self._record_execution(action, right, strike_price, quantity, price_dict['close'])
+        return _paper_response({"order_id": order["order_id"]})
+
+    def get_order_list(self, **kwargs):
+        with self._lock:
+            return _paper_response([dict(order) for order in self.orders])
+
+    def _close_gtt(self, gtt_order_id):
+        with self._lock:
+            gtt = self.active_gtts.pop(gtt_order_id, None)
+        if gtt is not None:
+            self.provider.unsubscribe_quote(gtt["expiry"], gtt["right"], gtt["strike"])
+        return gtt is not None
+
+    def _ensure_simulator(self):
+        with self._lock:
+            if self._simulator is not None and self._simulator.is_alive():
+                return
+            self._stop.clear()
+            self._simulator = threading.Thread(target=self._simulator_loop, name="trikal-paper-fills", daemon=True)
+        self._simulator.start()
+
+    def _simulator_loop(self):
+        while not self._stop.is_set():
+            with self._lock:
+                gtts = list(self.active_gtts.items())
+            for gtt_order_id, gtt in gtts:
+                price_dict, _ = self.provider.get_live_ltp(gtt["expiry"], gtt["right"], gtt["strike"])
+                if not price_dict:
+                    continue
+                hit = gtt_leg_hit(price_dict['low'], price_dict['high'], gtt["stoploss"], gtt["target"])
+                if hit and self._close_gtt(gtt_order_id):
+                    leg, fill_price = hit
+                    self._record_execution("sell", gtt["right"], gtt["strike"], gtt["quantity"], fill_price)
+                    log.info("   └── 🧪 [PAPER] GTT %s %s leg filled at %.2f.", gtt_order_id, leg, fill_price)
+            self._stop.wait(self.poll_interval)
+
+    def shutdown(self):
+        self._stop.set()
+        if self._simulator is not None and self._simulator.is_alive():
+            self._simulator.join(timeout=3)
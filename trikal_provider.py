@@ -7,7 +7,16 @@ import threading
 import time as time_sleep
 import os
 import traceback
-from trikal_helpers import parse_breeze_response, robust_datetime_parser, get_monthly_expiry_for_date
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from trikal_helpers import parse_breeze_response, robust_datetime_parser, get_monthly_expiry_for_date, LIVE_BOT_CONFIG
+from trikal_logging import get_logger
+from trikal_paper import PaperBroker
+from trikal_archive import FuturesArchive, OptionsDayArchive
+from trikal_schema import enforce_ohlcv_schema, exact_prices
+from trikal_cache import FrameLRUCache
+
+log = get_logger("trikal.provider")
 
 class TrikalProvider:
     def __init__(self, mode, date_str=None, breeze_api=None, interval="1minute"):
@@ -17,50 +26,81 @@ class TrikalProvider:
         self.ist_timezone = pytz.timezone("Asia/Kolkata")
         
         if not self.breeze: raise ValueError("Breeze API object must be provided.")
+        # Session used for order placement and order-book queries; market data always goes through self.breeze.
+        self.order_api = self.breeze
         
+        # Live quote cache: (expiry, right, strike) -> (price_dict, ltt_str, fetched_at monotonic seconds).
+        # Subscribed contracts are refreshed by one background poller so callers read LTP from memory;
+        # warm subscriptions (contracts that might be entered) are refreshed less often than open positions.
         self.live_data_cache = {}
+        self.quote_subscriptions = {}
+        self.warm_quote_subscriptions = {}
         self.data_lock = threading.Lock()
         self.background_threads = []
+        self._quote_stop = threading.Event()
+        self._quote_poller = None
 
         self.backtest_date_obj = None
         self.warmup_df = None
         self.day_feed_df = None
-        self.options_1s_cache = {}
+        # (date, contract) -> compact 1s frame, bounded by OPTIONS_CACHE_MAX_MB so multi-day runs keep a steady footprint.
+        self.options_1s_cache = FrameLRUCache(LIVE_BOT_CONFIG["OPTIONS_CACHE_MAX_MB"] * 2 ** 20)
+        self._prefetch_pool = None
+        self._prefetch_futures = {}
+        # Guards the prefetch pool's lazy creation and the in-flight dict; several engines may prefetch at once.
+        self._prefetch_lock = threading.Lock()
+        self.latency_tracker = None
+        self.futures_archive = None
+        self.options_archives = {}
         
         if self.mode == 'backtest':
             if not date_str: raise ValueError("Date string needed for backtest mode.")
             self.backtest_date_obj = datetime.strptime(date_str, "%Y-%m-%d").date()
-            print(f"🗂️  TrikalProvider initialized in BACKTEST mode for date: {date_str}")
+            self.futures_archive = FuturesArchive()
+            log.info("🗂️  TrikalProvider initialized in BACKTEST mode for date: %s", date_str)
             self._fetch_backtest_warmup_data()
             self._load_backtest_day_feed(date_str)
         elif self.mode == 'live':
-            print("📡 TrikalProvider initialized in LIVE mode.")
+            log.info("📡 TrikalProvider initialized in LIVE mode.")
+        elif self.mode == 'paper':
+            # Live candles and quotes, but orders are filled locally against the streamed quotes.
+            self.order_api = PaperBroker(self)
+            log.info("🧪 TrikalProvider initialized in PAPER mode. Orders are simulated locally.")
         else:
             raise ValueError(f"Invalid mode: {self.mode}")
 
     def _load_backtest_day_feed(self, date_str):
         futures_file = f"data/futures/FUT_{date_str}.csv"
         try:
-            print(f"   └── [Provider] Loading day-feed data from: {futures_file}")
-            df_day = pd.read_csv(futures_file)
-            df_day["datetime"] = robust_datetime_parser(df_day["datetime"])
-            df_day.set_index('datetime', inplace=True)
+            if self.futures_archive.has_date(date_str):
+                log.info("   └── [Provider] Loading day-feed data from archive: %s", self.futures_archive.root)
+                df_day = self.futures_archive.read_day(date_str)
+            else:
+                log.info("   └── [Provider] Loading day-feed data from: %s", futures_file)
+                df_day = pd.read_csv(futures_file)
+                df_day["datetime"] = robust_datetime_parser(df_day["datetime"])
+                df_day.set_index('datetime', inplace=True)
             
             start_of_day = self.ist_timezone.localize(datetime.combine(self.backtest_date_obj, time(9, 15)))
             end_of_day = self.ist_timezone.localize(datetime.combine(self.backtest_date_obj, time(15, 30)))
             
-            self.day_feed_df = df_day[(df_day.index >= start_of_day) & (df_day.index <= end_of_day)]
+            self.day_feed_df = enforce_ohlcv_schema(df_day[(df_day.index >= start_of_day) & (df_day.index <= end_of_day)], f"FUT {date_str}")
                             
-            print(f"   └── [Provider] ✅ Day-feed loaded and filtered to {len(self.day_feed_df)} candles for today.")
+            log.info("   └── [Provider] ✅ Day-feed loaded and filtered to %d candles for today.", len(self.day_feed_df))
         except FileNotFoundError as e:
-            print(f"❌ FATAL ERROR: Futures data file not found: {e.filename}.")
+            log.critical("❌ FATAL ERROR: Futures data file not found: %s.", e.filename)
             raise e
             
     def _fetch_backtest_warmup_data(self):
-        print("   └── [Provider] Fetching historical warm-up data from API...")
-        
         to_date_obj = self.ist_timezone.localize(datetime.combine(self.backtest_date_obj, time(9, 15))) if self.mode == 'backtest' else datetime.now(self.ist_timezone)
         from_date_obj = to_date_obj - timedelta(days=40)
+
+        if self.futures_archive is not None and self.futures_archive.covers(from_date_obj.date(), to_date_obj.date()):
+            self.warmup_df = enforce_ohlcv_schema(self.futures_archive.read_range(from_date_obj.date(), to_date_obj.date()), "Warm-up Futures")
+            log.info("   └── [Provider] ✅ Warm-up data read from archive with %d candles.", len(self.warmup_df))
+            return
+
+        log.info("   └── [Provider] Fetching historical warm-up data from API...")
         from_date_str = from_date_obj.strftime("%Y-%m-%dT%H:%M:%S.000Z")
         to_date_str = to_date_obj.strftime("%Y-%m-%dT%H:%M:%S.000Z")
         
@@ -78,27 +118,53 @@ class TrikalProvider:
                 df_warmup[col] = pd.to_numeric(df_warmup[col], errors='coerce')
             
             limit_date = self.backtest_date_obj if self.mode == 'backtest' else date.today()
-            self.warmup_df = df_warmup[df_warmup.index.date < limit_date]
+            self.warmup_df = enforce_ohlcv_schema(df_warmup[df_warmup.index.date < limit_date], "Warm-up Futures")
             
-            print(f"   └── [Provider] ✅ Warm-up data fetched with {len(self.warmup_df)} candles.")
+            log.info("   └── [Provider] ✅ Warm-up data fetched with %d candles.", len(self.warmup_df))
         else:
-            print("   └── [Provider] ⚠️ No warm-up data received.")
+            log.warning("   └── [Provider] ⚠️ No warm-up data received.")
             self.warmup_df = pd.DataFrame()
 
     def get_initial_warmup_data(self):
         return self.warmup_df.copy() if self.warmup_df is not None else pd.DataFrame()
 
     def get_day_data_feed(self):
-        self.options_1s_cache.clear()
         return self.day_feed_df
 
-    def get_live_ltp(self, expiry_date, right, strike_price):
+    @property
+    def is_realtime(self):
+        """True for modes driven by the live market feed ('live' and 'paper')."""
+        return self.mode in ('live', 'paper')
+
+    @staticmethod
+    def _quote_key(expiry_date, right, strike_price):
+        return (expiry_date, right.lower(), int(float(strike_price)))
+
+    def get_live_ltp(self, expiry_date, right, strike_price, max_age=None):
+        """
+        Latest LTP for an option contract. Served from the quote cache when the cached quote is younger
+        than `max_age` seconds (default QUOTE_MAX_AGE_SEC), otherwise fetched over REST and cached.
+        """
+        key = self._quote_key(expiry_date, right, strike_price)
+        max_age = LIVE_BOT_CONFIG["QUOTE_MAX_AGE_SEC"] if max_age is None else max_age
+        with self.data_lock:
+            cached = self.live_data_cache.get(key)
+        if cached and time_sleep.monotonic() - cached[2] <= max_age:
+            price_dict, ltt_str = dict(cached[0]), cached[1]
+        else:
+            price_dict, ltt_str = self._fetch_quote(key)
+        if price_dict and self.latency_tracker:
+            self.latency_tracker.mark("ltp_received")
+        return price_dict, ltt_str
+
+    def _fetch_quote(self, key):
+        expiry_date, right, strike_price = key
         try:
             response = self.breeze.get_quotes(stock_code="NIFTY",
                                      exchange_code="NFO",
                                      product_type="options",
                                      expiry_date=f"{expiry_date}T06:00:00.000Z",
-                                     right=right.lower(),
+                                     right=right,
                                      strike_price=str(strike_price))
             
             if response and response.get('Status') == 200 and response.get('Success'):
@@ -106,51 +172,169 @@ class TrikalProvider:
                 ltp = float(quote.get('ltp'))
                 ltt_str = quote.get('ltt', datetime.now(self.ist_timezone).strftime('%d-%b-%Y %H:%M:%S'))
                 price_dict = {'close': ltp, 'high': ltp, 'low': ltp}
-                return price_dict, ltt_str
+                with self.data_lock:
+                    self.live_data_cache[key] = (price_dict, ltt_str, time_sleep.monotonic())
+                return dict(price_dict), ltt_str
         except Exception as e:
-            print(f"❌ Error getting live LTP: {e}")
+            log.error("❌ Error getting live LTP: %s", e)
         return None, None
-    
+
+    def subscribe_quote(self, expiry_date, right, strike_price, warm=False):
+        """
+        Keeps the contract's quote fresh in the cache until every subscriber has unsubscribed. Warm
+        subscriptions are re-quoted every WARM_QUOTE_POLL_INTERVAL_SEC instead of QUOTE_POLL_INTERVAL_SEC.
+        """
+        if self.mode == 'backtest':
+            return
+        key = self._quote_key(expiry_date, right, strike_price)
+        subscriptions = self.warm_quote_subscriptions if warm else self.quote_subscriptions
+        with self.data_lock:
+            subscriptions[key] = subscriptions.get(key, 0) + 1
+            start_poller = self._quote_poller is None or not self._quote_poller.is_alive()
+            if start_poller:
+                self._quote_stop.clear()
+                self._quote_poller = threading.Thread(target=self._quote_poller_loop, name="trikal-quote-poller", daemon=True)
+                self.background_threads.append(self._quote_poller)
+        if start_poller:
+            self._quote_poller.start()
+
+    def unsubscribe_quote(self, expiry_date, right, strike_price, warm=False):
+        key = self._quote_key(expiry_date, right, strike_price)
+        subscriptions = self.warm_quote_subscriptions if warm else self.quote_subscriptions
+        with self.data_lock:
+            remaining = subscriptions.get(key, 0) - 1
+            if remaining > 0:
+                subscriptions[key] = remaining
+            else:
+                subscriptions.pop(key, None)
+
+    def _quote_poller_loop(self):
+        interval = LIVE_BOT_CONFIG["QUOTE_POLL_INTERVAL_SEC"]
+        # A warm quote is due once it is within half a tick of its interval, so it is not pushed to the next tick.
+        warm_age = LIVE_BOT_CONFIG["WARM_QUOTE_POLL_INTERVAL_SEC"] - interval / 2
+        next_poll = time_sleep.monotonic()
+        while not self._quote_stop.is_set():
+            now = time_sleep.monotonic()
+            with self.data_lock:
+                keys = list(self.quote_subscriptions)
+                keys += [key for key in self.warm_quote_subscriptions
+                         if key not in self.quote_subscriptions and (key not in self.live_data_cache or now - self.live_data_cache[key][2] >= warm_age)]
+            for key in keys:
+                self._fetch_quote(key)
+            next_poll = max(next_poll + interval, time_sleep.monotonic())
+            self._quote_stop.wait(next_poll - time_sleep.monotonic())
+
     def fetch_1s_options_data(self, expiry_date, right, strike, from_dt, to_dt):
         if self.mode != 'backtest':
-            print("⚠️ fetch_1s_options_data is only configured for backtest mode.")
+            log.warning("⚠️ fetch_1s_options_data is only configured for backtest mode.")
             return pd.DataFrame()
         try:
             date_str = from_dt.strftime('%Y-%m-%d')
             contract_name = f"{right.upper()}_{int(strike)}"
+
+            archive = self._options_archive(date_str)
+            if archive is not None and archive.has_contract(right, strike):
+                # Archived days are read as a range of the day's mapped records; no per-contract parse or cache.
+                df_slice = exact_prices(archive.read_frame(right, strike, from_dt, to_dt))
+                if df_slice.empty:
+                    return pd.DataFrame()
+                df_slice['datetime_str'] = df_slice.index.strftime('%H:%M:%S')
+                return df_slice
             
-            if contract_name in self.options_1s_cache:
-                df_contract = self.options_1s_cache[contract_name]
-            else:
-                file_path = os.path.join('data', 'options_1s', date_str, f'{contract_name}.csv')
-                df_contract = pd.read_csv(file_path)
-                
-                df_contract['datetime'] = pd.to_datetime(df_contract['datetime'])
-                df_contract['datetime'] = df_contract['datetime'].apply(
-                    lambda dt: self.ist_timezone.localize(dt) if dt.tzinfo is None else dt.tz_convert(self.ist_timezone)
-                )
-                df_contract.set_index('datetime', inplace=True)
-                
-                self.options_1s_cache[contract_name] = df_contract
-
-            df_slice = df_contract[(df_contract.index >= from_dt) & (df_contract.index < to_dt)].copy()
+            df_contract = self._cached_options_contract(date_str, contract_name)
+
+            df_slice = df_contract[(df_contract.index >= from_dt) & (df_contract.index < to_dt)]
             
             if df_slice.empty:
                 return pd.DataFrame()
 
+            df_slice = exact_prices(df_slice)
             df_slice['datetime_str'] = df_slice.index.strftime('%H:%M:%S')
-            for col in ['open', 'high', 'low', 'close']:
-                df_slice[col] = pd.to_numeric(df_slice[col], errors='coerce')
-
             return df_slice
 
         except FileNotFoundError:
-            print(f"   └── [Provider] ⚠️ WARNING: Data file not found for {contract_name} on {date_str}.")
+            log.warning("   └── [Provider] ⚠️ WARNING: Data file not found for %s on %s.", contract_name, date_str)
             return pd.DataFrame()
         except Exception as e:
-            print(f"   └── [Provider] ❌ An unexpected error occurred: {e}")
+            log.error("   └── [Provider] ❌ An unexpected error occurred: %s", e)
             return pd.DataFrame()
 
+    def _load_options_contract(self, date_str, contract_name):
+        file_path = os.path.join('data', 'options_1s', date_str, f'{contract_name}.csv')
+        df_contract = pd.read_csv(file_path)
+        
+        df_contract['datetime'] = pd.to_datetime(df_contract['datetime'])
+        df_contract['datetime'] = df_contract['datetime'].apply(
+            lambda dt: self.ist_timezone.localize(dt) if dt.tzinfo is None else dt.tz_convert(self.ist_timezone)
+        )
+        df_contract.set_index('datetime', inplace=True)
+        # The cache holds the compact float32 frame; slices handed to the engine get exact prices back.
+        return enforce_ohlcv_schema(df_contract, f"{contract_name} {date_str}")
+
+    def _cached_options_contract(self, date_str, contract_name):
+        key = (date_str, contract_name)
+        df_contract = self.options_1s_cache.get(key)
+        if df_contract is not None:
+            return df_contract
+        with self._prefetch_lock:
+            pending = self._prefetch_futures.get(key)
+        if pending is not None:
+            # A background prefetch is already reading this file; wait for it instead of parsing it twice.
+            df_contract = pending.result()
+            if df_contract is not None:
+                return df_contract
+        df_contract = self._load_options_contract(date_str, contract_name)
+        self.options_1s_cache.put(key, df_contract)
+        return df_contract
+
+    def _prefetch_contract(self, key):
+        try:
+            df_contract = self._load_options_contract(*key)
+        except Exception:
+            return None
+        self.options_1s_cache.put(key, df_contract)
+        return df_contract
+
+    def _prefetch_done(self, key, future):
+        with self._prefetch_lock:
+            if self._prefetch_futures.get(key) is future:
+                del self._prefetch_futures[key]
+
+    def prefetch_options(self, date_str, right, strikes):
+        """Loads the given strikes' 1s files into the cache on a background thread (backtest only)."""
+        if self.mode != 'backtest' or self._options_archive(date_str) is not None:
+            return
+        submitted = []
+        with self._prefetch_lock:
+            if self._prefetch_pool is None:
+                self._prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trikal-prefetch")
+            for strike in strikes:
+                key = (date_str, f"{right.upper()}_{int(strike)}")
+                if key in self.options_1s_cache or key in self._prefetch_futures:
+                    continue
+                # Registered before the lock is released, so the done-callback always finds (and removes) it.
+                self._prefetch_futures[key] = future = self._prefetch_pool.submit(self._prefetch_contract, key)
+                submitted.append((key, future))
+        # Outside the lock: a future that has already finished runs its callback right here.
+        for key, future in submitted:
+            future.add_done_callback(partial(self._prefetch_done, key))
+
+    def prefetch_neighbour_strikes(self, date_str, right, strike):
+        """Prefetches OPTIONS_PREFETCH_NEIGHBOURS strikes on either side of a newly traded strike."""
+        step, count = LIVE_BOT_CONFIG["OPTIONS_STRIKE_STEP"], LIVE_BOT_CONFIG["OPTIONS_PREFETCH_NEIGHBOURS"]
+        neighbours = [int(strike) + i * step for i in range(-count, count + 1) if i != 0]
+        self.prefetch_options(date_str, right, neighbours)
+
+    def _options_archive(self, date_str):
+        if date_str not in self.options_archives:
+            self.options_archives[date_str] = OptionsDayArchive(date_str) if OptionsDayArchive.available(date_str) else None
+        return self.options_archives[date_str]
+
+    def nearest_option_strike(self, date_str, right, strike):
+        """Closest strike with 1s data for the day, from the options archive. None if the day is not archived."""
+        archive = self._options_archive(date_str)
+        return archive.nearest_strike(right, strike) if archive is not None else None
+
     def get_initial_historical_data(self, from_date, to_date, expiry_date):
         try:
             # Using the format that was proven to work for warm-up and historical calls.
@@ -171,7 +355,7 @@ class TrikalProvider:
             return response
         except Exception as e:
             # --- MODIFICATION START: Print a clean, user-friendly message ---
-            print("   └── ❌ NETWORK ERROR: Could not connect to Breeze API to fetch historical data.")
+            log.error("   └── ❌ NETWORK ERROR: Could not connect to Breeze API to fetch historical data.")
             # We can optionally log the full error to a file for debugging if needed,
             # but we will not show it to the user.
             # For example:
@@ -181,9 +365,18 @@ class TrikalProvider:
             # --- MODIFICATION END ---
     
     def shutdown(self):
-        if self.mode == 'live':
-            print("\nShutting down background data fetchers...")
+        if self.mode == 'backtest':
+            if self._prefetch_pool is not None:
+                self._prefetch_pool.shutdown(wait=True)
+            stats = self.options_1s_cache.stats()
+            if stats["hits"] or stats["misses"]:
+                log.info("🗃️  Options cache: %s", stats)
+        if self.is_realtime:
+            log.info("Shutting down background data fetchers...")
+            if isinstance(self.order_api, PaperBroker):
+                self.order_api.shutdown()
+            self._quote_stop.set()
             for thread in self.background_threads:
                 if thread.is_alive():
                     thread.join(timeout=3)
-            print("✅ All threads shut down.")
\ No newline at end of file
+            log.info("✅ All threads shut down.")
\ No newline at end of file
@@ -0,0 +1,217 @@
+# --- START OF FILE trikal_results.py ---
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Iterable, Optional
+
+import pandas as pd
+
+DEFAULT_RESULTS_DB = "trikal_results.db"
+# Equity points are buffered and written in batches of this many rows (and whenever a trade is recorded).
+EQUITY_FLUSH_ROWS = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id       TEXT PRIMARY KEY,
+    label        TEXT,
+    mode         TEXT NOT NULL,
+    instance     TEXT NOT NULL,
+    strategy     TEXT NOT NULL,
+    trading_date TEXT,
+    expiry_date  TEXT,
+    config_json  TEXT NOT NULL,
+    config_hash  TEXT NOT NULL,
+    started_at   TEXT NOT NULL,
+    finished_at  TEXT
+);
+CREATE TABLE IF NOT EXISTS trades (
+    trade_id     INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_id       TEXT NOT NULL REFERENCES runs(run_id),
+    trade_date   TEXT NOT NULL,
+    contract     TEXT NOT NULL,
+    position     TEXT NOT NULL,
+    qty          INTEGER NOT NULL,
+    entry_time   TEXT NOT NULL,
+    entry_price  REAL NOT NULL,
+    exit_time    TEXT NOT NULL,
+    exit_price   REAL NOT NULL,
+    high_ltp     REAL,
+    low_ltp      REAL,
+    entry_reason TEXT,
+    exit_reason  TEXT,
+    gross_pnl    REAL NOT NULL,
+    charges      REAL NOT NULL,
+    net_pnl      REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS equity (
+    run_id       TEXT NOT NULL REFERENCES runs(run_id),
+    ts           TEXT NOT NULL,
+    close        REAL,
+    realized_pnl REAL NOT NULL,
+    open_pnl     REAL NOT NULL,
+    PRIMARY KEY (run_id, ts)
+);
+CREATE INDEX IF NOT EXISTS trades_by_run ON trades(run_id, exit_time);
+CREATE INDEX IF NOT EXISTS runs_by_label ON runs(label);
+"""
+
+# Runs are grouped into a series by label (e.g. every day of one sweep); unlabelled runs stand alone.
+_SERIES = "COALESCE(r.label, r.run_id)"
+
+
+def config_hash(config: dict) -> str:
+    return hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()[:12]
+
+
+class ResultsStore:
+    """
+    SQLite store of backtest and paper results: one row per run (with its config and hash), one per
+    closed trade with numeric prices and PnL, and one per candle of equity. Aggregations (daily and
+    monthly PnL, win rate, drawdown, exit reasons) run as SQL over any set of runs or labels.
+    """
+
+    def __init__(self, path: str = DEFAULT_RESULTS_DB, label: Optional[str] = None):
+        self.path = path
+        self.label = label
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._realized = {}
+        self._equity_rows = {}
+
+    # --- Recording ---
+
+    def start_run(self, mode: str, instance: str, strategy: str, config: dict,
+                  trading_date: Optional[str] = None, expiry_date: Optional[str] = None) -> str:
+        started = datetime.now()
+        run_id = f"{started:%Y%m%dT%H%M%S}-{instance}-{uuid.uuid4().hex[:6]}"
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO runs (run_id, label, mode, instance, strategy, trading_date, expiry_date, config_json, config_hash, started_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, self.label, mode, instance, strategy, trading_date, expiry_date,
+                 json.dumps(config, sort_keys=True, default=str), config_hash(config), started.isoformat(timespec="seconds")),
+            )
+            self._realized[run_id] = 0.0
+            self._equity_rows[run_id] = []
+        return run_id
+
+    def record_trade(self, run_id: str, trade, exit_reason: str, exit_price: float, exit_time: datetime,
+                     gross_pnl: float, charges: float, net_pnl: float, high_ltp: float, low_ltp: float):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO trades (run_id, trade_date, contract, position, qty, entry_time, entry_price, exit_time, exit_price,"
+                " high_ltp, low_ltp, entry_reason, exit_reason, gross_pnl, charges, net_pnl)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run_id, exit_time.strftime("%Y-%m-%d"), trade.contract, trade.position_type, int(trade.qty),
+                 trade.entry_time.isoformat(), float(trade.entry_price), exit_time.isoformat(), float(exit_price),
+                 float(high_ltp), float(low_ltp), trade.entry_reason, exit_reason, float(gross_pnl), float(charges), float(net_pnl)),
+            )
+            self._realized[run_id] = self._realized.get(run_id, 0.0) + float(net_pnl)
+            self._flush_equity(run_id)
+
+    def record_equity(self, run_id: str, ts: datetime, close: float, open_pnl: float = 0.0):
+        """Buffers one candle's equity point; the buffer is written every EQUITY_FLUSH_ROWS points."""
+        with self._lock:
+            rows = self._equity_rows.setdefault(run_id, [])
+            rows.append((run_id, ts.isoformat(), float(close), self._realized.get(run_id, 0.0), float(open_pnl)))
+            if len(rows) >= EQUITY_FLUSH_ROWS:
+                with self._conn:
+                    self._flush_equity(run_id)
+
+    def _flush_equity(self, run_id: str):
+        # Caller holds self._lock and, for a commit, the connection context.
+        rows = self._equity_rows.get(run_id)
+        if rows:
+            self._conn.executemany("INSERT OR REPLACE INTO equity VALUES (?, ?, ?, ?, ?)", rows)
+            rows.clear()
+
+    def finish_run(self, run_id: str):
+        with self._lock, self._conn:
+            self._flush_equity(run_id)
+            self._equity_rows.pop(run_id, None)
+            self._conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (datetime.now().isoformat(timespec="seconds"), run_id))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- Queries ---
+
+    def _query(self, sql: str, run_ids: Optional[Iterable[str]], labels: Optional[Iterable[str]], params=()) -> pd.DataFrame:
+        clauses, args = [], list(params)
+        if run_ids:
+            run_ids = list(run_ids)
+            clauses.append(f"r.run_id IN ({','.join('?' * len(run_ids))})")
+            args += run_ids
+        if labels:
+            labels = list(labels)
+            clauses.append(f"r.label IN ({','.join('?' * len(labels))})")
+            args += labels
+        where = ("WHERE " + " AND ".join(clauses)) if clauses else ""
+        with self._lock:
+            return pd.read_sql_query(sql.format(where=where, series=_SERIES), self._conn, params=args)
+
+    def runs(self, run_ids=None, labels=None) -> pd.DataFrame:
+        return self._query("SELECT r.* FROM runs r {where} ORDER BY r.started_at", run_ids, labels)
+
+    def daily_pnl(self, run_ids=None, labels=None) -> pd.DataFrame:
+        return self._query(
+            "SELECT {series} AS series, t.trade_date, COUNT(*) AS trades, SUM(t.net_pnl > 0) AS wins,"
+            " SUM(t.charges) AS charges, SUM(t.net_pnl) AS net_pnl"
+            " FROM trades t JOIN runs r USING (run_id) {where} GROUP BY series, t.trade_date ORDER BY series, t.trade_date",
+            run_ids, labels)
+
+    def monthly_pnl(self, run_ids=None, labels=None) -> pd.DataFrame:
+        return self._query(
+            "SELECT {series} AS series, substr(t.trade_date, 1, 7) AS month, COUNT(*) AS trades, SUM(t.net_pnl > 0) AS wins,"
+            " SUM(t.charges) AS charges, SUM(t.net_pnl) AS net_pnl"
+            " FROM trades t JOIN runs r USING (run_id) {where} GROUP BY series, month ORDER BY series, month",
+            run_ids, labels)
+
+    def exit_reasons(self, run_ids=None, labels=None) -> pd.DataFrame:
+        return self._query(
+            "SELECT {series} AS series, t.exit_reason, COUNT(*) AS trades, AVG(t.net_pnl) AS avg_pnl, SUM(t.net_pnl) AS net_pnl"
+            " FROM trades t JOIN runs r USING (run_id) {where} GROUP BY series, t.exit_reason ORDER BY series, trades DESC",
+            run_ids, labels)
+
+    def summary(self, run_ids=None, labels=None) -> pd.DataFrame:
+        """Per series: trades, win rate, net PnL, charges and maximum drawdown of the closed-trade equity curve."""
+        return self._query(
+            "WITH curve AS ("
+            "  SELECT {series} AS series, r.config_hash, t.net_pnl, t.charges,"
+            "         ROW_NUMBER() OVER (PARTITION BY {series} ORDER BY t.exit_time, t.trade_id) AS seq,"
+            "         SUM(t.net_pnl) OVER (PARTITION BY {series} ORDER BY t.exit_time, t.trade_id) AS equity"
+            "  FROM trades t JOIN runs r USING (run_id) {where}"
+            "), peaks AS ("
+            "  SELECT *, MAX(0, MAX(equity) OVER (PARTITION BY series ORDER BY seq)) AS peak FROM curve"
+            ")"
+            " SELECT series, GROUP_CONCAT(DISTINCT config_hash) AS config_hash, COUNT(*) AS trades,"
+            "        ROUND(AVG(net_pnl > 0), 4) AS win_rate, SUM(net_pnl) AS net_pnl, SUM(charges) AS charges,"
+            "        MAX(peak - equity) AS max_drawdown"
+            " FROM peaks GROUP BY series ORDER BY net_pnl DESC",
+            run_ids, labels)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the Trikal backtest results store.")
+    parser.add_argument("report", choices=["runs", "summary", "daily", "monthly", "exits"])
+    parser.add_argument("--db", default=DEFAULT_RESULTS_DB)
+    parser.add_argument("--label", nargs="*", help="Only runs with these labels.")
+    parser.add_argument("--run", nargs="*", help="Only these run IDs.")
+    args = parser.parse_args()
+
+    store = ResultsStore(args.db)
+    query = {"runs": store.runs, "summary": store.summary, "daily": store.daily_pnl,
+             "monthly": store.monthly_pnl, "exits": store.exit_reasons}[args.report]
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        print(query(run_ids=args.run, labels=args.label).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# --- START OF FILE trikal_schema.py ---
+#
+# Compact in-memory layout for OHLCV frames: float32 prices, int64 volume (int32 where the caller
+# asks for it) and a datetime64[ns] index. Every ingestion point passes its frame through
+# enforce_ohlcv_schema(), which also checks that prices sit on the exchange tick grid and survive
+# the float32 round trip. Trade-facing values (entry/exit prices) are read back with
+# exact_prices(), which restores the 2-decimal values the CSVs and the API carry.
+
+import numpy as np
+import pandas as pd
+
+from trikal_logging import get_logger
+
+log = get_logger("trikal.schema")
+
+PRICE_COLUMNS = ("open", "high", "low", "close")
+PRICE_DTYPE = np.float32
+PRICE_DECIMALS = 2
+PRICE_TICK = 0.05
+# float32 keeps integer-scaled prices exact to 2 decimals below 2**24 / 100.
+MAX_FLOAT32_PRICE = 2 ** 24 / 10 ** PRICE_DECIMALS
+
+
+class SchemaError(ValueError):
+    """A frame cannot be stored in the compact schema without losing price precision."""
+
+
+def off_tick_count(values, tick: float = PRICE_TICK) -> int:
+    """Number of finite prices that are not a multiple of `tick`."""
+    values = np.asarray(values, dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    steps = finite / tick
+    return int(np.count_nonzero(np.abs(steps - np.round(steps)) > 1e-6))
+
+
+def to_price_array(values, label: str = "") -> np.ndarray:
+    """float32 prices, after checking that every value comes back unchanged at PRICE_DECIMALS."""
+    values = np.asarray(values, dtype=np.float64)
+    finite = values[np.isfinite(values)]
+    if finite.size and np.abs(finite).max() >= MAX_FLOAT32_PRICE:
+        raise SchemaError(f"{label}: price {np.abs(finite).max():.2f} is too large for float32 at {PRICE_DECIMALS} decimals.")
+    stored = values.astype(PRICE_DTYPE)
+    restored = np.round(stored.astype(np.float64), PRICE_DECIMALS)
+    if np.any(np.abs(restored[np.isfinite(values)] - np.round(finite, PRICE_DECIMALS)) > 1e-9):
+        raise SchemaError(f"{label}: prices do not round-trip through float32 at {PRICE_DECIMALS} decimals.")
+    return stored
+
+
+def enforce_ohlcv_schema(df: pd.DataFrame, label: str = "", volume_dtype=np.int64) -> pd.DataFrame:
+    """
+    Returns `df` with compact price and volume columns. Prices off the PRICE_TICK grid are logged
+    (the data is kept, since the API occasionally reports averaged prices); prices that float32
+    cannot hold raise SchemaError. Volume stays float when it has gaps, so callers can still fill them.
+    """
+    if df is None or df.empty:
+        return df
+    df = df.copy()
+    for col in PRICE_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+        off_tick = off_tick_count(values)
+        if off_tick:
+            log.warning("   └── [Schema] ⚠️ %s: %d '%s' price(s) are off the %.2f tick grid.", label, off_tick, col, PRICE_TICK)
+        df[col] = to_price_array(values, f"{label} {col}")
+    if "volume" in df.columns:
+        volume = pd.to_numeric(df["volume"], errors="coerce")
+        if volume.notna().all():
+            if len(volume) and volume.abs().max() > np.iinfo(volume_dtype).max:
+                raise SchemaError(f"{label}: volume does not fit in {np.dtype(volume_dtype).name}.")
+            df["volume"] = volume.to_numpy().astype(volume_dtype)
+        else:
+            df["volume"] = volume.astype(np.float64)
+    if isinstance(df.index, pd.DatetimeIndex) and df.index.unit != "ns":
+        df.index = df.index.as_unit("ns")
+    return df
+
+
+def exact_prices(df: pd.DataFrame) -> pd.DataFrame:
+    """float64 copy of the price columns rounded to PRICE_DECIMALS, for values that end up in trades."""
+    df = df.copy()
+    for col in PRICE_COLUMNS:
+        if col in df.columns:
+            df[col] = np.round(df[col].to_numpy(dtype=np.float64), PRICE_DECIMALS)
+    return df
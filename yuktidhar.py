@@ -2,21 +2,64 @@
 
 from abc import ABC, abstractmethod
 import pandas as pd
-import pandas_ta as ta
 from datetime import timedelta, time
 from trikal_helpers import Trade, is_sideways_market # Removed STRATEGY_CONFIGS as it's unused
+from trikal_logging import get_logger, CANDLE_LOGGER
+import trikal_indicators as ind
 import numpy as np
 from datetime import datetime
 
+log = get_logger("trikal.strategy")
+candle_log = get_logger(CANDLE_LOGGER)
+
 class BaseStrategy(ABC):
     def __init__(self, name, config):
         self.name = name
         self.config = config
-        print(f"✅ Initialized Strategy: {self.name}")
+        log.info("✅ Initialized Strategy: %s", self.name)
 
     def add_indicators(self, df):
         raise NotImplementedError("Each strategy must implement its own add_indicators method.")
 
+    def indicator_specs(self):
+        """
+        Hashable specs (e.g. ("ema", 20)) for the columns add_indicators produces. When several strategies run on
+        one stream, each distinct spec is computed once and shared. None means add_indicators is opaque.
+        """
+        return None
+
+    def entry_candidates(self, df):
+        """
+        (right, strike) contracts check_entry could trade on the next candle, judged from the latest candle,
+        likeliest first. The engine warms their option data (backtest) or the first WARM_QUOTE_MAX_CONTRACTS
+        quotes (live) ahead of the signal. Empty by default.
+        """
+        return []
+
+    @staticmethod
+    def compute_indicator(df, spec):
+        """
+        Returns (column_name, series) for one indicator spec: ("ema", n), ("sma", n), ("rsi", n), ("atr", n) or ("vwap",).
+        Values come from trikal_indicators, which matches pandas_ta/TA-Lib numerically.
+        """
+        kind, *params = spec
+        if kind == "ema":
+            (length,) = params
+            return f"EMA_{length}", pd.Series(ind.ema(df["close"].to_numpy(), length), index=df.index)
+        if kind == "sma":
+            (length,) = params
+            return f"SMA_{length}", pd.Series(ind.sma(df["close"].to_numpy(), length), index=df.index)
+        if kind == "rsi":
+            (length,) = params
+            return f"RSI_{length}", pd.Series(ind.rsi(df["close"].to_numpy(), length), index=df.index)
+        if kind == "atr":
+            (length,) = params
+            return f"ATR_{length}", pd.Series(ind.atr(df["high"].to_numpy(), df["low"].to_numpy(), df["close"].to_numpy(), length), index=df.index)
+        if kind == "vwap":
+            session_keys = df.index.normalize().to_numpy()
+            return "VWAP_D", pd.Series(ind.vwap(df["high"].to_numpy(), df["low"].to_numpy(), df["close"].to_numpy(), df["volume"].to_numpy(), session_keys), index=df.index)
+        raise ValueError(f"Unknown indicator spec: {spec}")
+
     @abstractmethod
     def check_entry(self, provider_obj, df, expiry_date, capital_config, current_timestamp): pass
     @abstractmethod
@@ -24,11 +67,37 @@ class BaseStrategy(ABC):
 
 class TrendPullbackStrategy(BaseStrategy):
 
+    def indicator_specs(self):
+        return [("ema", self.config.get("SHORT_EMA_PERIOD", 20)), ("ema", self.config.get("LONG_EMA_PERIOD", 50))]
+
     def add_indicators(self, df):
-        df.ta.ema(length=self.config.get("SHORT_EMA_PERIOD", 20), append=True, talib=False)
-        df.ta.ema(length=self.config.get("LONG_EMA_PERIOD", 50), append=True, talib=False)
+        for spec in self.indicator_specs():
+            column, values = self.compute_indicator(df, spec)
+            df[column] = values
         return df
 
+    def entry_candidates(self, df):
+        # The latest candle becomes next candle's undercut/overshoot candle, so the regime and momentum
+        # filters can already be evaluated; only the reclaim/reject close is still unknown.
+        short_ema_col = f"EMA_{self.config.get('SHORT_EMA_PERIOD', 20)}"
+        if len(df) == 0 or any(col not in df.columns for col in (short_ema_col, 'ema_slope', 'long_ema_slope')):
+            return []
+        last = df.iloc[-1]
+        if pd.isnull(last[[short_ema_col, 'ema_slope', 'long_ema_slope']]).any():
+            return []
+        if last['long_ema_slope'] > 0 and last['ema_slope'] >= 0 and last['close'] < last[short_ema_col]:
+            right, direction = "call", 1
+        elif last['long_ema_slope'] < 0 and last['ema_slope'] <= 0 and last['close'] > last[short_ema_col]:
+            right, direction = "put", -1
+        else:
+            return []
+        # A reclaim/reject close lands just beyond the 20-EMA, so the strike at the EMA is the likeliest entry,
+        # then the one past it, then the rest of the range back towards the current close.
+        ema_strike = int(round(last[short_ema_col] / 50) * 50)
+        close_strike = int(round(last['close'] / 50) * 50)
+        strikes = [ema_strike, ema_strike + direction * 50] + list(range(ema_strike - direction * 50, close_strike - direction * 50, -direction * 50))
+        return [(right, strike) for strike in strikes]
+
     def get_analysis_string(self, df, strategy_config, timezone):
         long_ema_period = strategy_config.get("LONG_EMA_PERIOD", 50)
         short_ema_period = strategy_config.get("SHORT_EMA_PERIOD", 20)
@@ -84,7 +153,7 @@ class TrendPullbackStrategy(BaseStrategy):
         if is_bullish_regime:
             # --- FILTER 2: MOMENTUM ALIGNMENT ---
             if short_term_momentum_slope < 0:
-                print(f"   └── Reversal Detected. Trend is Bullish, but 20-EMA slope ({short_term_momentum_slope:.2f}) is negative. No entry.")
+                candle_log.info("   └── Reversal Detected. Trend is Bullish, but 20-EMA slope (%.2f) is negative. No entry.", short_term_momentum_slope)
                 return None, None
 
             # Original pullback logic
@@ -92,15 +161,18 @@ class TrendPullbackStrategy(BaseStrategy):
             reclaim_cond = reclaim_candle['close'] > reclaim_candle[short_ema_col]
             if undercut_cond and reclaim_cond:
                 bias = "bullish"
-                print(f"   └── Bullish Signal Confirmed:")
-                print(f"       ├── Trend Check:   Prev_Close ({undercut_candle['close']:.2f}) > Prev_50_EMA ({undercut_candle[long_ema_col]:.2f}) -> {is_bullish_regime}")
-                print(f"       ├── Undercut Check: Prev_Close ({undercut_candle['close']:.2f}) < Prev_20_EMA ({undercut_candle[short_ema_col]:.2f}) -> {undercut_cond}")
-                print(f"       └── Reclaim Check:  Close ({reclaim_candle['close']:.2f}) > 20_EMA ({reclaim_candle[short_ema_col]:.2f}) -> {reclaim_cond}")
+                candle_log.info("   └── Bullish Signal Confirmed:\n"
+                                "       ├── Trend Check:   Prev_Close (%.2f) > Prev_50_EMA (%.2f) -> %s\n"
+                                "       ├── Undercut Check: Prev_Close (%.2f) < Prev_20_EMA (%.2f) -> %s\n"
+                                "       └── Reclaim Check:  Close (%.2f) > 20_EMA (%.2f) -> %s",
+                                undercut_candle['close'], undercut_candle[long_ema_col], is_bullish_regime,
+                                undercut_candle['close'], undercut_candle[short_ema_col], undercut_cond,
+                                reclaim_candle['close'], reclaim_candle[short_ema_col], reclaim_cond)
 
         elif is_bearish_regime:
             # --- FILTER 2: MOMENTUM ALIGNMENT ---
             if short_term_momentum_slope > 0:
-                print(f"   └── Reversal Detected. Trend is Bearish, but 20-EMA slope ({short_term_momentum_slope:.2f}) is positive. No entry.")
+                candle_log.info("   └── Reversal Detected. Trend is Bearish, but 20-EMA slope (%.2f) is positive. No entry.", short_term_momentum_slope)
                 return None, None
 
             # Original pullback logic
@@ -108,10 +180,13 @@ class TrendPullbackStrategy(BaseStrategy):
             reject_cond = reclaim_candle['close'] < reclaim_candle[short_ema_col]
             if overshoot_cond and reject_cond:
                 bias = "bearish"
-                print(f"   └── Bearish Signal Confirmed:")
-                print(f"       ├── Trend Check:   Prev_Close ({undercut_candle['close']:.2f}) < Prev_50_EMA ({undercut_candle[long_ema_col]:.2f}) -> {is_bearish_regime}")
-                print(f"       ├── Overshoot Check: Prev_Close ({undercut_candle['close']:.2f}) > Prev_20_EMA ({undercut_candle[short_ema_col]:.2f}) -> {overshoot_cond}")
-                print(f"       └── Reject Check:  Close ({reclaim_candle['close']:.2f}) < 20_EMA ({reclaim_candle[short_ema_col]:.2f}) -> {reject_cond}")
+                candle_log.info("   └── Bearish Signal Confirmed:\n"
+                                "       ├── Trend Check:   Prev_Close (%.2f) < Prev_50_EMA (%.2f) -> %s\n"
+                                "       ├── Overshoot Check: Prev_Close (%.2f) > Prev_20_EMA (%.2f) -> %s\n"
+                                "       └── Reject Check:  Close (%.2f) < 20_EMA (%.2f) -> %s",
+                                undercut_candle['close'], undercut_candle[long_ema_col], is_bearish_regime,
+                                undercut_candle['close'], undercut_candle[short_ema_col], overshoot_cond,
+                                reclaim_candle['close'], reclaim_candle[short_ema_col], reject_cond)
         
         if not bias: return None, None
         
@@ -124,7 +199,7 @@ class TrendPullbackStrategy(BaseStrategy):
             if options_block_df.empty: return None, None
             first_candle = options_block_df.iloc[0]
             price_data, entry_time_str = {'close': first_candle['close']}, first_candle['datetime_str']
-        elif provider_obj.mode == 'live':
+        elif provider_obj.is_realtime:
             price_data, entry_time_str = provider_obj.get_live_ltp(expiry_date, right_str, traded_strike)
         
         if not price_data: return None, None
@@ -142,16 +217,16 @@ class TrendPullbackStrategy(BaseStrategy):
 
             if trade_expiry_date > cutoff_date:
                 lot_size = capital_config.get("NIFTY_LOT_SIZE_NEW", 65)
-                print(f"   └── Using NEW lot size: {lot_size} for expiry {expiry_date}")
+                log.info("   └── Using NEW lot size: %s for expiry %s", lot_size, expiry_date)
             else:
                 lot_size = capital_config.get("NIFTY_LOT_SIZE", 75)
         except (ValueError, KeyError) as e:
-            print(f"   └── ⚠️  Could not determine dynamic lot size, falling back to default. Error: {e}")
+            log.warning("   └── ⚠️  Could not determine dynamic lot size, falling back to default. Error: %s", e)
             lot_size = capital_config.get("NIFTY_LOT_SIZE", 75)
         # --- END OF NEW LOGIC ---
 
         if lot_size == 0:
-            print("   └── ❌ Lot size is zero. Aborting entry.")
+            log.error("   └── ❌ Lot size is zero. Aborting entry.")
             return None, None
         
         cost_of_one_lot = entry_price * lot_size
@@ -169,7 +244,7 @@ class TrendPullbackStrategy(BaseStrategy):
         entry_reason_suffix = ""
 
         if is_afternoon_session:
-            print("   └── 🕑 Afternoon session rules applied.")
+            log.info("   └── 🕑 Afternoon session rules applied.")
             stop_loss_pct = self.config.get("AFTERNOON_FIXED_STOP_LOSS_PCT")
             target_pct = self.config.get("AFTERNOON_FIXED_TARGET_PCT")
             entry_reason_suffix = " (Afternoon)"
@@ -179,7 +254,7 @@ class TrendPullbackStrategy(BaseStrategy):
 
         # Safety check to ensure parameters were loaded correctly
         if stop_loss_pct is None or target_pct is None:
-            print("   └── ❌ ERROR: SL/TP parameters not found in config. Aborting entry.")
+            log.error("   └── ❌ ERROR: SL/TP parameters not found in config. Aborting entry.")
             return None, None
         
         # This part now uses the dynamically selected SL/TP percentages